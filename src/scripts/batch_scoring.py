@@ -0,0 +1,213 @@
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from src.scripts.data_loader import PARTITIONING, default_data_path
+from src.scripts.model_registry import REGISTRY_DIR, ModelRegistry
+from src.scripts.preprocessing import InsurancePreprocessor
+
+# Saved preprocessor and registered models used for scoring
+PREPROCESSOR_PATH = 'models/preprocessor.pkl'
+PROBABILITY_MODEL = 'xgboost_probability'
+SEVERITY_MODEL = 'xgboost_severity'
+OUTPUT_PATH = 'data/scored/pure_premium.parquet'
+
+# Identifier columns carried through to the output
+ID_COLUMNS = ['UnderwrittenCoverID', 'PolicyID']
+
+OUTPUT_SCHEMA = pa.schema([
+    ('UnderwrittenCoverID', pa.float64()),
+    ('PolicyID', pa.float64()),
+    ('ClaimProbability', pa.float64()),
+    ('ExpectedSeverity', pa.float64()),
+    ('PurePremium', pa.float64())
+])
+
+
+# Function to get the feature order a model was trained with (booster feature names, which registry
+# boosters take from metadata['features'], or scikit-learn's feature_names_in_)
+def model_features(model):
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    features = getattr(booster, 'feature_names', None)
+    if features is None:
+        features = getattr(model, 'feature_names_in_', None)
+    return None if features is None else list(features)
+
+
+# Function to select features in training order, refusing missing or unexpected columns
+def select_features(X, features):
+    if features is None:
+        return X
+    missing = [col for col in features if col not in X.columns]
+    extra = [col for col in X.columns if col not in features]
+    if missing or extra:
+        raise ValueError(f"Feature mismatch with the model: missing {missing}, unexpected {extra}")
+    return X[features]
+
+
+def align_features(model, X):
+    return select_features(X, model_features(model))
+
+
+# Function to predict P(claim) or severity. XGBoost models (registry boosters or sklearn wrappers)
+# go straight to the booster with a float32 matrix, skipping the per-call DataFrame-to-DMatrix
+# conversion; feature validation is left off there because align_features has already put the
+# columns in training order. Other models use the scikit-learn API.
+def predict(model, X, proba=False):
+    X = align_features(model, X)
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    if hasattr(booster, 'inplace_predict'):
+        return booster.inplace_predict(X.to_numpy(dtype=np.float32), validate_features=False)
+    return model.predict_proba(X)[:, 1] if proba else model.predict(X)
+
+
+# Function to set the thread count of a loaded model
+def set_threads(model, threads):
+    if hasattr(model, 'n_jobs'):
+        model.set_params(n_jobs=threads)
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    if hasattr(booster, 'inplace_predict'):
+        booster.set_param('nthread', threads)
+
+
+# Function to load the preprocessor and both models once per process
+def load_scoring_models(preprocessor_path=PREPROCESSOR_PATH, prob_model=PROBABILITY_MODEL,
+                        sev_model=SEVERITY_MODEL, registry_dir=REGISTRY_DIR):
+    registry = ModelRegistry(registry_dir)
+    return InsurancePreprocessor.load(preprocessor_path), registry.get(prob_model), registry.get(sev_model)
+
+
+# Function to score one frame: pure premium = P(claim) x E[severity | claim]
+def score_frame(df, preprocessor, prob_model, sev_model):
+    X = preprocessor.transform(df)[preprocessor.features_]
+    probability = np.asarray(predict(prob_model, X, proba=True), dtype='float64')
+    severity = np.asarray(predict(sev_model, X), dtype='float64')
+    scored = pd.DataFrame({col: (df[col].to_numpy(dtype='float64', na_value=np.nan) if col in df.columns
+                                 else np.full(len(df), np.nan)) for col in ID_COLUMNS})
+    scored['ClaimProbability'] = probability
+    scored['ExpectedSeverity'] = severity
+    scored['PurePremium'] = probability * severity
+    return scored
+
+
+# Function to plan scoring tasks from Parquet metadata without reading any data. Each task is a
+# list of (file, row group, partition keys); small row groups (e.g. one per partition) are packed
+# together until a task holds at least batch_size rows, so per-call overhead stays amortized.
+def scoring_tasks(path, batch_size=64 * 1024):
+    if os.path.isdir(path):
+        fragments = ds.dataset(path, format='parquet', partitioning=PARTITIONING).get_fragments()
+        files = [(fragment.path, ds.get_partition_keys(fragment.partition_expression)) for fragment in fragments]
+    else:
+        files = [(path, {})]
+    tasks, current, current_rows = [], [], 0
+    for file_path, keys in files:
+        metadata = pq.ParquetFile(file_path).metadata
+        for row_group in range(metadata.num_row_groups):
+            current.append((file_path, row_group, keys))
+            current_rows += metadata.row_group(row_group).num_rows
+            if current_rows >= batch_size:
+                tasks.append(current)
+                current, current_rows = [], 0
+    if current:
+        tasks.append(current)
+    return tasks
+
+
+# Per-process model cache, filled once by the pool initializer
+_worker = {}
+
+
+def _init_worker(preprocessor_path, prob_model, sev_model, registry_dir, batch_size, threads):
+    _worker['preprocessor'], _worker['prob_model'], _worker['sev_model'] = load_scoring_models(
+        preprocessor_path, prob_model, sev_model, registry_dir)
+    for model in (_worker['prob_model'], _worker['sev_model']):
+        # One pool process per core: keep each model single-threaded to avoid oversubscription
+        set_threads(model, threads)
+    _worker['batch_size'] = batch_size
+
+
+# Function to read the row groups of one task, adding partition keys stored in directory names
+def _read_task(task, columns_wanted):
+    frames = []
+    for file_path, row_group, keys in task:
+        parquet_file = pq.ParquetFile(file_path)
+        columns = [col for col in parquet_file.schema_arrow.names if col in columns_wanted]
+        df = parquet_file.read_row_group(row_group, columns=columns).to_pandas()
+        for col, value in keys.items():
+            df[col] = value
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+# Function to score one task in fixed-size record batches
+def _score_task(task):
+    preprocessor = _worker['preprocessor']
+    df = _read_task(task, set(preprocessor.input_columns()) | set(ID_COLUMNS))
+    batch_size = _worker['batch_size']
+    results = [score_frame(df.iloc[start:start + batch_size], preprocessor, _worker['prob_model'], _worker['sev_model'])
+               for start in range(0, len(df), batch_size)]
+    return pd.concat(results, ignore_index=True) if results else None
+
+
+# Function to score a Parquet file or partitioned dataset and write results incrementally
+def score_book(input_path=None, output_path=OUTPUT_PATH, workers=None, batch_size=64 * 1024,
+               preprocessor_path=PREPROCESSOR_PATH, prob_model=PROBABILITY_MODEL, sev_model=SEVERITY_MODEL,
+               registry_dir=REGISTRY_DIR):
+    input_path = input_path or default_data_path()
+    workers = workers or os.cpu_count() or 1
+    tasks = scoring_tasks(input_path, batch_size)
+    init_args = (preprocessor_path, prob_model, sev_model, registry_dir, batch_size, 1)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    rows = 0
+    start = time.perf_counter()
+    with pq.ParquetWriter(output_path, OUTPUT_SCHEMA) as writer:
+        def write(scored):
+            nonlocal rows
+            if scored is not None and len(scored) > 0:
+                writer.write_table(pa.Table.from_pandas(scored, schema=OUTPUT_SCHEMA, preserve_index=False))
+                rows += len(scored)
+
+        if workers == 1:
+            _init_worker(*init_args[:-1], threads=os.cpu_count() or 1)
+            for task in tasks:
+                write(_score_task(task))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args) as pool:
+                # Bounded window of in-flight tasks keeps memory flat and output in input order
+                pending = deque()
+                for task in tasks:
+                    pending.append(pool.submit(_score_task, task))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    elapsed = time.perf_counter() - start
+    stats = {
+        'rows': rows,
+        'seconds': elapsed,
+        'workers': workers,
+        'rows_per_second': rows / elapsed if elapsed > 0 else float('nan'),
+        'rows_per_second_per_core': rows / elapsed / workers if elapsed > 0 else float('nan')
+    }
+    print(f"Scored {rows} policies in {elapsed:.1f}s with {workers} workers "
+          f"({stats['rows_per_second']:.0f} rows/s, {stats['rows_per_second_per_core']:.0f} rows/s per core)")
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score a policy book with the saved models')
+    parser.add_argument('--input', default=None, help='Parquet file or partitioned dataset (default: loader default)')
+    parser.add_argument('--output', default=OUTPUT_PATH, help='Parquet file for the scored policies')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--batch-size', type=int, default=64 * 1024, help='Rows per record batch')
+    args = parser.parse_args()
+
+    score_book(args.input, args.output, args.workers, args.batch_size)
+    print(f"Pure premiums saved to {args.output}")
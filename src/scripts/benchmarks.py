@@ -0,0 +1,144 @@
+import pandas as pd
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from src.scripts.resources import ResourceMonitor
+from src.scripts.synthetic_data import generate
+
+# Benchmark results, one JSON record per (run, size, stage), appended so scaling curves and
+# regressions can be tracked over time
+RESULTS_PATH = 'benchmarks/results.jsonl'
+STAGES = ['ingestion', 'preparation', 'hypotheses', 'training', 'scoring']
+DEFAULT_SIZES = ['100k', '1M']
+
+# Above this many rows the preparation stage uses the out-of-core path
+OUT_OF_CORE_ROWS = 5_000_000
+
+# Paths inside the benchmark working directory (the scripts' defaults, relative to it)
+EXTRACT_PATH = 'data/MachineLearningRating_v3.txt'
+DATA_PATH = 'data/insurance_data.parquet'
+SCORED_PATH = 'data/scored/pure_premium.parquet'
+
+
+# Function to parse sizes such as 100k, 1M or 50M
+def parse_size(size):
+    size = str(size).strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(size[-1], 1)
+    return int(float(size.rstrip('km')) * multiplier)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {'commit': _git_commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'pandas': pd.__version__}
+
+
+# Function to run one stage on the working directory's data; returns rows processed and details
+def run_stage(stage, rows, args):
+    if stage == 'ingestion':
+        from src.scripts.convert_to_parquet import convert_streaming
+        stats = convert_streaming(EXTRACT_PATH, DATA_PATH, args.chunk_size)
+        return stats['rows'], {'bytes_written': stats['bytes_written']}
+    if stage == 'preparation':
+        if rows > args.out_of_core_rows:
+            from src.scripts.out_of_core_prep import prepare_out_of_core
+            prepare_out_of_core(DATA_PATH)
+            return rows, {'method': 'out_of_core'}
+        from src.scripts.task4_data_preparation import prepare_in_memory
+        prepare_in_memory()
+        return rows, {'method': 'in_memory'}
+    if stage == 'hypotheses':
+        from src.scripts.hypothesis_runner import HypothesisRunner
+        from src.scripts.task3_hypothesis_testing import HYPOTHESES
+        report = HypothesisRunner(HYPOTHESES, resamples=args.resamples, workers=args.workers).run(path=DATA_PATH)
+        return report['rows'], {'resamples': args.resamples}
+    if stage == 'training':
+        from src.scripts.feature_store import read_split
+        from src.scripts.task4_modeling import run_training
+        trained = run_training(args.models, args.workers)
+        return len(read_split('X_prob_train')), {'models': {row['name']: round(row['wall_seconds'], 3)
+                                                            for row in trained}}
+    if stage == 'scoring':
+        from src.scripts.batch_scoring import score_book
+        stats = score_book(DATA_PATH, SCORED_PATH, workers=args.workers)
+        return stats['rows'], {}
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+# Function to benchmark the pipeline at one size in a scratch working directory: the synthetic
+# extract is generated, then each stage runs in order (later stages use earlier outputs)
+def benchmark_size(rows, args, run_id, env):
+    work_dir = os.path.join(args.work_dir, f'rows_{rows}') if args.work_dir else tempfile.mkdtemp(prefix='bench_')
+    os.makedirs(work_dir, exist_ok=True)
+    cwd = os.getcwd()
+    records = []
+    try:
+        os.chdir(work_dir)
+        with ResourceMonitor() as monitor:
+            generate(rows, EXTRACT_PATH, seed=args.seed)
+        records.append({'stage': 'generate', 'rows': rows, **monitor.stats(), 'details': {}})
+        for stage in args.stages:
+            with ResourceMonitor(children=True) as monitor:
+                processed, details = run_stage(stage, rows, args)
+            records.append({'stage': stage, 'rows': processed, **monitor.stats(), 'details': details})
+            print(f"[{rows} rows] {stage}: {monitor.wall_seconds:.2f}s")
+    finally:
+        os.chdir(cwd)
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    return [{'run_id': run_id, 'timestamp': timestamp, 'size': rows, **record,
+             'rows_per_second': record['rows'] / record['wall_seconds'] if record['wall_seconds'] > 0 else None,
+             **env} for record in records]
+
+
+def append_results(records, path=RESULTS_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def load_results(path=RESULTS_PATH):
+    return pd.read_json(path, lines=True) if os.path.exists(path) else pd.DataFrame()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the pipeline on synthetic data at several sizes')
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help='Row counts, e.g. 100k 1M 10M 50M')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--models', nargs='+', default=None, help='Models for the training stage (default: all)')
+    parser.add_argument('--resamples', type=int, default=1000, help='Resamples for the permutation tests')
+    parser.add_argument('--workers', type=int, default=None, help='Cores for the parallel stages (default: all)')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='Rows per ingestion chunk')
+    parser.add_argument('--out-of-core-rows', type=int, default=OUT_OF_CORE_ROWS,
+                        help='Sizes above this use out-of-core preparation')
+    parser.add_argument('--work-dir', default=None, help='Keep the generated data here (default: temporary)')
+    parser.add_argument('--output', default=RESULTS_PATH, help='JSON Lines file the results are appended to')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    args.output = os.path.abspath(args.output)
+    args.work_dir = os.path.abspath(args.work_dir) if args.work_dir else None
+
+    run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    env = environment()
+    records = []
+    for size in args.sizes:
+        size_records = benchmark_size(parse_size(size), args, run_id, env)
+        append_results(size_records, args.output)
+        records.extend(size_records)
+
+    summary = pd.DataFrame(records).pivot(index='stage', columns='size', values='wall_seconds')
+    print(f"\nWall seconds by stage and size (run {run_id}, results appended to {args.output}):")
+    print(summary.reindex(['generate'] + args.stages).round(2).to_string())
@@ -1,7 +1,7 @@
-import pandas as pd
+from src.scripts.data_loader import load_data
 
-# Load Parquet file
-df = pd.read_parquet("data/insurance_data.parquet")
+# Load Parquet file (or the partitioned dataset when present)
+df = load_data()
 
 # Display basic info
 print("Data Info:")
@@ -1,32 +1,271 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import argparse
+import glob
+import hashlib
+import json
 import os
+import time
+from datetime import datetime
+import psutil
+from src.scripts.schema import DICTIONARY_COLUMNS, RAW_SCHEMA, to_arrow_table
+from src.scripts.data_loader import DATASET_DIR, PARTITIONING
+from src.scripts.instrumentation import Run, add_instrumentation_args, stage
 
 # Define file paths
 input_file = "C:/Users/Skyline/Insurance Risk Analytics/MachineLearningRating_v3.txt"
 output_file = "data/insurance_data.parquet"
-
-# Create data directory if it doesn't exist
-os.makedirs("data", exist_ok=True)
+dataset_dir = DATASET_DIR
 
 # Read the text file in chunks due to large size
 chunk_size = 10000  # Adjust based on memory capacity
-chunks = []
-for chunk in pd.read_csv(input_file, delimiter='|', chunksize=chunk_size, on_bad_lines='skip'):
-    # Convert TransactionMonth to datetime
-    chunk['TransactionMonth'] = pd.to_datetime(chunk['TransactionMonth'], errors='coerce')
-    
-    # Convert CapitalOutstanding to numeric, coercing errors to NaN
-    chunk['CapitalOutstanding'] = pd.to_numeric(chunk['CapitalOutstanding'], errors='coerce')
-    
-    # Handle other potential numeric columns with mixed types (add as needed based on data)
-    for col in ['SumInsured', 'CalculatedPremiumPerTerm', 'TotalPremium', 'TotalClaims']:
-        chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
-    
-    chunks.append(chunk)
-
-# Concatenate all chunks
-df = pd.concat(chunks, ignore_index=True)
-
-# Save to Parquet format
-df.to_parquet(output_file, index=False)
-print(f"Data converted and saved to {output_file}")
\ No newline at end of file
+
+
+# Function to read the pipe-delimited extract chunk by chunk
+def read_chunks(input_file, chunk_size=chunk_size, **kwargs):
+    return pd.read_csv(input_file, delimiter='|', chunksize=chunk_size, on_bad_lines='skip', **kwargs)
+
+
+# Function to convert the whole extract in memory (original behaviour)
+def convert_in_memory(input_file, output_file, chunk_size=chunk_size):
+    chunks = []
+    for chunk in read_chunks(input_file, chunk_size):
+        # Convert TransactionMonth to datetime
+        chunk['TransactionMonth'] = pd.to_datetime(chunk['TransactionMonth'], errors='coerce')
+
+        # Convert CapitalOutstanding to numeric, coercing errors to NaN
+        chunk['CapitalOutstanding'] = pd.to_numeric(chunk['CapitalOutstanding'], errors='coerce')
+
+        # Handle other potential numeric columns with mixed types (add as needed based on data)
+        for col in ['SumInsured', 'CalculatedPremiumPerTerm', 'TotalPremium', 'TotalClaims']:
+            chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+
+        chunks.append(chunk)
+
+    # Concatenate all chunks
+    df = pd.concat(chunks, ignore_index=True)
+
+    # Save to Parquet format
+    df.to_parquet(output_file, index=False)
+
+
+# Function to stream the extract into Parquet, one row group per chunk
+def convert_streaming(input_file, output_file, chunk_size=chunk_size):
+    process = psutil.Process()
+    peak_rss = process.memory_info().rss
+    rows = 0
+    row_groups = 0
+    start = time.perf_counter()
+    with pq.ParquetWriter(output_file, RAW_SCHEMA, compression='snappy',
+                          use_dictionary=DICTIONARY_COLUMNS) as writer:
+        for chunk in read_chunks(input_file, chunk_size, dtype=str, keep_default_na=True):
+            table = to_arrow_table(chunk)
+            writer.write_table(table, row_group_size=table.num_rows)
+            rows += table.num_rows
+            row_groups += 1
+            peak_rss = max(peak_rss, process.memory_info().rss)
+    elapsed = time.perf_counter() - start
+    stats = {
+        'rows': rows,
+        'row_groups': row_groups,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed > 0 else float('nan'),
+        'bytes_written': os.path.getsize(output_file),
+        'peak_rss_mb': peak_rss / 1024 ** 2
+    }
+    print(f"Streamed {stats['rows']} rows in {stats['row_groups']} row groups "
+          f"({stats['rows_per_second']:.0f} rows/s, {stats['bytes_written'] / 1024 ** 2:.1f} MB written, "
+          f"peak RSS {stats['peak_rss_mb']:.1f} MB)")
+    return stats
+
+
+# Schema of the partitioned dataset: TransactionMonth becomes a 'YYYY-MM' partition key
+PARTITIONED_SCHEMA = RAW_SCHEMA.set(RAW_SCHEMA.get_field_index('TransactionMonth'),
+                                    pa.field('TransactionMonth', pa.string()))
+
+
+# Function to turn a coerced chunk into a table keyed by month for partitioning
+def to_partitioned_table(chunk):
+    table = to_arrow_table(chunk)
+    idx = table.schema.get_field_index('TransactionMonth')
+    month = pc.strftime(table.column(idx), format='%Y-%m')
+    return table.set_column(idx, 'TransactionMonth', month)
+
+
+# Function to write a Hive-partitioned dataset (Province/TransactionMonth) in one streaming pass
+def convert_partitioned(input_file, dataset_dir, chunk_size=chunk_size, basename_template='part-{i}.parquet',
+                        existing_data_behavior='delete_matching'):
+    counts = {'rows': 0, 'months': set()}
+    written_files = []
+
+    def batches():
+        for chunk in read_chunks(input_file, chunk_size, dtype=str, keep_default_na=True):
+            table = to_partitioned_table(chunk)
+            counts['rows'] += table.num_rows
+            counts['months'].update(m for m in pc.unique(table.column('TransactionMonth')).to_pylist() if m)
+            yield from table.to_batches()
+
+    start = time.perf_counter()
+    file_format = ds.ParquetFileFormat()
+    ds.write_dataset(batches(), dataset_dir, schema=PARTITIONED_SCHEMA, format=file_format,
+                     partitioning=PARTITIONING,
+                     file_options=file_format.make_write_options(compression='snappy',
+                                                                 use_dictionary=DICTIONARY_COLUMNS),
+                     basename_template=basename_template, existing_data_behavior=existing_data_behavior,
+                     max_rows_per_group=max(chunk_size, 1024 * 64),
+                     file_visitor=lambda written: written_files.append(written.path))
+    elapsed = time.perf_counter() - start
+    bytes_written = sum(os.path.getsize(path) for path in written_files)
+    print(f"Wrote {counts['rows']} rows to partitioned dataset {dataset_dir} "
+          f"({counts['rows'] / elapsed if elapsed > 0 else float('nan'):.0f} rows/s, "
+          f"{bytes_written / 1024 ** 2:.1f} MB written)")
+    months = sorted(counts['months'])
+    return {'rows': counts['rows'], 'seconds': elapsed, 'bytes_written': bytes_written,
+            'files': written_files, 'months': [months[0], months[-1]] if months else []}
+
+
+# Manifest of source extracts already ingested into the partitioned dataset
+# (leading underscore keeps it out of Parquet dataset discovery)
+MANIFEST_NAME = '_ingest_manifest.json'
+
+
+def load_manifest(dataset_dir):
+    path = os.path.join(dataset_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'sources': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(dataset_dir, manifest):
+    os.makedirs(dataset_dir, exist_ok=True)
+    path = os.path.join(dataset_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+# Function to hash a source file without reading it into memory
+def file_sha256(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_entry(stat, sha256, stats, dataset_dir):
+    return {
+        'sha256': sha256,
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'rows': stats['rows'],
+        'months': stats['months'],
+        'files': [os.path.relpath(path, dataset_dir) for path in stats['files']],
+        'ingested_at': datetime.now().isoformat(timespec='seconds')
+    }
+
+
+# Function to (re)build the partitioned dataset from one extract and record it in the manifest, so a
+# later incremental run skips it instead of appending its rows again. Partitions the extract covers
+# are replaced; sources whose files were all replaced are dropped from the manifest.
+def build_partitioned(input_file, dataset_dir, chunk_size=chunk_size):
+    stat = os.stat(input_file)
+    sha256 = file_sha256(input_file)
+    stats = convert_partitioned(input_file, dataset_dir, chunk_size, basename_template=f'{sha256[:16]}-{{i}}.parquet')
+    manifest = load_manifest(dataset_dir)
+    for key, entry in list(manifest['sources'].items()):
+        entry['files'] = [path for path in entry['files'] if os.path.exists(os.path.join(dataset_dir, path))]
+        if not entry['files']:
+            del manifest['sources'][key]
+    manifest['sources'][os.path.abspath(input_file)] = _source_entry(stat, sha256, stats, dataset_dir)
+    save_manifest(dataset_dir, manifest)
+    return stats
+
+
+# Function to ingest only new or changed extracts into the partitioned dataset
+def ingest_incremental(input_files, dataset_dir, chunk_size=chunk_size):
+    if not os.path.exists(os.path.join(dataset_dir, MANIFEST_NAME)) and glob.glob(
+            os.path.join(dataset_dir, '**', '*.parquet'), recursive=True):
+        raise ValueError(f"{dataset_dir} holds data but no {MANIFEST_NAME}, so its sources are unknown and "
+                         f"would be appended twice; rebuild it with --partitioned, which records the manifest")
+    manifest = load_manifest(dataset_dir)
+    summary = {'ingested': [], 'replaced': [], 'skipped': []}
+    for input_file in input_files:
+        key = os.path.abspath(input_file)
+        stat = os.stat(input_file)
+        entry = manifest['sources'].get(key)
+
+        # Unchanged size and mtime: skip without rehashing the file
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            summary['skipped'].append(input_file)
+            continue
+        sha256 = file_sha256(input_file)
+        if entry and entry['sha256'] == sha256:
+            entry['mtime'] = stat.st_mtime
+            summary['skipped'].append(input_file)
+            continue
+
+        # Changed extract: drop the files written from its previous version
+        if entry:
+            for rel_path in entry['files']:
+                path = os.path.join(dataset_dir, rel_path)
+                if os.path.exists(path):
+                    os.remove(path)
+            summary['replaced'].append(input_file)
+        else:
+            summary['ingested'].append(input_file)
+
+        print(f"Ingesting {input_file}")
+        stats = convert_partitioned(input_file, dataset_dir, chunk_size,
+                                    basename_template=f'{sha256[:16]}-{{i}}.parquet',
+                                    existing_data_behavior='overwrite_or_ignore')
+        manifest['sources'][key] = _source_entry(stat, sha256, stats, dataset_dir)
+        save_manifest(dataset_dir, manifest)
+    print(f"Incremental ingest: {len(summary['ingested'])} new, {len(summary['replaced'])} changed, "
+          f"{len(summary['skipped'])} unchanged")
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert the pipe-delimited extract to Parquet')
+    parser.add_argument('--input', nargs='+', default=[input_file],
+                        help='Pipe-delimited source file(s); with --incremental also directories of extracts')
+    parser.add_argument('--output', default=None,
+                        help=f'Parquet output file (default {output_file}, or {dataset_dir} with --partitioned)')
+    parser.add_argument('--chunk-size', type=int, default=chunk_size, help='Rows per chunk / row group')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write each chunk straight to its own row group (bounded memory)')
+    parser.add_argument('--partitioned', action='store_true',
+                        help='Write a Hive-partitioned dataset by Province and TransactionMonth')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Add only new or changed extracts to the partitioned dataset')
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
+    args.output = args.output or (dataset_dir if args.partitioned or args.incremental else output_file)
+    if len(args.input) > 1 and not args.incremental:
+        parser.error('multiple inputs are only supported with --incremental')
+
+    # Create data directory if it doesn't exist
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+
+    with Run.from_args('convert_to_parquet', args):
+        if args.incremental:
+            input_files = []
+            for path in args.input:
+                input_files.extend(sorted(glob.glob(os.path.join(path, '*.txt'))) if os.path.isdir(path) else [path])
+            with stage('ingest_incremental') as current:
+                current.details = ingest_incremental(input_files, args.output, args.chunk_size)
+        elif args.partitioned:
+            with stage('convert_partitioned') as current:
+                current.rows = build_partitioned(args.input[0], args.output, args.chunk_size)['rows']
+        elif args.stream:
+            with stage('convert_streaming') as current:
+                current.rows = convert_streaming(args.input[0], args.output, args.chunk_size)['rows']
+        else:
+            with stage('convert_in_memory'):
+                convert_in_memory(args.input[0], args.output, args.chunk_size)
+    print(f"Data converted and saved to {args.output}")
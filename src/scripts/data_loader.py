@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import os
+from src.scripts.schema import COLUMN_ORDER
+
+# Default locations of the converted data
+DATA_PATH = 'data/insurance_data.parquet'
+DATASET_DIR = 'data/insurance_dataset'
+
+# Hive partition keys of the partitioned dataset (TransactionMonth stored as 'YYYY-MM')
+PARTITION_COLUMNS = ['Province', 'TransactionMonth']
+PARTITIONING = ds.partitioning(pa.schema([(col, pa.string()) for col in PARTITION_COLUMNS]), flavor='hive')
+
+
+# Function to pick the partitioned dataset when present, else the single Parquet file
+def default_data_path():
+    return DATASET_DIR if os.path.isdir(DATASET_DIR) else DATA_PATH
+
+
+# Function to express TransactionMonth filter values in the type stored at path
+def _normalize_month_value(value, partitioned):
+    if isinstance(value, (list, tuple, set)):
+        return [_normalize_month_value(v, partitioned) for v in value]
+    month = pd.Timestamp(value)
+    return month.strftime('%Y-%m') if partitioned else month
+
+
+def _normalize_filters(filters, partitioned):
+    # An empty list means no filter, like None
+    if not filters:
+        return None
+    # Accept a flat list of conjunctions or a list of disjunctions of conjunctions (DNF)
+    nested = isinstance(filters[0], list)
+    groups = filters if nested else [filters]
+    normalized = []
+    for group in groups:
+        terms = []
+        for col, op, value in group:
+            if col == 'TransactionMonth':
+                value = _normalize_month_value(value, partitioned)
+            terms.append((col, op, value))
+        normalized.append(terms)
+    return normalized if nested else normalized[0]
+
+
+# Function to read the needed columns and rows as an Arrow table, pushing filters down to files and row groups
+def read_table(path=None, columns=None, filters=None):
+    path = path or default_data_path()
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Data file not found at {path}")
+    partitioned = os.path.isdir(path)
+    filters = _normalize_filters(filters, partitioned)
+    if partitioned:
+        dataset = ds.dataset(path, format='parquet', partitioning=PARTITIONING)
+        expression = pq.filters_to_expression(filters) if filters else None
+        table = dataset.to_table(columns=columns, filter=expression)
+        if columns is None:
+            # Partition keys come back last; restore the extract's column order
+            names = [col for col in COLUMN_ORDER if col in table.column_names]
+            table = table.select(names + [col for col in table.column_names if col not in names])
+    else:
+        table = pq.read_table(path, columns=columns, filters=filters)
+    return table, partitioned
+
+
+# Function to convert one Arrow column to pandas, parsing partition-key months back to dates
+def _column_to_pandas(table, name, partitioned):
+    series = table.column(name).to_pandas()
+    if partitioned and name == 'TransactionMonth':
+        series = pd.to_datetime(series, format='%Y-%m', errors='coerce')
+    return series.rename(name)
+
+
+# Function to load only the needed columns and rows
+def load_data(path=None, columns=None, filters=None):
+    table, partitioned = read_table(path, columns, filters)
+    df = table.to_pandas()
+    if partitioned and 'TransactionMonth' in df.columns:
+        df['TransactionMonth'] = pd.to_datetime(df['TransactionMonth'], format='%Y-%m', errors='coerce')
+    return df
+
+
+# Largest integer magnitude a float32 represents exactly
+FLOAT32_EXACT_INT = 2 ** 24
+
+
+# Function to shrink one column to the smallest safe dtype
+def downcast_series(series, max_category_ratio=0.5):
+    if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(series) \
+            or pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if series.dtype == object:
+        # Strings become categories unless nearly every value is distinct
+        if series.nunique(dropna=True) <= max_category_ratio * max(len(series), 1):
+            return series.astype('category')
+        return series
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna().to_numpy()
+        if len(values) > 0 and np.all(values == np.round(values)) and np.abs(values).max() > FLOAT32_EXACT_INT:
+            # Large integer codes (e.g. mmcode) would lose digits in float32
+            return series
+        return series.astype('float32')
+    return series
+
+
+def _column_memory(series):
+    return series.dtype, series.memory_usage(index=False, deep=True)
+
+
+# Function to print per-column memory before and after dtype optimization
+def memory_report(before, after):
+    report = pd.DataFrame({
+        'dtype_before': {col: str(dtype) for col, (dtype, _) in before.items()},
+        'MB_before': {col: nbytes / 1024 ** 2 for col, (_, nbytes) in before.items()},
+        'dtype_after': {col: str(dtype) for col, (dtype, _) in after.items()},
+        'MB_after': {col: nbytes / 1024 ** 2 for col, (_, nbytes) in after.items()},
+    })
+    total_before = report['MB_before'].sum()
+    total_after = report['MB_after'].sum()
+    print("Memory usage by column:")
+    print(report.round(2).to_string())
+    print(f"Total: {total_before:.1f} MB -> {total_after:.1f} MB "
+          f"({100 * (1 - total_after / total_before) if total_before else 0:.0f}% saved)")
+    return report
+
+
+# Function to downcast every column of an in-memory frame, optionally reporting memory
+def optimize_dtypes(df, report=False):
+    before, after = {}, {}
+    for col in df.columns:
+        before[col] = _column_memory(df[col])
+        df[col] = downcast_series(df[col])
+        after[col] = _column_memory(df[col])
+    if report:
+        memory_report(before, after)
+    return df
+
+
+# Function to load data with categories and downcast numerics, converting one column at a time
+# so the untyped frame is never materialized in full
+def load_typed(path=None, columns=None, filters=None, report=True):
+    table, partitioned = read_table(path, columns, filters)
+    before, after, typed = {}, {}, {}
+    for name in table.column_names:
+        series = _column_to_pandas(table, name, partitioned)
+        before[name] = _column_memory(series)
+        typed[name] = downcast_series(series)
+        after[name] = _column_memory(typed[name])
+        del series
+    del table
+    df = pd.DataFrame(typed)
+    if report:
+        memory_report(before, after)
+    return df
+
+
+# Function to stream record batches of the needed columns and rows as pandas frames
+def iter_batches(path=None, columns=None, filters=None, batch_size=64 * 1024):
+    path = path or default_data_path()
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Data file not found at {path}")
+    partitioned = os.path.isdir(path)
+    filters = _normalize_filters(filters, partitioned)
+    dataset = ds.dataset(path, format='parquet', partitioning=PARTITIONING if partitioned else None)
+    expression = pq.filters_to_expression(filters) if filters else None
+    for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=batch_size):
+        if batch.num_rows == 0:
+            continue
+        df = batch.to_pandas()
+        if partitioned and 'TransactionMonth' in df.columns:
+            df['TransactionMonth'] = pd.to_datetime(df['TransactionMonth'], format='%Y-%m', errors='coerce')
+        yield df
@@ -0,0 +1,292 @@
+import pandas as pd
+import numpy as np
+import pyarrow.dataset as ds
+import os
+import pickle
+from collections import Counter
+from src.scripts.data_loader import PARTITIONING, default_data_path, iter_batches
+from src.scripts.monitoring import merge_moments
+from src.scripts.sketches import ColumnSummaries, QuantileSketch
+
+# Aggregates every EDA figure is drawn from, built in one pass over the full data
+AGGREGATE_PATH = 'data/eda_aggregates.pkl'
+
+KEY_NUMERICAL = ['TotalPremium', 'TotalClaims', 'CalculatedPremiumPerTerm', 'CapitalOutstanding']
+KEY_CATEGORICAL = ['Province', 'CoverType', 'make']
+CROSSTAB = ('Province', 'CoverType')
+TOTALS = ['TotalPremium', 'TotalClaims']
+
+# Value column and grouping columns of the grouped box plots
+BOX_GROUPS = [('TotalPremium', ('Province',)), ('TotalClaims', ('Province', 'make')), ('TotalClaims', ('make',))]
+
+# Two-column scatters drawn as binned densities: optional group column (the top groups get their own
+# panel, the rest share 'other') and log axes (bins on sign(v) * log1p(|v|), for heavy tails and zeros)
+DENSITY_PLOTS = [
+    {'name': 'premium_vs_claims_by_zip', 'x': 'TotalPremium', 'y': 'TotalClaims', 'group': 'PostalCode', 'log': True}
+]
+
+# Fixed bins over the column's min/max (from the Parquet row-group statistics)
+HIST_BINS = 100
+DENSITY_BINS = 200
+
+# Sketch sizes: whole-column sketches back describe(), the smaller per-group ones only the box plots
+SKETCH_K = 512
+GROUP_SKETCH_K = 128
+
+
+# Function to read min/max of numeric columns from Parquet row-group statistics (no data is read);
+# columns without statistics fall back to a scan of those columns only
+def column_ranges(path=None, columns=KEY_NUMERICAL):
+    path = path or default_data_path()
+    dataset = ds.dataset(path, format='parquet', partitioning=PARTITIONING if os.path.isdir(path) else None)
+    columns = [col for col in columns if col in dataset.schema.names]
+    ranges, complete = {}, set(columns)
+    for fragment in dataset.get_fragments():
+        fragment.ensure_complete_metadata()
+        for row_group in fragment.row_groups:
+            statistics = row_group.statistics or {}
+            for col in columns:
+                if row_group.num_rows and 'min' not in statistics.get(col, {}):
+                    complete.discard(col)
+                    continue
+                low, high = ranges.get(col, (np.inf, -np.inf))
+                stats = statistics.get(col, {})
+                ranges[col] = (min(low, stats.get('min', np.inf)), max(high, stats.get('max', -np.inf)))
+    scanned = [col for col in columns if col not in complete]
+    if scanned:
+        ranges.update({col: (np.inf, -np.inf) for col in scanned})
+        for batch in iter_batches(path, columns=scanned):
+            for col in scanned:
+                ranges[col] = (min(ranges[col][0], batch[col].min()), max(ranges[col][1], batch[col].max()))
+    # An empty or constant column still gets a valid (unit-width) range
+    return {col: (float(low), float(high) if high > low else float(low) + 1.0) if np.isfinite(low) else (0.0, 1.0)
+            for col, (low, high) in ranges.items()}
+
+
+def signed_log1p(values):
+    return np.sign(values) * np.log1p(np.abs(values))
+
+
+def signed_expm1(values):
+    return np.sign(values) * np.expm1(np.abs(values))
+
+
+# Function to map values to equal-width bins over [low, high] (clipped into the edge bins)
+def bin_index(values, low, high, bins):
+    index = np.floor((values - low) / (high - low) * bins)
+    return np.clip(index, 0, bins - 1).astype(np.int64)
+
+
+# Binned 2D density of two columns: a dense grid of all rows plus sparse per-group cell counts, so
+# memory is bounded by occupied cells and rendering cost does not depend on the row count
+class DensityGrid:
+    def __init__(self, x, y, ranges, bins=DENSITY_BINS, group=None, log=False):
+        self.x, self.y, self.group, self.log, self.bins = x, y, group, log, bins
+        self.limits = [tuple(self._transform(np.asarray(ranges[col], dtype='float64'))) for col in (x, y)]
+        self.grid = np.zeros((bins, bins))
+        self.group_counts = None
+
+    def _transform(self, values):
+        return signed_log1p(values) if self.log else values
+
+    def update(self, df):
+        if not {self.x, self.y} <= set(df.columns):
+            return self
+        x = df[self.x].to_numpy(dtype='float64', na_value=np.nan)
+        y = df[self.y].to_numpy(dtype='float64', na_value=np.nan)
+        present = ~(np.isnan(x) | np.isnan(y))
+        cells = (bin_index(self._transform(x[present]), *self.limits[0], self.bins) * self.bins
+                 + bin_index(self._transform(y[present]), *self.limits[1], self.bins))
+        self.grid += np.bincount(cells, minlength=self.bins ** 2).reshape(self.bins, self.bins)
+        if self.group and self.group in df.columns:
+            keys = pd.DataFrame({'group': df[self.group].to_numpy()[present], 'cell': cells})
+            counts = keys.groupby(['group', 'cell'], observed=True).size().astype('float64')
+            self.group_counts = counts if self.group_counts is None else self.group_counts.add(counts, fill_value=0)
+        return self
+
+    # Function to return the bin edges in data units (log bins mapped back)
+    def edges(self):
+        edges = [np.linspace(low, high, self.bins + 1) for low, high in self.limits]
+        return [signed_expm1(edge) for edge in edges] if self.log else edges
+
+    # Function to return the grids to draw: all rows, or the top groups by rows plus 'other'
+    def grids(self, top=None):
+        if top is None or self.group_counts is None:
+            return {'all': self.grid}
+        totals = self.group_counts.groupby(level='group').sum().sort_values(ascending=False, kind='stable')
+        grids = {}
+        for group in totals.index[:top]:
+            grid = np.zeros(self.bins ** 2)
+            cells = self.group_counts.xs(group, level='group')
+            grid[cells.index.to_numpy()] = cells.to_numpy()
+            grids[group] = grid.reshape(self.bins, self.bins)
+        # Groups outside the top (and rows with no group) share one panel
+        other = self.grid - sum(grids.values())
+        if other.sum() > 0:
+            grids['other'] = other
+        return grids
+
+
+# Streaming EDA aggregates: column summaries (missing counts, frequencies, quantile sketches), moments,
+# fixed-bin histograms, per-group sketches for box plots, a crosstab, Pearson sums, monthly and
+# per-province totals and binned densities of DENSITY_PLOTS. Memory is bounded by the number of groups.
+class EdaAggregates:
+    def __init__(self, ranges, bins=HIST_BINS, density_bins=DENSITY_BINS, k=SKETCH_K, group_k=GROUP_SKETCH_K):
+        self.ranges = ranges
+        self.group_k = group_k
+        self.summaries = ColumnSummaries(k)
+        self.moments = {}
+        self.edges = {col: np.linspace(*ranges[col], bins + 1) for col in KEY_NUMERICAL if col in ranges}
+        self.histograms = {col: np.zeros(bins) for col in self.edges}
+        self.groups = {spec: {} for spec in BOX_GROUPS}
+        self.crosstab = Counter()
+        self.correlation_sums = None
+        self.monthly = pd.DataFrame(columns=TOTALS, dtype='float64')
+        self.province_totals = pd.DataFrame(columns=TOTALS, dtype='float64')
+        self.densities = {spec['name']: DensityGrid(spec['x'], spec['y'], ranges, density_bins, spec.get('group'),
+                                                    spec.get('log', False))
+                          for spec in DENSITY_PLOTS if {spec['x'], spec['y']} <= set(ranges)}
+
+    def update(self, df):
+        self.summaries.update(df)
+        for col in df.select_dtypes(include=['number']).columns:
+            values = df[col].to_numpy(dtype='float64', na_value=np.nan)
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                continue
+            batch = (len(values), values.mean(), ((values - values.mean()) ** 2).sum(), values.min(), values.max())
+            stored = self.moments.get(col, (0, np.nan, 0.0, np.inf, -np.inf))
+            count, mean, m2 = merge_moments(*stored[:3], *batch[:3])
+            self.moments[col] = (count, float(mean), float(m2), min(stored[3], batch[3]), max(stored[4], batch[4]))
+            if col in self.histograms:
+                self.histograms[col] += np.histogram(values, self.edges[col])[0]
+
+        for value_col, group_cols in BOX_GROUPS:
+            if value_col not in df.columns or not set(group_cols) <= set(df.columns):
+                continue
+            values = df[value_col].to_numpy(dtype='float64', na_value=np.nan)
+            groups = self.groups[(value_col, group_cols)]
+            for key, index in df.groupby(list(group_cols), observed=True, sort=False).indices.items():
+                group_values = values[index]
+                group_values = group_values[~np.isnan(group_values)]
+                if len(group_values) == 0:
+                    continue
+                sketch, low, high = groups.get(key, (QuantileSketch(self.group_k), np.inf, -np.inf))
+                groups[key] = (sketch.update(group_values), min(low, group_values.min()), max(high, group_values.max()))
+
+        if set(CROSSTAB) <= set(df.columns):
+            self.crosstab.update(df.groupby(list(CROSSTAB), observed=True).size().to_dict())
+        self._update_correlation(df)
+        if set(TOTALS) <= set(df.columns):
+            if 'TransactionMonth' in df.columns:
+                self.monthly = self.monthly.add(df.groupby('TransactionMonth')[TOTALS].sum(), fill_value=0)
+            if 'Province' in df.columns:
+                self.province_totals = self.province_totals.add(
+                    df.groupby('Province', observed=True)[TOTALS].sum(), fill_value=0)
+        for density in self.densities.values():
+            density.update(df)
+        return self
+
+    # Pairwise-complete sums for Pearson correlation, centred on the first batch's means for stability
+    def _update_correlation(self, df):
+        columns = [col for col in KEY_NUMERICAL if col in df.columns]
+        X = df[columns].to_numpy(dtype='float64', na_value=np.nan)
+        if self.correlation_sums is None:
+            shift = np.nan_to_num(np.nanmean(X, axis=0)) if len(X) else np.zeros(len(columns))
+            size = (len(columns), len(columns))
+            self.correlation_sums = {'columns': columns, 'shift': shift, 'n': np.zeros(size), 'sx': np.zeros(size),
+                                     'sxx': np.zeros(size), 'sxy': np.zeros(size)}
+        sums = self.correlation_sums
+        present = (~np.isnan(X)).astype('float64')
+        X = np.nan_to_num(X - sums['shift'])
+        # [i, j] entries are over rows where both columns i and j are present
+        sums['n'] += present.T @ present
+        sums['sx'] += X.T @ present
+        sums['sxx'] += (X ** 2).T @ present
+        sums['sxy'] += X.T @ X
+
+    def n_rows(self):
+        return self.summaries.n_rows
+
+    def dtypes(self):
+        return pd.Series(self.summaries.dtypes)
+
+    def missing_counts(self):
+        return self.summaries.missing_counts()
+
+    def value_counts(self, col):
+        return self.summaries.value_counts(col).sort_values(ascending=False)
+
+    # Function to rebuild DataFrame.describe() for the numeric columns (quartiles from the sketches)
+    def describe(self):
+        stats = {}
+        for col, (count, mean, m2, low, high) in self.moments.items():
+            sketch = self.summaries.sketches[col]
+            stats[col] = {'count': count, 'mean': mean, 'std': np.sqrt(m2 / (count - 1)) if count > 1 else np.nan,
+                          'min': low, '25%': sketch.quantile(0.25), '50%': sketch.quantile(0.5),
+                          '75%': sketch.quantile(0.75), 'max': high}
+        return pd.DataFrame(stats)
+
+    def histogram(self, col):
+        return self.histograms[col], self.edges[col]
+
+    def correlation(self):
+        sums = self.correlation_sums
+        n, sx, sxx, sxy = sums['n'], sums['sx'], sums['sxx'], sums['sxy']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = n * sxy - sx * sx.T
+            variance = n * sxx - sx ** 2
+            corr = covariance / np.sqrt(variance * variance.T)
+        return pd.DataFrame(corr, index=sums['columns'], columns=sums['columns'])
+
+    def crosstab_table(self):
+        counts = pd.Series(self.crosstab, dtype='int64')
+        return counts.unstack(fill_value=0) if len(counts) else pd.DataFrame()
+
+    # Function to build matplotlib bxp() stats per group from its sketch: whiskers at 1.5 IQR clipped
+    # to the observed range, with the group min/max drawn as fliers when they fall outside
+    def box_stats(self, value_col, group_cols=None, groups=None):
+        if group_cols is None:
+            sketches = {value_col: (self.summaries.sketches[value_col], *self.moments[value_col][3:])}
+        else:
+            sketches = self.groups[(value_col, tuple(group_cols))]
+        stats = []
+        for key in (groups if groups is not None else sorted(sketches)):
+            if key not in sketches:
+                continue
+            sketch, low, high = sketches[key]
+            q1, median, q3 = (sketch.quantile(q) for q in (0.25, 0.5, 0.75))
+            whislo, whishi = max(low, q1 - 1.5 * (q3 - q1)), min(high, q3 + 1.5 * (q3 - q1))
+            stats.append({'label': key, 'q1': q1, 'med': median, 'q3': q3, 'whislo': whislo, 'whishi': whishi,
+                          'fliers': [value for value in (low, high) if value < whislo or value > whishi]})
+        return stats
+
+    def monthly_totals(self):
+        return self.monthly.sort_index()
+
+    # Portfolio loss ratio (claims / premium summed per province)
+    def loss_ratio_by_province(self):
+        totals = self.province_totals.sort_index()
+        return (totals['TotalClaims'] / totals['TotalPremium'].where(totals['TotalPremium'] != 0)).rename('LossRatio')
+
+    def save(self, path=AGGREGATE_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path=AGGREGATE_PATH):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+# Function to build the EDA aggregates in one streaming pass over the Parquet row groups
+def aggregate(path=None, output=AGGREGATE_PATH, batch_size=64 * 1024):
+    density_columns = [spec[axis] for spec in DENSITY_PLOTS for axis in ('x', 'y')]
+    aggregates = EdaAggregates(column_ranges(path, list(dict.fromkeys(KEY_NUMERICAL + density_columns))))
+    for batch in iter_batches(path, batch_size=batch_size):
+        aggregates.update(batch)
+    if output:
+        aggregates.save(output)
+        print(f"Aggregated {aggregates.n_rows()} rows into {output} ({os.path.getsize(output) / 1024:.0f} KB)")
+    return aggregates
@@ -1,175 +1,296 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
+import argparse
 import os
+from src.scripts.eda_aggregates import (AGGREGATE_PATH, DENSITY_PLOTS, KEY_CATEGORICAL, KEY_NUMERICAL, EdaAggregates,
+                                        aggregate)
+from src.scripts.figures import FigureJob, render_figures
+from src.scripts.instrumentation import Run, add_instrumentation_args, stage
 
-# Load Parquet data with sampling to reduce memory usage
-df = pd.read_parquet("data/insurance_data.parquet").sample(frac=0.1, random_state=42)  # Use 10% of data
-
-# Define visualization directory
-viz_dir = "C:/Users/Skyline/Insurance Risk Analytics/visualization"
-os.makedirs(viz_dir, exist_ok=True)
-
-# 1.1 Data Summarization
-print("=== Data Summarization ===")
-print("\nData Structure (dtypes):")
-print(df.dtypes)
-
-print("\nDescriptive Statistics for Numerical Features:")
-numerical_cols = df.select_dtypes(include=['int64', 'float64']).columns
-print(df[numerical_cols].describe())
-
-# Save descriptive stats to file
-os.makedirs("data", exist_ok=True)
-df[numerical_cols].describe().to_csv("data/descriptive_stats.csv")
-
-# 1.2 Data Quality Assessment
-print("\n=== Data Quality Assessment ===")
-print("\nMissing Values:")
-print(df.isnull().sum())
-
-# 1.3 Univariate Analysis
-print("\n=== Univariate Analysis ===")
-# Select key numerical columns for histograms
-key_numerical_cols = ['TotalPremium', 'TotalClaims', 'CalculatedPremiumPerTerm', 'CapitalOutstanding']
-for col in key_numerical_cols:
-    plt.figure(figsize=(8, 6))
-    sns.histplot(data=df, x=col, kde=True, color='skyblue')
-    plt.title(f'Distribution of {col}', fontsize=14)
-    plt.xlabel(col, fontsize=12)
-    plt.ylabel('Count', fontsize=12)
-    plt.savefig(f'{viz_dir}/{col}_hist.png')
-    plt.close()
-
-# Select key categorical columns for bar charts
-key_categorical_cols = ['Province', 'CoverType', 'make']
-for col in key_categorical_cols:
-    plt.figure(figsize=(10, 6))
-    sns.countplot(data=df, x=col, palette='viridis')
-    plt.title(f'Count of {col}', fontsize=14)
-    plt.xlabel(col, fontsize=12)
-    plt.ylabel('Count', fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.savefig(f'{viz_dir}/{col}_count.png')
-    plt.close()
-
-# 1.4 Bivariate/Multivariate Analysis
-print("\n=== Bivariate/Multivariate Analysis ===")
-# Scatter plot of TotalPremium vs TotalClaims by PostalCode
-if 'PostalCode' in df.columns and 'TotalPremium' in df.columns and 'TotalClaims' in df.columns:
-    plt.figure(figsize=(10, 6))
-    sns.scatterplot(data=df, x='TotalPremium', y='TotalClaims', hue='PostalCode', palette='deep', s=100, alpha=0.6)
-    plt.title('TotalPremium vs TotalClaims by PostalCode', fontsize=14)
-    plt.xlabel('TotalPremium', fontsize=12)
-    plt.ylabel('TotalClaims', fontsize=12)
-    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.tight_layout()
-    plt.savefig(f'{viz_dir}/premium_vs_claims_by_zip.png')
-    plt.close()
-
-# Correlation Matrix for key numerical columns
-plt.figure(figsize=(12, 8))
-sns.heatmap(df[key_numerical_cols].corr(), annot=True, cmap='coolwarm', fmt='.2f', linewidths=0.5)
-plt.title('Correlation Matrix of Key Numerical Features', fontsize=14)
-plt.savefig(f'{viz_dir}/correlation_matrix.png')
-plt.close()
-
-# 1.5 Data Comparison - Trends Over Geography
-print("\n=== Data Comparison - Trends Over Geography ===")
-if 'Province' in df.columns:
-    # Box plot for TotalPremium by Province
-    plt.figure(figsize=(12, 6))
-    sns.boxplot(data=df, x='Province', y='TotalPremium', palette='muted')
-    plt.title('TotalPremium by Province', fontsize=14)
-    plt.xlabel('Province', fontsize=12)
-    plt.ylabel('TotalPremium', fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.savefig(f'{viz_dir}/premium_by_province.png')
-    plt.close()
-
-    # Count plot for CoverType by Province
-    if 'CoverType' in df.columns:
-        plt.figure(figsize=(12, 6))
-        sns.countplot(data=df, x='Province', hue='CoverType', palette='Set2')
-        plt.title('CoverType Distribution by Province', fontsize=14)
-        plt.xlabel('Province', fontsize=12)
-        plt.ylabel('Count', fontsize=12)
-        plt.xticks(rotation=45, ha='right')
-        plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-        plt.tight_layout()
-        plt.savefig(f'{viz_dir}/covertype_by_province.png')
-        plt.close()
-
-    # Box plot for make by Province
-    if 'make' in df.columns:
-        plt.figure(figsize=(12, 6))
-        sns.boxplot(data=df, x='Province', y='TotalClaims', hue='make', palette='Paired')
-        plt.title('TotalClaims by Province and Make', fontsize=14)
-        plt.xlabel('Province', fontsize=12)
-        plt.ylabel('TotalClaims', fontsize=12)
+# Default visualization directory
+VIZ_DIR = "C:/Users/Skyline/Insurance Risk Analytics/visualization"
+
+# Makes shown in the make box plots (every make would be unreadable on the full book)
+TOP_MAKES = 10
+
+# Groups (e.g. zip codes) with their own density panel; the rest are drawn together as 'other'
+TOP_GROUPS = 5
+
+
+# Function to smooth a histogram with a Gaussian kernel (binned KDE, Silverman bandwidth), scaled to counts
+def binned_kde(counts, edges, std, n):
+    width = edges[1] - edges[0]
+    sigma = 1.06 * std * n ** -0.2 / width if n > 1 and std > 0 else 0
+    if sigma < 0.5:
+        return counts
+    radius = int(min(4 * sigma, (len(counts) - 1) // 2))
+    kernel = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+    return np.convolve(counts, kernel / kernel.sum(), mode='same')
+
+
+# Function to label the current axes from a figure's style
+def _labels(style, rotate=False):
+    import matplotlib.pyplot as plt
+    plt.title(style['title'], fontsize=style.get('title_size', 14), fontweight=style.get('title_weight', 'normal'))
+    plt.xlabel(style.get('xlabel', ''), fontsize=12)
+    plt.ylabel(style.get('ylabel', ''), fontsize=12)
+    if rotate:
         plt.xticks(rotation=45, ha='right')
-        plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+
+
+# Function to draw precomputed box statistics with one colour per box
+def draw_boxes(ax, stats, colors, positions=None, widths=0.6):
+    boxes = ax.bxp(stats, positions=positions, widths=widths, patch_artist=True, flierprops={'markersize': 3})
+    for patch, color in zip(boxes['boxes'], colors):
+        patch.set_facecolor(color)
+    return boxes
+
+
+# Plot functions of the figure jobs: each draws one figure from its slice of the aggregates
+def plot_histogram(data, style):
+    import matplotlib.pyplot as plt
+    counts, edges = data['counts'], data['edges']
+    plt.stairs(counts, edges, fill=True, color=style['color'], edgecolor='white')
+    plt.plot((edges[:-1] + edges[1:]) / 2, binned_kde(counts, edges, data['std'], data['n']), color=style['line_color'])
+    _labels(style)
+
+
+def plot_bars(data, style):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    values = data['values']
+    plt.bar(values.index.astype(str), values.to_numpy(), color=sns.color_palette(style['palette'], len(values)))
+    if style.get('annotate'):
+        for i, v in enumerate(values):
+            plt.text(i, v, f'{v:.2f}', ha='center', va='bottom')
+    _labels(style, rotate=True)
+    plt.tight_layout()
+
+
+# Binned density of two columns, one panel per group on a shared colour scale (log counts by default)
+def plot_density(data, style):
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LogNorm, Normalize
+    grids = data['grids']
+    ncols = min(3, len(grids))
+    nrows = -(-len(grids) // ncols)
+    fig = plt.gcf()
+    axes = np.atleast_1d(fig.subplots(nrows, ncols, sharex=True, sharey=True, squeeze=False)).ravel()
+    vmax = max(grid.max() for grid in grids.values())
+    norm = LogNorm(1, max(vmax, 1)) if style.get('log_counts', True) else Normalize(0, vmax)
+    for ax, (label, grid) in zip(axes, grids.items()):
+        mesh = ax.pcolormesh(data['xedges'], data['yedges'], np.where(grid > 0, grid, np.nan).T, cmap=style['cmap'],
+                             norm=norm)
+        if style.get('log_axes'):
+            ax.set_xscale('symlog', linthresh=1)
+            ax.set_yscale('symlog', linthresh=1)
+        if len(grids) > 1:
+            ax.set_title(label if label == 'other' else f"{style['group_label']} {label}", fontsize=11)
+    for ax in axes[len(grids):]:
+        ax.set_visible(False)
+    for ax in axes[(nrows - 1) * ncols:]:
+        ax.set_xlabel(style['xlabel'], fontsize=12)
+    for ax in axes[::ncols]:
+        ax.set_ylabel(style['ylabel'], fontsize=12)
+    fig.suptitle(style['title'], fontsize=14)
+    fig.tight_layout()
+    fig.colorbar(mesh, ax=list(axes[:len(grids)]), label='Policies')
+
+
+def plot_heatmap(data, style):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.heatmap(data['matrix'], annot=True, cmap=style['cmap'], fmt='.2f', linewidths=0.5)
+    plt.title(style['title'], fontsize=14)
+
+
+def plot_boxes(data, style):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    stats = data['stats']
+    colors = [style['color']] * len(stats) if 'color' in style else sns.color_palette(style['palette'], len(stats))
+    draw_boxes(plt.gca(), stats, colors)
+    if len(stats) == 1:
+        plt.xticks([])
+    _labels(style, rotate=len(stats) > 1)
+    if len(stats) > 1:
         plt.tight_layout()
-        plt.savefig(f'{viz_dir}/claims_by_province_make.png')
-        plt.close()
-
-# 1.6 Outlier Detection
-print("\n=== Outlier Detection ===")
-for col in key_numerical_cols:
-    plt.figure(figsize=(8, 6))
-    sns.boxplot(data=df, y=col, color='lightcoral')
-    plt.title(f'Box Plot of {col} (Outlier Detection)', fontsize=14)
-    plt.ylabel(col, fontsize=12)
-    plt.savefig(f'{viz_dir}/{col}_boxplot.png')
-    plt.close()
-
-# 1.7 Creative Visualizations
-print("\n=== Creative Visualizations ===")
-# Insight 1: Loss Ratio by Province
-if 'TotalClaims' in df.columns and 'TotalPremium' in df.columns and 'Province' in df.columns:
-    df['LossRatio'] = df['TotalClaims'] / df['TotalPremium']
-    plt.figure(figsize=(12, 6))
-    sns.barplot(data=df, x='Province', y='LossRatio', palette='magma', ci=None)
-    plt.title('Average Loss Ratio by Province', fontsize=16, fontweight='bold')
-    plt.xlabel('Province', fontsize=12)
-    plt.ylabel('Loss Ratio', fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    for i, v in enumerate(df.groupby('Province')['LossRatio'].mean()):
-        plt.text(i, v, f'{v:.2f}', ha='center', va='bottom')
+
+
+def plot_grouped_bars(data, style):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    table = data['table']
+    table.plot(kind='bar', ax=plt.gca(), width=0.8, color=sns.color_palette(style['palette'], table.shape[1]))
+    _labels(style, rotate=True)
+    plt.legend(title=style['legend_title'], bbox_to_anchor=(1.05, 1), loc='upper left')
     plt.tight_layout()
-    plt.savefig(f'{viz_dir}/loss_ratio_by_province.png')
-    plt.close()
-
-# Insight 2: TotalClaims by Make (Top 10 Makes)
-if 'make' in df.columns:
-    top_makes = df['make'].value_counts().nlargest(10).index
-    df_top = df[df['make'].isin(top_makes)]
-    plt.figure(figsize=(12, 6))
-    sns.boxplot(data=df_top, x='make', y='TotalClaims', palette='Blues_r')
-    plt.title('Total Claims Distribution by Top 10 Makes', fontsize=16, fontweight='bold')
-    plt.xlabel('Make', fontsize=12)
-    plt.ylabel('TotalClaims', fontsize=12)
-    plt.xticks(rotation=45, ha='right')
+
+
+# Box plots of several hue levels side by side within each x category
+def plot_grouped_boxes(data, style):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from matplotlib.patches import Patch
+    categories, hues = data['categories'], list(data['stats'])
+    colors = dict(zip(hues, sns.color_palette(style['palette'], len(hues))))
+    width = 0.8 / len(hues)
+    ax = plt.gca()
+    for j, hue in enumerate(hues):
+        stats = data['stats'][hue]
+        positions = [categories.index(stat['label'][0]) + (j - (len(hues) - 1) / 2) * width for stat in stats]
+        draw_boxes(ax, stats, [colors[hue]] * len(stats), positions, width * 0.9)
+    ax.set_xticks(range(len(categories)), categories)
+    _labels(style, rotate=True)
+    ax.legend([Patch(color=color) for color in colors.values()], hues, title=style['legend_title'],
+              bbox_to_anchor=(1.05, 1), loc='upper left')
     plt.tight_layout()
-    plt.savefig(f'{viz_dir}/claims_by_top_makes.png')
-    plt.close()
-
-# Insight 3: Premium vs Claims Trend Over Time
-if 'TransactionMonth' in df.columns:
-    df_time = df.groupby('TransactionMonth')[['TotalPremium', 'TotalClaims']].sum().reset_index()
-    plt.figure(figsize=(12, 6))
-    plt.plot(df_time['TransactionMonth'], df_time['TotalPremium'], label='Total Premium', color='teal', marker='o')
-    plt.plot(df_time['TransactionMonth'], df_time['TotalClaims'], label='Total Claims', color='coral', marker='o')
-    plt.title('Trend of Total Premium and Claims Over Time', fontsize=16, fontweight='bold')
-    plt.xlabel('Transaction Month', fontsize=12)
-    plt.ylabel('Amount', fontsize=12)
+
+
+def plot_trend(data, style):
+    import matplotlib.pyplot as plt
+    monthly = data['monthly']
+    plt.plot(monthly.index, monthly['TotalPremium'], label='Total Premium', color='teal', marker='o')
+    plt.plot(monthly.index, monthly['TotalClaims'], label='Total Claims', color='coral', marker='o')
+    _labels(style)
     plt.legend()
     plt.xticks(rotation=45)
     plt.grid(True, linestyle='--', alpha=0.7)
     plt.tight_layout()
-    plt.savefig(f'{viz_dir}/premium_claims_trend.png')
-    plt.close()
 
-print("\nEDA completed. Check the 'visualization' directory for plots.")
\ No newline at end of file
+
+# Function to declare the EDA figures as jobs over the aggregates
+def figure_jobs(agg, viz_dir=VIZ_DIR):
+    jobs = []
+
+    # 1.3 Univariate Analysis: histograms of key numerical columns and counts of key categoricals
+    key_numerical_cols = [col for col in KEY_NUMERICAL if col in agg.histograms]
+    for col in key_numerical_cols:
+        counts, edges = agg.histogram(col)
+        count, mean, m2 = agg.moments[col][:3]
+        jobs.append(FigureJob(f'{viz_dir}/{col}_hist.png', plot_histogram,
+                              {'counts': counts, 'edges': edges, 'std': np.sqrt(m2 / max(count - 1, 1)), 'n': count},
+                              {'figsize': (8, 6), 'color': 'skyblue', 'line_color': 'steelblue',
+                               'title': f'Distribution of {col}', 'xlabel': col, 'ylabel': 'Count'}))
+    for col in [col for col in KEY_CATEGORICAL if col in agg.summaries.frequencies]:
+        jobs.append(FigureJob(f'{viz_dir}/{col}_count.png', plot_bars, {'values': agg.value_counts(col)},
+                              {'palette': 'viridis', 'title': f'Count of {col}', 'xlabel': col, 'ylabel': 'Count'}))
+
+    # 1.4 Bivariate/Multivariate Analysis: binned densities (e.g. TotalPremium vs TotalClaims by top zips),
+    # correlation matrix
+    for spec in DENSITY_PLOTS:
+        if spec['name'] not in agg.densities:
+            continue
+        density = agg.densities[spec['name']]
+        xedges, yedges = density.edges()
+        title = f"{spec['x']} vs {spec['y']} (policy density" + (f", top {TOP_GROUPS} {spec['group']}s)"
+                                                                  if spec.get('group') else ')')
+        jobs.append(FigureJob(f"{viz_dir}/{spec['name']}.png", plot_density,
+                              {'grids': density.grids(TOP_GROUPS if spec.get('group') else None),
+                               'xedges': xedges, 'yedges': yedges},
+                              {'figsize': (14, 8) if spec.get('group') else (10, 6), 'cmap': 'viridis',
+                               'log_axes': spec.get('log', False), 'group_label': spec.get('group'), 'title': title,
+                               'xlabel': spec['x'], 'ylabel': spec['y']}))
+    jobs.append(FigureJob(f'{viz_dir}/correlation_matrix.png', plot_heatmap, {'matrix': agg.correlation()},
+                          {'figsize': (12, 8), 'cmap': 'coolwarm',
+                           'title': 'Correlation Matrix of Key Numerical Features'}))
+
+    # 1.5 Data Comparison - Trends Over Geography
+    top_makes = list(agg.value_counts('make').index[:TOP_MAKES]) if 'make' in agg.summaries.frequencies else []
+    if 'Province' in agg.summaries.frequencies:
+        jobs.append(FigureJob(f'{viz_dir}/premium_by_province.png', plot_boxes,
+                              {'stats': agg.box_stats('TotalPremium', ['Province'])},
+                              {'figsize': (12, 6), 'palette': 'muted', 'title': 'TotalPremium by Province',
+                               'xlabel': 'Province', 'ylabel': 'TotalPremium'}))
+        crosstab = agg.crosstab_table()
+        if not crosstab.empty:
+            jobs.append(FigureJob(f'{viz_dir}/covertype_by_province.png', plot_grouped_bars, {'table': crosstab},
+                                  {'figsize': (12, 6), 'palette': 'Set2', 'legend_title': 'CoverType',
+                                   'title': 'CoverType Distribution by Province', 'xlabel': 'Province',
+                                   'ylabel': 'Count'}))
+        if top_makes:
+            provinces = sorted(agg.value_counts('Province').index)
+            stats = {make: agg.box_stats('TotalClaims', ['Province', 'make'],
+                                         [(province, make) for province in provinces]) for make in top_makes}
+            jobs.append(FigureJob(f'{viz_dir}/claims_by_province_make.png', plot_grouped_boxes,
+                                  {'categories': provinces, 'stats': stats},
+                                  {'figsize': (12, 6), 'palette': 'Paired', 'legend_title': 'make',
+                                   'title': 'TotalClaims by Province and Make', 'xlabel': 'Province',
+                                   'ylabel': 'TotalClaims'}))
+
+    # 1.6 Outlier Detection
+    for col in key_numerical_cols:
+        jobs.append(FigureJob(f'{viz_dir}/{col}_boxplot.png', plot_boxes, {'stats': agg.box_stats(col)},
+                              {'figsize': (8, 6), 'color': 'lightcoral',
+                               'title': f'Box Plot of {col} (Outlier Detection)', 'ylabel': col}))
+
+    # 1.7 Creative Visualizations: loss ratio by province, claims by top makes, premium/claims trend
+    if len(agg.province_totals):
+        jobs.append(FigureJob(f'{viz_dir}/loss_ratio_by_province.png', plot_bars,
+                              {'values': agg.loss_ratio_by_province()},
+                              {'figsize': (12, 6), 'palette': 'magma', 'annotate': True, 'title': 'Loss Ratio by Province',
+                               'title_size': 16, 'title_weight': 'bold', 'xlabel': 'Province', 'ylabel': 'Loss Ratio'}))
+    if top_makes:
+        jobs.append(FigureJob(f'{viz_dir}/claims_by_top_makes.png', plot_boxes,
+                              {'stats': agg.box_stats('TotalClaims', ['make'], top_makes)},
+                              {'figsize': (12, 6), 'palette': 'Blues_r',
+                               'title': 'Total Claims Distribution by Top 10 Makes', 'title_size': 16,
+                               'title_weight': 'bold', 'xlabel': 'Make', 'ylabel': 'TotalClaims'}))
+    if len(agg.monthly):
+        jobs.append(FigureJob(f'{viz_dir}/premium_claims_trend.png', plot_trend, {'monthly': agg.monthly_totals()},
+                              {'figsize': (12, 6), 'title': 'Trend of Total Premium and Claims Over Time',
+                               'title_size': 16, 'title_weight': 'bold', 'xlabel': 'Transaction Month',
+                               'ylabel': 'Amount'}))
+    return jobs
+
+
+def main(path=None, aggregates_path=AGGREGATE_PATH, reuse=False, batch_size=64 * 1024, viz_dir=VIZ_DIR,
+         workers=None, force=False):
+    # One streaming pass over the full data; every figure is drawn from these aggregates
+    with stage('aggregate') as current:
+        if reuse and os.path.exists(aggregates_path):
+            agg = EdaAggregates.load(aggregates_path)
+        else:
+            agg = aggregate(path, aggregates_path, batch_size)
+        n_rows = current.rows = agg.n_rows()
+
+    # 1.1 Data Summarization
+    print("=== Data Summarization ===")
+    print(f"\nRows: {n_rows}")
+    print("\nData Structure (dtypes):")
+    print(agg.dtypes())
+
+    print("\nDescriptive Statistics for Numerical Features:")
+    descriptive_stats = agg.describe()
+    print(descriptive_stats)
+
+    # Save descriptive stats to file
+    os.makedirs("data", exist_ok=True)
+    descriptive_stats.to_csv("data/descriptive_stats.csv")
+
+    # 1.2 Data Quality Assessment
+    print("\n=== Data Quality Assessment ===")
+    print("\nMissing Values:")
+    print(agg.missing_counts())
+
+    # 1.3 - 1.7 Figures, redrawn only where their inputs changed
+    print("\n=== Figures ===")
+    os.makedirs(viz_dir, exist_ok=True)
+    with stage('figures') as current:
+        current.details.update(render_figures(figure_jobs(agg, viz_dir), workers, force))
+    print("\nEDA completed. Check the 'visualization' directory for plots.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Exploratory data analysis')
+    parser.add_argument('--input', default=None, help='Parquet file or partitioned dataset (default: loader default)')
+    parser.add_argument('--aggregates', default=AGGREGATE_PATH, help='Aggregate file the figures are drawn from')
+    parser.add_argument('--reuse', action='store_true', help='Draw from the existing aggregate file without a data pass')
+    parser.add_argument('--batch-size', type=int, default=64 * 1024, help='Rows per streamed batch')
+    parser.add_argument('--viz-dir', default=VIZ_DIR)
+    parser.add_argument('--workers', type=int, default=None, help='Processes rendering figures (default: all cores)')
+    parser.add_argument('--force', action='store_true', help='Redraw every figure even if its inputs are unchanged')
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
+
+    with Run.from_args('eda_analysis', args):
+        main(args.input, args.aggregates, args.reuse, args.batch_size, args.viz_dir, args.workers, args.force)
@@ -0,0 +1,130 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from src.scripts.batch_scoring import align_features, select_features, set_threads
+from src.scripts.feature_store import DATA_DIR, read_split
+from src.scripts.model_registry import REGISTRY_DIR, ModelRegistry, data_hash, get_metadata, model_hash
+
+# Cached aggregates and summary-plot samples, keyed on model hash + data hash + sampling settings
+CACHE_DIR = 'models/shap_cache'
+CHUNK_ROWS = 16 * 1024
+SAMPLE_SIZE = 2000
+MIN_PER_STRATUM = 100
+
+
+# Function to compute SHAP values of a chunk: XGBoost's native pred_contribs when the model is a
+# booster (the bias column is dropped), TreeExplainer otherwise (positive class for classifiers).
+# Columns are put in the model's training order first, so skipping feature validation is safe.
+def shap_values(model, X):
+    X = align_features(model, X)
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    if hasattr(booster, 'inplace_predict'):
+        from xgboost import DMatrix
+        return booster.predict(DMatrix(X), pred_contribs=True, validate_features=False)[:, :-1]
+    import shap
+    values = shap.TreeExplainer(model).shap_values(X)
+    if isinstance(values, list):
+        values = values[-1]
+    return values[:, :, -1] if np.ndim(values) == 3 else values
+
+
+# Function to draw a stratified sample of row positions: proportional allocation with a floor per
+# stratum, so rare strata (e.g. claims) still show up in the summary plots
+def stratified_sample(strata, size=SAMPLE_SIZE, min_per_stratum=MIN_PER_STRATUM, seed=42):
+    codes, _ = pd.factorize(pd.Series(strata).to_numpy(), use_na_sentinel=False)
+    if size >= len(codes):
+        return np.arange(len(codes))
+    rng = np.random.default_rng(seed)
+    counts = np.bincount(codes)
+    allocation = np.maximum(np.round(counts / len(codes) * size), np.minimum(counts, min_per_stratum)).astype(int)
+    picks = [rng.choice(np.flatnonzero(codes == code), min(k, counts[code]), replace=False)
+             for code, k in enumerate(allocation)]
+    return np.sort(np.concatenate(picks))
+
+
+# Per-process model and data, filled once by the pool initializer
+_worker = {}
+
+
+def _init_worker(name, version, split, data_dir, registry_dir, threads):
+    _worker['model'] = ModelRegistry(registry_dir).get(name, version)
+    set_threads(_worker['model'], threads)
+    _worker['X'] = read_split(split, data_dir)
+
+
+# Function to explain rows [start, stop): returns the chunk's sums of |SHAP| and SHAP (so the means
+# are aggregated as chunks stream in) and the SHAP rows of the sampled positions it holds
+def _explain_chunk(task):
+    start, stop, sample = task
+    values = shap_values(_worker['model'], _worker['X'].iloc[start:stop])
+    return np.abs(values).sum(axis=0), values.sum(axis=0), stop - start, values[sample - start]
+
+
+# Function to yield chunk results in task order, from a process pool when workers > 1
+def _chunk_results(tasks, workers, init_args):
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args) as pool:
+            yield from pool.map(_explain_chunk, tasks)
+        return
+    _init_worker(*init_args)
+    try:
+        yield from map(_explain_chunk, tasks)
+    finally:
+        _worker.clear()
+
+
+def _cache_key(model_fingerprint, X, sample):
+    digest = hashlib.sha256()
+    digest.update(model_fingerprint.encode())
+    digest.update(data_hash(X).encode())
+    digest.update(np.ascontiguousarray(sample).tobytes())
+    return digest.hexdigest()
+
+
+# Function to explain a registered model on a processed split, in chunks across worker processes.
+# Only the mean |SHAP| / mean SHAP per feature and the SHAP rows of the sample are kept, and they
+# are cached: a rerun with the same model and data is a cache hit.
+def explain(name, split, strata=None, version=None, sample_size=SAMPLE_SIZE, chunk_rows=CHUNK_ROWS, workers=None,
+            data_dir=DATA_DIR, registry_dir=REGISTRY_DIR, cache_dir=CACHE_DIR, seed=42):
+    metadata = get_metadata(name, version, registry_dir)
+    # Features in the model's training order, which is the order of the SHAP columns
+    X = select_features(read_split(split, data_dir), metadata['features'] or None)
+    sample = stratified_sample(strata if strata is not None else np.zeros(len(X)), sample_size, seed=seed)
+    key = _cache_key(model_hash(name, metadata['version'], registry_dir), X, sample)
+    cache_path = os.path.join(cache_dir, f'{name}_v{metadata["version"]}_{key[:16]}.npz')
+    if os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as cached:
+            result = {field: cached[field] for field in cached.files}
+        result.update(cached=True, features=list(result['features']), rows=int(result['rows']))
+        return result
+
+    tasks = []
+    for start in range(0, len(X), chunk_rows):
+        stop = min(start + chunk_rows, len(X))
+        tasks.append((start, stop, sample[(sample >= start) & (sample < stop)]))
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    init_args = (name, metadata['version'], split, data_dir, registry_dir, 1 if workers > 1 else os.cpu_count() or 1)
+    abs_sum, total, rows, sample_values = np.zeros(X.shape[1]), np.zeros(X.shape[1]), 0, []
+    for chunk_abs, chunk_sum, chunk_size, chunk_sample in _chunk_results(tasks, workers, init_args):
+        abs_sum, total, rows = abs_sum + chunk_abs, total + chunk_sum, rows + chunk_size
+        sample_values.append(chunk_sample)
+
+    result = {
+        'features': list(X.columns),
+        'mean_abs_shap': abs_sum / max(rows, 1),
+        'mean_shap': total / max(rows, 1),
+        'rows': rows,
+        'sample_index': sample,
+        'sample_shap': np.concatenate(sample_values) if sample_values else np.empty((0, X.shape[1]))
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(cache_path, **{**result, 'features': np.array(result['features'], dtype=str)})
+    return {**result, 'cached': False}
+
+
+# Function to rank features by mean |SHAP|, in the layout of shap_*_features.csv
+def top_features(result, n=10):
+    importance = pd.DataFrame({'Feature': result['features'], 'Mean_SHAP': result['mean_abs_shap']})
+    return importance.sort_values('Mean_SHAP', ascending=False).head(n)
@@ -0,0 +1,54 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import os
+
+# Processed train/test splits shared by preparation, modeling and evaluation
+DATA_DIR = 'data/processed'
+SPLIT_NAMES = ['X_sev_train', 'X_sev_test', 'y_sev_train', 'y_sev_test',
+               'X_prob_train', 'X_prob_test', 'y_prob_train', 'y_prob_test']
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def split_path(name, data_dir=DATA_DIR, fmt='parquet'):
+    return os.path.join(data_dir, name + FORMATS[fmt])
+
+
+# Function to save one processed split. Arrow files are uncompressed Feather v2 (Arrow IPC)
+# written as a single record batch, so each column maps to one contiguous buffer on read.
+def write_split(df, name, data_dir=DATA_DIR, fmt='parquet'):
+    os.makedirs(data_dir, exist_ok=True)
+    path = split_path(name, data_dir, fmt)
+    if fmt == 'arrow':
+        table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+        feather.write_feather(table, path, compression='uncompressed', chunksize=max(table.num_rows, 1))
+    else:
+        df.to_parquet(path)
+    return path
+
+
+# Function to pick the most recently written format of a split
+def find_split(name, data_dir=DATA_DIR):
+    paths = [split_path(name, data_dir, fmt) for fmt in FORMATS]
+    paths = [path for path in paths if os.path.exists(path)]
+    if not paths:
+        raise FileNotFoundError(f"Processed split {name} not found in {data_dir}")
+    return max(paths, key=os.path.getmtime)
+
+
+# Function to load one processed split. Arrow files are memory-mapped: with zero_copy, numeric
+# columns of single-batch files become read-only views of the mapped pages, which the OS page
+# cache shares between processes (multi-batch shards are concatenated once, without decoding).
+def read_split(name, data_dir=DATA_DIR, zero_copy=True):
+    path = find_split(name, data_dir)
+    if path.endswith(FORMATS['arrow']):
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.to_pandas(split_blocks=zero_copy)
+    return pd.read_parquet(path)
+
+
+# Function to load several splits. Targets are copied: they are a single small column, and
+# scikit-learn needs writeable 1-D arrays.
+def read_splits(names=SPLIT_NAMES, data_dir=DATA_DIR):
+    return {name: read_split(name, data_dir, zero_copy=not name.startswith('y_')) for name in names}
@@ -0,0 +1,129 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Hash of each rendered figure's inputs, one file per output directory
+HASH_FILE = '.figure_hashes.json'
+
+
+# Function to read a module's source (linecache keeps it in memory until the file changes)
+def _module_source(module_name):
+    return inspect.getsource(sys.modules[module_name])
+
+
+# A declared figure: plot(data, style) draws on a fresh figure of style['figsize'], which is saved to path.
+# The figure is redrawn only when the hash of its data, its style, or the source of the module defining
+# the plot function (which covers the helpers it calls) or of this renderer changes.
+class FigureJob:
+    def __init__(self, path, plot, data, style=None):
+        self.path = path
+        self.plot = plot
+        self.data = data
+        self.style = style or {}
+
+    def input_hash(self):
+        digest = hashlib.sha256()
+        digest.update(self.plot.__qualname__.encode())
+        digest.update(_module_source(self.plot.__module__).encode())
+        digest.update(_module_source(__name__).encode())
+        _update_digest(digest, self.data)
+        _update_digest(digest, self.style)
+        return digest.hexdigest()
+
+
+# Function to feed a value into a digest: frames and arrays by content, containers element by element
+def _update_digest(digest, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        frame = value.to_frame() if isinstance(value, pd.Series) else value
+        digest.update(','.join(map(str, frame.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f'{value.dtype}{value.shape}'.encode())
+        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            digest.update(repr(key).encode())
+            _update_digest(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _update_digest(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render(job):
+    import matplotlib.pyplot as plt
+    os.makedirs(os.path.dirname(job.path) or '.', exist_ok=True)
+    fig = plt.figure(figsize=job.style.get('figsize', (10, 6)))
+    try:
+        job.plot(job.data, job.style)
+        fig.savefig(job.path)
+    finally:
+        plt.close(fig)
+    return job.path
+
+
+def _load_hashes(directory):
+    path = os.path.join(directory, HASH_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_hashes(directory, hashes):
+    with open(os.path.join(directory, HASH_FILE), 'w') as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+
+
+# Function to render the figures whose inputs changed (or whose file is missing) on the Agg backend, in a
+# process pool when workers > 1; hashes are saved for the figures that rendered, so a failed job is
+# retried next run
+def render_figures(jobs, workers=None, force=False):
+    start = time.perf_counter()
+    hashes = {}
+    stale = []
+    for job in jobs:
+        directory = os.path.dirname(job.path) or '.'
+        stored = hashes.setdefault(directory, _load_hashes(directory))
+        key = job.input_hash()
+        if force or stored.get(os.path.basename(job.path)) != key or not os.path.exists(job.path):
+            stale.append((job, key))
+
+    workers = min(workers or os.cpu_count() or 1, max(len(stale), 1))
+    rendered = []
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+                futures = {pool.submit(_render, job): (job, key) for job, key in stale}
+                for future in as_completed(futures):
+                    future.result()
+                    rendered.append(futures[future])
+        else:
+            _init_worker()
+            for job, key in stale:
+                _render(job)
+                rendered.append((job, key))
+    finally:
+        for job, key in rendered:
+            directory = os.path.dirname(job.path) or '.'
+            hashes[directory][os.path.basename(job.path)] = key
+        for directory in {os.path.dirname(job.path) or '.' for job, _ in rendered}:
+            _save_hashes(directory, hashes[directory])
+
+    seconds = time.perf_counter() - start
+    print(f"Rendered {len(rendered)} of {len(jobs)} figures ({len(jobs) - len(stale)} unchanged) "
+          f"in {seconds:.1f}s with {workers} worker(s)")
+    return {'rendered': len(rendered), 'skipped': len(jobs) - len(stale), 'seconds': seconds}
@@ -0,0 +1,149 @@
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.linear_model import GammaRegressor, LogisticRegression, PoissonRegressor, TweedieRegressor
+from sklearn.pipeline import Pipeline
+import argparse
+import os
+
+# Rating factors of the GLMs. Categoricals are one-hot encoded from their codes (LabelEncoder codes,
+# or raw integer codes such as PostalCode); numerics are standardized, 'log' ones after log1p.
+# IDs and LossRatio (derived from TotalClaims) are left out.
+GLM_CATEGORICAL = ['Province', 'PostalCode', 'make', 'VehicleType', 'bodytype', 'CoverType', 'Gender',
+                   'AlarmImmobiliser', 'TrackingDevice', 'TermFrequency']
+GLM_NUMERIC = {'SumInsured': 'log', 'PolicyAge': None, 'kilowatts': None, 'cubiccapacity': None}
+
+# Levels seen fewer times than this share the base level
+MIN_LEVEL_COUNT = 10
+
+# Light ridge penalty, keeps sparse zip levels stable
+GLM_ALPHA = 1e-3
+TWEEDIE_POWER = 1.5
+
+
+# Builds a CSR one-hot design matrix straight from category codes: one column per level except the
+# most frequent (base) level, so no dense dummy frame is ever materialized
+class SparseDesign(BaseEstimator, TransformerMixin):
+    def __init__(self, categorical=GLM_CATEGORICAL, numeric=GLM_NUMERIC, min_count=MIN_LEVEL_COUNT):
+        self.categorical = categorical
+        self.numeric = numeric
+        self.min_count = min_count
+
+    def _numeric_values(self, X, col):
+        values = X[col].to_numpy(dtype='float64')
+        return np.log1p(np.clip(values, 0, None)) if self.numeric[col] == 'log' else values
+
+    def fit(self, X, y=None):
+        self.levels_, self.bases_ = {}, {}
+        for col in [col for col in self.categorical if col in X.columns]:
+            levels, counts = np.unique(X[col].to_numpy(), return_counts=True)
+            self.bases_[col] = levels[np.argmax(counts)]
+            kept = counts >= self.min_count
+            self.levels_[col] = levels[kept & (levels != self.bases_[col])]
+        self.numeric_ = [col for col in self.numeric if col in X.columns]
+        self.means_ = {col: np.nanmean(self._numeric_values(X, col)) for col in self.numeric_}
+        self.scales_ = {col: np.nanstd(self._numeric_values(X, col)) or 1.0 for col in self.numeric_}
+
+        offsets = np.cumsum([0] + [len(levels) for levels in self.levels_.values()])
+        self.offsets_ = dict(zip(self.levels_, offsets[:-1]))
+        self.n_features_out_ = int(offsets[-1]) + len(self.numeric_)
+        return self
+
+    def transform(self, X):
+        n_rows = len(X)
+        n_cols = len(self.levels_) + len(self.numeric_)
+        # Column index and value of each row's entries; -1 marks an empty entry (base, rare or unseen level)
+        columns = np.full((n_rows, n_cols), -1, dtype=np.int32)
+        values = np.ones((n_rows, n_cols))
+        for j, (col, levels) in enumerate(self.levels_.items()):
+            codes = X[col].to_numpy()
+            positions = np.minimum(np.searchsorted(levels, codes), max(len(levels) - 1, 0))
+            found = (levels[positions] == codes) if len(levels) else np.zeros(n_rows, dtype=bool)
+            columns[found, j] = self.offsets_[col] + positions[found]
+        start = self.n_features_out_ - len(self.numeric_)
+        for j, col in enumerate(self.numeric_, len(self.levels_)):
+            columns[:, j] = start + j - len(self.levels_)
+            values[:, j] = np.nan_to_num((self._numeric_values(X, col) - self.means_[col]) / self.scales_[col])
+
+        # Entries are row-major with increasing column offsets, so this is already canonical CSR
+        present = columns >= 0
+        indptr = np.concatenate([[0], np.cumsum(present.sum(axis=1))])
+        return sp.csr_matrix((values[present], columns[present], indptr), shape=(n_rows, self.n_features_out_))
+
+    def get_feature_names_out(self, input_features=None):
+        names = [f'{col}={level}' for col, levels in self.levels_.items() for level in levels]
+        return np.array(names + list(self.numeric_), dtype=object)
+
+
+# Poisson claim-count model used as a frequency classifier: predict_proba is P(at least one claim)
+# = 1 - exp(-rate), and predict thresholds it at 0.5 so it is evaluated like the other classifiers
+class PoissonFrequency(PoissonRegressor):
+    def expected_claims(self, X):
+        return super().predict(X)
+
+    def predict_proba(self, X):
+        claim = -np.expm1(-self.expected_claims(X))
+        return np.column_stack([1 - claim, claim])
+
+    def predict(self, X):
+        return self.predict_proba(X)[:, 1] >= 0.5
+
+
+# GLM families on the sparse design; all solvers accept CSR input
+GLM_FAMILIES = {
+    'poisson': lambda: PoissonFrequency(alpha=GLM_ALPHA, solver='lbfgs', max_iter=1000),
+    'bernoulli': lambda: LogisticRegression(solver='lbfgs', max_iter=1000),
+    'gamma': lambda: GammaRegressor(alpha=GLM_ALPHA, solver='lbfgs', max_iter=1000),
+    'tweedie': lambda: TweedieRegressor(power=TWEEDIE_POWER, link='log', alpha=GLM_ALPHA, solver='lbfgs', max_iter=1000)
+}
+
+
+def make_glm(family, categorical=GLM_CATEGORICAL, numeric=GLM_NUMERIC, min_count=MIN_LEVEL_COUNT):
+    return Pipeline([('design', SparseDesign(categorical, numeric, min_count)), ('glm', GLM_FAMILIES[family]())])
+
+
+# Function to turn a fitted GLM pipeline into a rating table: one row per factor level with its
+# coefficient and multiplicative relativity (odds ratio for the Bernoulli model). Base levels have
+# relativity 1; the intercept row holds the base rate. Level codes are decoded with the preprocessor.
+def rating_table(pipeline, preprocessor=None):
+    design, glm = pipeline.named_steps['design'], pipeline.named_steps['glm']
+    coefficients = np.ravel(glm.coef_)
+    categories = preprocessor.categories_ if preprocessor is not None else {}
+
+    def label(col, code):
+        if col in categories and 0 <= int(code) < len(categories[col]):
+            return categories[col][int(code)]
+        return code
+
+    rows = [{'factor': 'Intercept', 'level': 'base', 'coefficient': float(np.ravel(glm.intercept_)[0])}]
+    for col, levels in design.levels_.items():
+        offset = design.offsets_[col]
+        rows.append({'factor': col, 'level': label(col, design.bases_[col]), 'coefficient': 0.0})
+        rows.extend({'factor': col, 'level': label(col, level), 'coefficient': coefficients[offset + i]}
+                    for i, level in enumerate(levels))
+    start = design.n_features_out_ - len(design.numeric_)
+    rows.extend({'factor': col, 'level': 'per std. dev.' + (' of log1p' if design.numeric[col] == 'log' else ''),
+                 'coefficient': coefficients[start + i]} for i, col in enumerate(design.numeric_))
+    table = pd.DataFrame(rows)
+    table['relativity'] = np.exp(table['coefficient'])
+    return table
+
+
+if __name__ == '__main__':
+    from src.scripts.model_registry import REGISTRY_DIR, load_model
+    from src.scripts.preprocessing import InsurancePreprocessor
+
+    parser = argparse.ArgumentParser(description='Export the rating table of a registered GLM')
+    parser.add_argument('--model', default='glm_gamma_severity', help='Registered GLM name')
+    parser.add_argument('--version', type=int, default=None)
+    parser.add_argument('--registry-dir', default=REGISTRY_DIR)
+    parser.add_argument('--preprocessor', default='models/preprocessor.pkl')
+    args = parser.parse_args()
+
+    preprocessor = InsurancePreprocessor.load(args.preprocessor) if os.path.exists(args.preprocessor) else None
+    table = rating_table(load_model(args.model, args.version, args.registry_dir), preprocessor)
+    path = os.path.join('models', f'rating_table_{args.model}.csv')
+    table.to_csv(path, index=False)
+    print(table.to_string(index=False))
+    print(f"Rating table saved to {path}")
@@ -0,0 +1,202 @@
+import pandas as pd
+import numpy as np
+from scipy import stats
+
+# Metrics summarized per group; ClaimSeverity is TotalClaims restricted to rows with a claim
+SUMMARY_METRICS = ['TotalClaims', 'Margin', 'RegistrationYear']
+SEVERITY = 'ClaimSeverity'
+
+
+# Function to add the derived claim and margin columns used by the hypothesis tests
+def add_metrics(data):
+    if 'ClaimOccurred' not in data.columns:
+        data['ClaimOccurred'] = data['TotalClaims'] > 0
+    if 'Margin' not in data.columns and 'TotalPremium' in data.columns:
+        data['Margin'] = data['TotalPremium'] - data['TotalClaims']
+    return data
+
+
+# Function to build the per-group sufficient statistics in one vectorized groupby pass: row count,
+# claim count, and per metric the non-null count, sum and sum of squares. Values are centred on the
+# overall mean first, so variances derived from the sums do not lose precision to cancellation.
+def group_summary(data, group_col, metrics=SUMMARY_METRICS):
+    claims = data['ClaimOccurred'] if 'ClaimOccurred' in data.columns else data['TotalClaims'] > 0
+    values = {metric: data[metric].astype('float64') for metric in metrics if metric in data.columns}
+    if 'TotalClaims' in values:
+        values[SEVERITY] = values['TotalClaims'].where(claims.astype(bool))
+
+    columns = {'n': np.ones(len(data), dtype='int64'), 'claims': claims.to_numpy(dtype='int64')}
+    shifts = {}
+    for metric, series in values.items():
+        shift = series.mean()
+        shifts[metric] = 0.0 if pd.isna(shift) else float(shift)
+        centred = series.to_numpy() - shifts[metric]
+        valid = ~np.isnan(centred)
+        centred = np.where(valid, centred, 0.0)
+        columns[f'{metric}_count'] = valid.astype('int64')
+        columns[f'{metric}_sum'] = centred
+        columns[f'{metric}_sumsq'] = centred * centred
+
+    keys = data[group_col]
+    summary = pd.DataFrame(columns, index=data.index).groupby(keys, observed=True, sort=True).sum()
+    summary.index.name = group_col
+    summary.attrs['shifts'] = shifts
+    return summary
+
+
+# Function to derive per-group count, mean and sample variance of a metric from a summary
+def moments(summary, metric):
+    count = summary[f'{metric}_count'].astype('float64')
+    total = summary[f'{metric}_sum']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centred_mean = total / count
+        variance = ((summary[f'{metric}_sumsq'] - total * centred_mean) / (count - 1)).clip(lower=0)
+    return count, centred_mean + summary.attrs['shifts'][metric], variance
+
+
+# Per-group claim frequency, claim severity (0 without claims) and mean margin
+def claim_frequency(summary):
+    return summary['claims'] / summary['n']
+
+
+def claim_severity(summary):
+    return moments(summary, SEVERITY)[1].fillna(0)
+
+
+def margin(summary):
+    return moments(summary, 'Margin')[1]
+
+
+# Function to run the chi-squared test of claim frequency across groups (default: all groups)
+def chi_squared(summary, groups=None):
+    rows = summary if groups is None else summary.loc[[group for group in groups if group in summary.index]]
+    contingency = pd.DataFrame({False: rows['n'] - rows['claims'], True: rows['claims']})
+    contingency = contingency.loc[contingency.sum(axis=1) > 0, contingency.sum(axis=0) > 0]  # Drop unused categories
+    group_col = summary.index.name
+    if contingency.shape[0] < 2 or contingency.shape[1] < 2 or contingency.min().min() < 5:
+        print(f"Warning: Invalid contingency table for {group_col} (shape: {contingency.shape}, min cell: {contingency.min().min()})")
+        return np.nan, np.nan
+    chi2, p, _, _ = stats.chi2_contingency(contingency)
+    return chi2, p
+
+
+# Function to run Welch's t-test between two groups from their moments
+def welch_t(summary, group1, group2, metric):
+    count, mean, variance = moments(summary, metric)
+    n1 = count.get(group1, 0)
+    n2 = count.get(group2, 0)
+    if n1 < 2 or n2 < 2:
+        print(f"Warning: Insufficient data for t-test on {metric} in {summary.index.name} (sizes: {int(n1)}, {int(n2)})")
+        return np.nan, np.nan
+    t_stat, p = stats.ttest_ind_from_stats(mean[group1], np.sqrt(variance[group1]), n1,
+                                           mean[group2], np.sqrt(variance[group2]), n2, equal_var=False)
+    return t_stat, p
+
+
+# Function to run one-way ANOVA across all groups with data, from between/within sums of squares
+def anova(summary, metric):
+    count, mean, variance = moments(summary, metric)
+    used = count > 0
+    count, mean, variance = count[used], mean[used], variance[used].fillna(0)
+    if len(count) < 2:
+        print(f"Warning: Fewer than 2 groups with valid data for {metric} in {summary.index.name}")
+        return np.nan, np.nan
+    total = count.sum()
+    grand_mean = (count * mean).sum() / total
+    df_between, df_within = len(count) - 1, total - len(count)
+    ss_between = (count * (mean - grand_mean) ** 2).sum()
+    ss_within = ((count - 1) * variance).sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f_stat = (ss_between / df_between) / (ss_within / df_within)
+    return f_stat, stats.f.sf(f_stat, df_between, df_within)
+
+
+# Function to run Tukey-Kramer HSD on all pairs of groups with data
+def tukey_hsd(summary, metric, alpha=0.05):
+    count, mean, variance = moments(summary, metric)
+    used = count > 0
+    count, mean, variance = count[used], mean[used], variance[used].fillna(0)
+    k, df_within = len(count), count.sum() - len(count)
+    mse = ((count - 1) * variance).sum() / df_within
+    first, second = np.triu_indices(k, 1)
+    diff = mean.to_numpy()[second] - mean.to_numpy()[first]
+    se = np.sqrt(mse / 2 * (1 / count.to_numpy()[first] + 1 / count.to_numpy()[second]))
+    margin_of_error = stats.studentized_range.ppf(1 - alpha, k, df_within) * se
+    return pd.DataFrame({
+        'group1': count.index[first],
+        'group2': count.index[second],
+        'meandiff': diff,
+        'p-adj': stats.studentized_range.sf(np.abs(diff) / se, k, df_within),
+        'lower': diff - margin_of_error,
+        'upper': diff + margin_of_error,
+        'reject': np.abs(diff) > margin_of_error
+    })
+
+
+# Function to compute Welch t-statistics and p-values of rows [start, stop) against every later
+# group, from per-group mean, variance/n and count arrays
+def _welch_block(start, stop, mean, scaled_var, count):
+    first, second = [], []
+    for i in range(start, stop):
+        first.append(np.full(len(mean) - i - 1, i))
+        second.append(np.arange(i + 1, len(mean)))
+    first = np.concatenate(first) if first else np.empty(0, dtype=int)
+    second = np.concatenate(second) if second else np.empty(0, dtype=int)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se2 = scaled_var[first] + scaled_var[second]
+        t_stat = (mean[first] - mean[second]) / np.sqrt(se2)
+        # Welch-Satterthwaite degrees of freedom
+        df = se2 ** 2 / (scaled_var[first] ** 2 / (count[first] - 1) + scaled_var[second] ** 2 / (count[second] - 1))
+    p = 2 * stats.t.sf(np.abs(t_stat), df)
+    return first, second, t_stat, p
+
+
+# Function to compute the Welch t-test for every pair of groups with at least min_count values,
+# in blocks of rows so memory stays bounded, optionally spreading blocks across processes
+def pairwise_welch(summary, metric, min_count=30, block_size=256, workers=1):
+    count, mean, variance = moments(summary, metric)
+    used = count >= max(min_count, 2)
+    groups = summary.index[used.to_numpy()]
+    count, mean = count[used].to_numpy(), mean[used].to_numpy()
+    scaled_var = (variance[used] / count).to_numpy()
+    blocks = [(start, min(start + block_size, len(groups))) for start in range(0, len(groups), block_size)]
+    args = [(start, stop, mean, scaled_var, count) for start, stop in blocks]
+
+    if workers and workers > 1 and len(blocks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(min(workers, len(blocks))) as pool:
+            results = list(pool.map(_welch_block, *zip(*args)))
+    else:
+        results = [_welch_block(*arg) for arg in args]
+    results = results or [(np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0), np.empty(0))]
+    first, second, t_stat, p = (np.concatenate(parts) for parts in zip(*results))
+    return pd.DataFrame({
+        'group1': groups[first],
+        'group2': groups[second],
+        'n1': count[first].astype('int64'),
+        'n2': count[second].astype('int64'),
+        't_stat': t_stat,
+        'p_value': p
+    })
+
+
+# Function to apply the Benjamini-Hochberg false discovery rate adjustment (NaNs are left out)
+def benjamini_hochberg(p_values):
+    p_values = np.asarray(p_values, dtype='float64')
+    adjusted = np.full(len(p_values), np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    order = valid[np.argsort(p_values[valid])]
+    ranked = p_values[order] * len(order) / np.arange(1, len(order) + 1)
+    adjusted[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return adjusted
+
+
+# Function to list every pair of groups that does not differ on a metric, most equivalent first
+# (highest p-value, then largest smaller group); with correction='fdr_bh' pairs are kept or
+# dropped on Benjamini-Hochberg adjusted p-values
+def equivalent_pairs(summary, metric, min_count=30, p_threshold=0.05, correction=None, workers=1):
+    pairs = pairwise_welch(summary, metric, min_count, workers=workers)
+    pairs['p_adjusted'] = benjamini_hochberg(pairs['p_value']) if correction == 'fdr_bh' else pairs['p_value']
+    pairs['n_min'] = np.minimum(pairs['n1'], pairs['n2'])
+    equivalent = pairs[pairs['p_adjusted'] >= p_threshold]
+    return equivalent.sort_values(['p_value', 'n_min'], ascending=False, kind='stable').reset_index(drop=True)
@@ -0,0 +1,273 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from src.scripts.data_loader import load_typed
+from src.scripts.group_stats import (SEVERITY, add_metrics, anova, chi_squared, equivalent_pairs, group_summary,
+                                     tukey_hsd, welch_t)
+from src.scripts.instrumentation import record, stage
+from src.scripts.resampling import bootstrap_ci, permutation_test
+
+# A hypothesis spec is a dict:
+#   name, title           identifier and report heading
+#   group_col             column whose groups are compared
+#   groups                None (all groups), a list of groups, or {'equivalent_on': metric, 'min_count': n}
+#                         to test the top-ranked pair of groups that do not differ on that metric
+#   equivalence           metrics the compared groups are checked for balance on (printed, not decisive)
+#   tests                 list of {'test', 'metric', 'label'}; 'test' is a key of TESTS, 'decides': False
+#                         keeps a test out of the reject decision, 'post_hoc': 'tukey' adds Tukey HSD on reject
+#   reject / accept       report lines ({group1}/{group2} are filled in for pairs)
+#   reject_recommendation / accept_recommendation, insufficient   optional report lines
+
+ALPHA = 0.05
+
+# Raw columns each metric is derived from
+METRIC_SOURCES = {
+    'ClaimOccurred': ['TotalClaims'],
+    SEVERITY: ['TotalClaims'],
+    'TotalClaims': ['TotalClaims'],
+    'Margin': ['TotalPremium', 'TotalClaims'],
+    'RegistrationYear': ['RegistrationYear']
+}
+
+
+def _chi_squared_test(task):
+    chi2, p = chi_squared(task['summary'], task['groups'])
+    return {'statistic': chi2, 'p_value': p}
+
+
+def _welch_test(task):
+    t_stat, p = welch_t(task['summary'], *task['groups'], task['metric'])
+    return {'statistic': t_stat, 'p_value': p}
+
+
+def _anova_test(task):
+    f_stat, p = anova(task['summary'], task['metric'])
+    result = {'statistic': f_stat, 'p_value': p}
+    if task.get('post_hoc') == 'tukey' and not np.isnan(f_stat):
+        result['tukey'] = tukey_hsd(task['summary'], task['metric'])
+    return result
+
+
+def _permutation_test(task):
+    x, y = task['samples']
+    if len(x) < 2 or len(y) < 2:
+        print(f"Warning: Insufficient data for resampling test on {task['metric']} (sizes: {len(x)}, {len(y)})")
+        return {'statistic': np.nan, 'p_value': np.nan}
+    permutation = permutation_test(x, y, task['resamples'], task['seed'], workers=1)
+    bootstrap = bootstrap_ci(x, y, task['resamples'], seed=task['seed'], workers=1)
+    return {'statistic': permutation['statistic'], 'p_value': permutation['p_value'],
+            'ci_low': bootstrap['ci_low'], 'ci_high': bootstrap['ci_high'],
+            'resamples': task['resamples'],
+            'permutations_per_second': permutation['resamples_per_second'],
+            'bootstrap_resamples_per_second': bootstrap['resamples_per_second']}
+
+
+# Tests by spec name; summary-based tests run in O(groups), 'permutation' needs the two raw samples
+TESTS = {
+    'chi_squared': _chi_squared_test,
+    'welch_t': _welch_test,
+    'anova': _anova_test,
+    'permutation': _permutation_test
+}
+
+# Report line per test
+TEST_FORMATS = {
+    'chi_squared': "{label} - Chi-squared: {statistic:.2f}, p-value: {p_value:.4f}",
+    'welch_t': "{label} - t-stat: {statistic:.2f}, p-value: {p_value:.4f}",
+    'anova': "{label} - ANOVA F-stat: {statistic:.2f}, p-value: {p_value:.4f}",
+    'permutation': "{label} - permutation p-value: {p_value:.4f}, bootstrap 95% CI of mean difference: "
+                   "[{ci_low:.2f}, {ci_high:.2f}] ({permutations_per_second:.0f} permutations/s, "
+                   "{bootstrap_resamples_per_second:.0f} bootstrap resamples/s)"
+}
+
+
+# Function to run one test, timed where it runs (possibly a worker process)
+def _run_task(task):
+    start, cpu = time.perf_counter(), time.process_time()
+    result = TESTS[task['test']](task)
+    return result, {'wall_seconds': time.perf_counter() - start, 'cpu_seconds': time.process_time() - cpu}
+
+
+# Function to turn numpy scalars, NaN and frames into JSON-serializable values
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, pd.DataFrame):
+        return _jsonable(value.to_dict(orient='records'))
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+# Plans and runs a set of hypothesis specs together: one projected data load, one group summary
+# per grouping column shared by every test, and the independent tests spread over a process pool
+class HypothesisRunner:
+    def __init__(self, specs, alpha=ALPHA, resamples=10000, seed=42, workers=None):
+        self.specs = specs
+        self.alpha = alpha
+        self.resamples = resamples
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+
+    # Columns the whole plan needs, so the data is loaded once with column projection
+    def required_columns(self):
+        columns = []
+        for spec in self.specs:
+            metrics = [test['metric'] for test in spec['tests']] + list(spec.get('equivalence', []))
+            if isinstance(spec.get('groups'), dict):
+                metrics.append(spec['groups']['equivalent_on'])
+            for col in [spec['group_col']] + [source for metric in metrics for source in METRIC_SOURCES.get(metric, [metric])]:
+                if col not in columns:
+                    columns.append(col)
+        return columns
+
+    def load(self, path=None):
+        return load_typed(path, columns=self.required_columns())
+
+    # Function to resolve the groups a spec compares; None when there is not enough data
+    def _resolve_groups(self, spec):
+        summary = self.summaries[spec['group_col']]
+        groups = spec.get('groups')
+        if groups is None:
+            return list(summary.index) if len(summary) > 1 else None, None
+        if isinstance(groups, dict):
+            key = (spec['group_col'], groups['equivalent_on'], groups.get('min_count', 30))
+            if key not in self.selections:
+                self.selections[key] = equivalent_pairs(summary, groups['equivalent_on'], groups.get('min_count', 30),
+                                                        self.alpha, groups.get('correction'), workers=self.workers)
+            pairs = self.selections[key]
+            selection = {'equivalent_on': groups['equivalent_on'], 'equivalent_pairs': len(pairs)}
+            if len(pairs) == 0:
+                return None, selection
+            return [pairs.at[0, 'group1'], pairs.at[0, 'group2']], selection
+        return (list(groups) if all(group in summary.index for group in groups) else None), None
+
+    # Function to build the self-contained task of one test (only small inputs are sent to workers)
+    def _task(self, spec, test, groups):
+        summary = self.summaries[spec['group_col']]
+        task = {'test': test['test'], 'metric': test['metric'], 'groups': groups,
+                'post_hoc': test.get('post_hoc'), 'resamples': self.resamples, 'seed': self.seed}
+        if test['test'] == 'permutation':
+            rows = self.data[self.data['ClaimOccurred']] if test['metric'] == SEVERITY else self.data
+            metric = 'TotalClaims' if test['metric'] == SEVERITY else test['metric']
+            keys = rows[spec['group_col']]
+            task['samples'] = tuple(rows.loc[keys == group, metric].dropna().to_numpy(dtype='float64')
+                                    for group in groups)
+        else:
+            task['summary'] = summary if spec.get('groups') is None else summary.loc[groups]
+        return task
+
+    def run(self, data=None, path=None):
+        start = time.perf_counter()
+        with stage('load') as current:
+            data = self.load(path) if data is None else data
+            current.rows = len(data)
+        # Data quality check
+        missing_cols = [col for col in self.required_columns() if col not in data.columns]
+        if missing_cols:
+            raise ValueError(f"Missing required columns: {missing_cols}")
+        with stage('group_summaries', len(data)):
+            self.data = add_metrics(data)
+            group_cols = list(dict.fromkeys(spec['group_col'] for spec in self.specs))
+            self.summaries = {col: group_summary(self.data, col) for col in group_cols}
+        self.selections = {}
+
+        plans, tasks = [], []
+        for spec in self.specs:
+            groups, selection = self._resolve_groups(spec)
+            plans.append((spec, groups, selection, len(tasks)))
+            if groups is not None:
+                tasks.extend(self._task(spec, test, groups) for test in spec['tests'])
+
+        with stage('tests', len(self.data)):
+            if self.workers > 1 and len(tasks) > 1:
+                with ProcessPoolExecutor(min(self.workers, len(tasks))) as pool:
+                    outputs = list(pool.map(_run_task, tasks))
+            else:
+                outputs = [_run_task(task) for task in tasks]
+            results = [result for result, _ in outputs]
+            # Per-hypothesis time, summed over its tests (they may have run in parallel)
+            for spec, groups, selection, offset in plans:
+                timings = [timing for _, timing in outputs[offset:offset + len(spec['tests'])]] if groups else []
+                record(f"hypothesis:{spec['name']}", len(self.data), {'tests': len(timings)},
+                       wall_seconds=sum(timing['wall_seconds'] for timing in timings),
+                       cpu_seconds=sum(timing['cpu_seconds'] for timing in timings))
+
+        hypotheses = [self._assemble(spec, groups, selection, results[offset:offset + len(spec['tests'])])
+                      for spec, groups, selection, offset in plans]
+        self.report = {
+            'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'rows': len(self.data),
+            'columns': self.required_columns(),
+            'alpha': self.alpha,
+            'seconds': time.perf_counter() - start,
+            'hypotheses': hypotheses
+        }
+        return self.report
+
+    # Function to combine one spec's test results into its decision and report entry
+    def _assemble(self, spec, groups, selection, results):
+        entry = {'name': spec['name'], 'title': spec['title'], 'group_col': spec['group_col'],
+                 'groups': groups, 'selection': selection, 'equivalence': [], 'tests': []}
+        if groups is None:
+            entry.update({'decision': 'insufficient_data', 'message': spec.get('insufficient', 'Insufficient data for testing.')})
+            return entry
+        pair = {'group1': groups[0], 'group2': groups[1]} if len(groups) == 2 else {}
+        summary = self.summaries[spec['group_col']]
+        for metric in spec.get('equivalence', []):
+            t_stat, p = welch_t(summary, groups[0], groups[1], metric)
+            entry['equivalence'].append({'metric': metric, 'statistic': t_stat, 'p_value': p,
+                                         'differs': bool(p < self.alpha)})
+        for test, result in zip(spec['tests'], results):
+            entry['tests'].append({'test': test['test'], 'metric': test['metric'], 'label': test.get('label', test['metric']),
+                                   'decides': test.get('decides', True), **result})
+
+        p_values = [test['p_value'] for test in entry['tests'] if test['decides']]
+        reject = not any(np.isnan(p) for p in p_values) and any(p < self.alpha for p in p_values)
+        entry['decision'] = 'reject' if reject else 'fail_to_reject'
+        entry['message'] = spec['reject' if reject else 'accept'].format(**pair)
+        recommendation = spec.get('reject_recommendation' if reject else 'accept_recommendation')
+        entry['recommendation'] = recommendation.format(**pair) if recommendation else None
+        return entry
+
+    # Function to render the report in the layout of hypothesis_testing_report.txt
+    def report_lines(self):
+        lines = ["Hypothesis Testing Results\n", "=" * 50 + "\n"]
+        for i, entry in enumerate(self.report['hypotheses']):
+            lines.append(("\n" if i else "") + entry['title'] + "\n")
+            if entry['decision'] == 'insufficient_data':
+                lines.append(entry['message'] + "\n")
+                continue
+            if entry['selection']:
+                lines.append(f"{entry['selection']['equivalent_pairs']} equivalent {entry['group_col']} pairs on "
+                             f"{entry['selection']['equivalent_on']}; testing the top-ranked pair "
+                             f"{entry['groups'][0]} and {entry['groups'][1]}\n")
+            for check in entry['equivalence']:
+                lines.append(f"Equivalence check for {check['metric']}: t-stat = {check['statistic']:.2f}, "
+                             f"p-value = {check['p_value']:.4f}" + (" (groups differ)" if check['differs'] else "") + "\n")
+            for test in entry['tests']:
+                lines.append(TEST_FORMATS[test['test']].format(**test) + "\n")
+            lines.append(entry['message'] + "\n")
+            for test in entry['tests']:
+                if 'tukey' in test and entry['decision'] == 'reject':
+                    lines.append(test['tukey'].to_string(index=False) + "\n")
+            if entry['recommendation']:
+                lines.append("Business Recommendation: " + entry['recommendation'] + "\n")
+        return lines
+
+    # Function to write the text report and the structured JSON report next to it
+    def save(self, text_path, json_path=None):
+        json_path = json_path or os.path.splitext(text_path)[0] + '.json'
+        with open(text_path, 'w') as f:
+            f.writelines(self.report_lines())
+        with open(json_path, 'w') as f:
+            json.dump(_jsonable(self.report), f, indent=2)
+        return text_path, json_path
@@ -0,0 +1,262 @@
+import pandas as pd
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from src.scripts.resources import ResourceMonitor
+
+# Run manifests: <MANIFEST_DIR>/<run name>/<run id>.json, one per script run
+MANIFEST_DIR = 'runs'
+
+# compare flags a stage when wall time or peak memory grows by more than this fraction
+# (and wall time by at least MIN_SECONDS, so sub-second noise is not reported)
+REGRESSION_THRESHOLD = 0.10
+MIN_SECONDS = 0.05
+
+# The run stages are recorded into; None when the script runs without instrumentation
+_active = {'run': None}
+
+
+def current_run():
+    return _active['run']
+
+
+# Timings of one named stage; rows and details can be filled in while it runs
+class Stage:
+    def __init__(self, name, rows=None, parent=None):
+        self.name = name
+        self.rows = rows
+        self.parent = parent
+        self.details = {}
+        self.traced_peak = 0
+
+
+# Samples the main thread's stack from a background thread and counts collapsed stacks
+# ('stage;file:function;...'), the input format of flamegraph.pl and speedscope
+class SamplingProfiler:
+    def __init__(self, run, interval=0.005):
+        self.run = run
+        self.interval = interval
+        self.counts = {}
+        self._stop = threading.Event()
+        self._thread_id = threading.main_thread().ident
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            open_stages = [stage.name for stage in self.run.open_stages] or ['(no stage)']
+            key = ';'.join(open_stages + stack[::-1])
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self, path):
+        self._stop.set()
+        self._thread.join()
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f'{stack} {count}\n')
+
+
+# One instrumented script run: named stages with wall time, CPU time (including reaped worker
+# processes), peak RSS, optional tracemalloc peak and rows processed, written to a JSON manifest
+class Run:
+    def __init__(self, name, manifest_dir=MANIFEST_DIR, trace_memory=False, profile=False, argv=None):
+        self.name = name
+        self.manifest_dir = manifest_dir
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.argv = sys.argv[1:] if argv is None else argv
+        self.stages = []
+        self.open_stages = []
+        self._marked = None
+
+    @classmethod
+    def from_args(cls, name, args):
+        return cls(name, args.manifest_dir, args.trace_memory, args.profile)
+
+    def start(self):
+        self.run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self._start = time.perf_counter()
+        if self.trace_memory:
+            tracemalloc.start()
+        self._monitor = ResourceMonitor(children=True).__enter__()
+        self._profiler = SamplingProfiler(self) if self.profile else None
+        if self._profiler:
+            self._profiler.start()
+        _active['run'] = self
+        return self
+
+    # Function to time a named stage; nested stages record their parent
+    @contextmanager
+    def stage(self, name, rows=None):
+        stage = Stage(name, rows, self.open_stages[-1].name if self.open_stages else None)
+        if self.trace_memory:
+            if self.open_stages:
+                parent = self.open_stages[-1]
+                parent.traced_peak = max(parent.traced_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self.open_stages.append(stage)
+        offset = time.perf_counter() - self._start
+        try:
+            with ResourceMonitor(children=True) as monitor:
+                yield stage
+        finally:
+            self.open_stages.pop()
+            record = {'name': name, 'parent': stage.parent, 'offset_seconds': offset, 'rows': stage.rows,
+                      **monitor.stats()}
+            if self.trace_memory:
+                stage.traced_peak = max(stage.traced_peak, tracemalloc.get_traced_memory()[1])
+                record['traced_peak_mb'] = stage.traced_peak / 1024 ** 2
+                if self.open_stages:
+                    self.open_stages[-1].traced_peak = max(self.open_stages[-1].traced_peak, stage.traced_peak)
+            self._append(record, stage.details)
+
+    # Function to end the previous mark and start a new stage, for scripts written top to bottom
+    def mark(self, name, rows=None):
+        if self._marked is not None:
+            self._marked.__exit__(None, None, None)
+        self._marked = self.stage(name, rows) if name else None
+        return self._marked.__enter__() if self._marked else None
+
+    # Function to record a stage measured elsewhere (e.g. inside a worker process)
+    def record(self, name, rows=None, details=None, **stats):
+        self._append({'name': name, 'parent': self.open_stages[-1].name if self.open_stages else None,
+                      'offset_seconds': None, 'rows': rows, **stats}, details or {})
+
+    def _append(self, record, details):
+        wall = record.get('wall_seconds')
+        record['rows_per_second'] = record['rows'] / wall if record['rows'] and wall else None
+        record['details'] = details
+        self.stages.append(record)
+
+    def finish(self, status='completed'):
+        self.mark(None)
+        self._monitor.__exit__(None, None, None)
+        _active['run'] = None
+        os.makedirs(os.path.join(self.manifest_dir, self.name), exist_ok=True)
+        path = os.path.join(self.manifest_dir, self.name, f'{self.run_id}.json')
+        manifest = {
+            'run': self.name, 'run_id': self.run_id, 'started_at': self.started_at, 'status': status,
+            'argv': self.argv, 'python': sys.version.split()[0], 'cpu_count': os.cpu_count(),
+            'total': self._monitor.stats(), 'stages': self.stages
+        }
+        if self._profiler:
+            manifest['profile'] = path[:-len('.json')] + '.collapsed.txt'
+            self._profiler.stop(manifest['profile'])
+        if self.trace_memory:
+            tracemalloc.stop()
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        print(f"Run manifest saved to {path}")
+        return path
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish('failed' if exc_type else 'completed')
+        return False
+
+
+# Function to time a stage of the active run (a no-op outside an instrumented run, so library
+# code can mark stages unconditionally)
+@contextmanager
+def stage(name, rows=None):
+    run = current_run()
+    if run is None:
+        yield Stage(name, rows)
+        return
+    with run.stage(name, rows) as current:
+        yield current
+
+
+def record(name, rows=None, details=None, **stats):
+    run = current_run()
+    if run is not None:
+        run.record(name, rows, details, **stats)
+
+
+# Function to add the instrumentation options to a script's parser
+def add_instrumentation_args(parser):
+    parser.add_argument('--manifest-dir', default=MANIFEST_DIR, help='Where run manifests are written')
+    parser.add_argument('--trace-memory', action='store_true', help='Record tracemalloc peaks per stage (slower)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Sample the main thread stack and write collapsed stacks next to the manifest')
+    return parser
+
+
+def load_manifest(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# Function to find the two most recent manifests of a run name
+def latest_manifests(name, manifest_dir=MANIFEST_DIR):
+    paths = sorted(glob.glob(os.path.join(manifest_dir, name, '*.json')))
+    if len(paths) < 2:
+        raise FileNotFoundError(f"Need two manifests of {name} in {manifest_dir}, found {len(paths)}")
+    return paths[-2], paths[-1]
+
+
+# Function to diff two manifests stage by stage (stages are matched by name; repeated names are summed)
+def compare_manifests(old, new, threshold=REGRESSION_THRESHOLD, min_seconds=MIN_SECONDS):
+    def by_stage(manifest):
+        stages = pd.DataFrame(manifest['stages'] + [{'name': 'TOTAL', **manifest['total']}])
+        return stages.groupby('name', sort=False).agg(wall_seconds=('wall_seconds', 'sum'),
+                                                      cpu_seconds=('cpu_seconds', 'sum'),
+                                                      peak_memory_mb=('peak_memory_mb', 'max'),
+                                                      rows=('rows', 'sum'))
+
+    old_stages, new_stages = by_stage(old), by_stage(new)
+    diff = old_stages.join(new_stages, how='outer', lsuffix='_old', rsuffix='_new', sort=False)
+    for metric in ['wall_seconds', 'cpu_seconds', 'peak_memory_mb']:
+        diff[f'{metric}_change'] = diff[f'{metric}_new'] / diff[f'{metric}_old'] - 1
+    slower = (diff['wall_seconds_change'] > threshold) & \
+        (diff['wall_seconds_new'] - diff['wall_seconds_old'] >= min_seconds)
+    diff['regression'] = slower | (diff['peak_memory_mb_change'] > threshold)
+    return diff
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare two run manifests')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compare_parser = subparsers.add_parser('compare', help='Diff two manifests stage by stage')
+    compare_parser.add_argument('manifests', nargs='*', help='Old and new manifest paths')
+    compare_parser.add_argument('--latest', default=None, help='Compare the last two manifests of this run name')
+    compare_parser.add_argument('--manifest-dir', default=MANIFEST_DIR)
+    compare_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                                help='Relative growth in wall time or peak memory reported as a regression')
+    compare_parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 on regressions')
+    args = parser.parse_args()
+
+    if args.latest:
+        old_path, new_path = latest_manifests(args.latest, args.manifest_dir)
+    elif len(args.manifests) == 2:
+        old_path, new_path = args.manifests
+    else:
+        parser.error('give two manifest paths or --latest <run name>')
+    diff = compare_manifests(load_manifest(old_path), load_manifest(new_path), args.threshold)
+    columns = ['wall_seconds_old', 'wall_seconds_new', 'wall_seconds_change', 'cpu_seconds_change',
+               'peak_memory_mb_old', 'peak_memory_mb_new', 'peak_memory_mb_change', 'regression']
+    print(f"{old_path} -> {new_path}")
+    with pd.option_context('display.float_format', '{:.3f}'.format, 'display.width', 250, 'display.max_columns', None):
+        print(diff[columns])
+    regressions = list(diff.index[diff['regression']])
+    print(f"Regressions: {', '.join(regressions)}" if regressions else "No regressions")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
@@ -0,0 +1,247 @@
+import pandas as pd
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# Versioned model store: <registry>/<name>/v<version>/{model file, metadata.json}
+REGISTRY_DIR = 'models/registry'
+METADATA_NAME = 'metadata.json'
+
+# XGBoost models are stored in the native UBJSON format and loaded as bare boosters (no sklearn
+# wrapper state to rebuild); other scikit-learn models are joblib files, compressed for forests
+MODEL_FILES = {'xgboost': 'model.ubj', 'sklearn': 'model.joblib'}
+FOREST_COMPRESSION = 3
+
+
+# Function to fingerprint training data from row hashes, independent of file format and chunking
+def data_hash(*frames):
+    digest = hashlib.sha256()
+    for frame in frames:
+        frame = frame.to_frame() if isinstance(frame, pd.Series) else frame
+        digest.update(','.join(map(str, frame.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _model_format(model):
+    return 'xgboost' if hasattr(model, 'get_booster') or hasattr(model, 'inplace_predict') else 'sklearn'
+
+
+def _version_dir(name, version, registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, name, f'v{version}')
+
+
+# Function to list the registered versions of a model, oldest first
+def list_versions(name, registry_dir=REGISTRY_DIR):
+    model_dir = os.path.join(registry_dir, name)
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(int(entry[1:]) for entry in os.listdir(model_dir)
+                  if entry.startswith('v') and entry[1:].isdigit()
+                  and os.path.exists(os.path.join(model_dir, entry, METADATA_NAME)))
+
+
+def list_models(registry_dir=REGISTRY_DIR):
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(name for name in os.listdir(registry_dir) if list_versions(name, registry_dir))
+
+
+# Function to store a fitted model as a new version with its metadata
+def register_model(model, name, features, training_data_hash=None, metrics=None, training_seconds=None,
+                   registry_dir=REGISTRY_DIR, **extra):
+    version = (list_versions(name, registry_dir) or [0])[-1] + 1
+    version_dir = _version_dir(name, version, registry_dir)
+    os.makedirs(version_dir, exist_ok=True)
+    fmt = _model_format(model)
+    model_path = os.path.join(version_dir, MODEL_FILES[fmt])
+
+    if fmt == 'xgboost':
+        booster = model.get_booster() if hasattr(model, 'get_booster') else model
+        booster.save_model(model_path)
+        import xgboost as library
+    else:
+        import joblib
+        import sklearn as library
+        compress = FOREST_COMPRESSION if hasattr(model, 'estimators_') else 0
+        joblib.dump(model, model_path, compress=compress)
+
+    metadata = {
+        'name': name,
+        'version': version,
+        'format': fmt,
+        'model_file': MODEL_FILES[fmt],
+        'model_class': type(model).__name__,
+        'library': library.__name__,
+        'library_version': library.__version__,
+        'features': list(features),
+        'training_data_hash': training_data_hash,
+        'metrics': {key: float(value) for key, value in (metrics or {}).items()},
+        'training_seconds': None if training_seconds is None else round(training_seconds, 3),
+        'size_bytes': os.path.getsize(model_path),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        **extra
+    }
+    # Metadata is written last: a version only counts as registered once it exists
+    with open(os.path.join(version_dir, METADATA_NAME), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
+
+
+# Function to read the metadata of one version (default: latest) without loading the model
+def get_metadata(name, version=None, registry_dir=REGISTRY_DIR):
+    versions = list_versions(name, registry_dir)
+    if not versions:
+        raise FileNotFoundError(f"Model {name} is not registered in {registry_dir}")
+    version = versions[-1] if version is None else version
+    with open(os.path.join(_version_dir(name, version, registry_dir), METADATA_NAME)) as f:
+        return json.load(f)
+
+
+# Function to fingerprint a registered model from its file bytes
+def model_hash(name, version=None, registry_dir=REGISTRY_DIR):
+    metadata = get_metadata(name, version, registry_dir)
+    digest = hashlib.sha256()
+    with open(os.path.join(_version_dir(name, metadata['version'], registry_dir), metadata['model_file']), 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Function to deserialize one registered model file
+def _load_file(metadata, registry_dir=REGISTRY_DIR):
+    path = os.path.join(_version_dir(metadata['name'], metadata['version'], registry_dir), metadata['model_file'])
+    if metadata['format'] == 'xgboost':
+        from xgboost import Booster
+        booster = Booster(model_file=path)
+        booster.feature_names = metadata['features']
+        return booster
+    import joblib
+    return joblib.load(path)
+
+
+# In-process LRU cache of loaded models: nothing is deserialized until first use, and the
+# least recently used model is evicted once max_models are held
+class ModelRegistry:
+    def __init__(self, registry_dir=REGISTRY_DIR, max_models=8):
+        self.registry_dir = registry_dir
+        self.max_models = max_models
+        self._cache = OrderedDict()
+        self.load_seconds = {}
+
+    def metadata(self, name, version=None):
+        return get_metadata(name, version, self.registry_dir)
+
+    def get(self, name, version=None):
+        metadata = self.metadata(name, version)
+        key = (name, metadata['version'])
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        start = time.perf_counter()
+        model = _load_file(metadata, self.registry_dir)
+        self.load_seconds[key] = time.perf_counter() - start
+        self._cache[key] = model
+        if len(self._cache) > self.max_models:
+            self._cache.popitem(last=False)
+        return model
+
+    def __contains__(self, name):
+        return bool(list_versions(name, self.registry_dir))
+
+
+# Process-wide default registry used by scoring
+_default = {}
+
+
+def default_registry():
+    if 'registry' not in _default:
+        _default['registry'] = ModelRegistry()
+    return _default['registry']
+
+
+def load_model(name, version=None, registry_dir=None):
+    registry = default_registry() if registry_dir is None else ModelRegistry(registry_dir)
+    return registry.get(name, version)
+
+
+# Function to register the pickles written before the registry existed, with the metrics
+# from severity_results.csv / probability_results.csv
+def migrate_pickles(models_dir='models', registry_dir=REGISTRY_DIR):
+    import pickle
+    results = {}
+    for task in ('severity', 'probability'):
+        path = os.path.join(models_dir, f'{task}_results.csv')
+        if os.path.exists(path):
+            for row in pd.read_csv(path, index_col=0).to_dict(orient='records'):
+                results[f'{row.pop("Model").lower().replace(" ", "_")}_{task}'] = row
+    registered = []
+    for file_name in sorted(os.listdir(models_dir)):
+        name = file_name[:-len('.pkl')]
+        if not file_name.endswith(('_severity.pkl', '_probability.pkl')) or name in list_models(registry_dir):
+            continue
+        with open(os.path.join(models_dir, file_name), 'rb') as f:
+            model = pickle.load(f)
+        features = (model.get_booster().feature_names if hasattr(model, 'get_booster')
+                    else list(getattr(model, 'feature_names_in_', [])))
+        registered.append(register_model(model, name, features, metrics=results.get(name), registry_dir=registry_dir,
+                                         migrated_from=file_name))
+    return registered
+
+
+# Function to time the scoring path from a fresh interpreter: imports, preprocessor and model
+# loading, and the first prediction, i.e. what a new batch worker or quote service pays on start
+def cold_start_report(names=('xgboost_probability', 'xgboost_severity'), registry_dir=REGISTRY_DIR,
+                      preprocessor_path='models/preprocessor.pkl'):
+    code = f"""
+import json, time
+start = time.perf_counter()
+import pandas as pd
+import os
+from src.scripts.batch_scoring import predict
+from src.scripts.model_registry import ModelRegistry
+from src.scripts.preprocessing import InsurancePreprocessor
+timings = {{'import': time.perf_counter() - start}}
+mark = time.perf_counter()
+if os.path.exists({preprocessor_path!r}):
+    InsurancePreprocessor.load({preprocessor_path!r})
+registry = ModelRegistry({registry_dir!r})
+models = [registry.get(name) for name in {list(names)!r}]
+timings['load_artifacts'] = time.perf_counter() - mark
+features = registry.metadata({list(names)!r}[0])['features']
+mark = time.perf_counter()
+X = pd.DataFrame([[0.0] * len(features)], columns=features)
+for model in models:
+    predict(model, X)
+timings['first_predict'] = time.perf_counter() - mark
+timings['total'] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Inspect and maintain the model registry')
+    parser.add_argument('command', choices=['list', 'migrate', 'cold-start'])
+    parser.add_argument('--registry', default=REGISTRY_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        for metadata in migrate_pickles(registry_dir=args.registry):
+            print(f"Registered {metadata['name']} v{metadata['version']} ({metadata['size_bytes']} bytes)")
+    elif args.command == 'cold-start':
+        timings = cold_start_report(registry_dir=args.registry)
+        print("Cold start (s): " + ", ".join(f"{key}={value:.3f}" for key, value in timings.items()))
+    else:
+        for name in list_models(args.registry):
+            metadata = get_metadata(name, registry_dir=args.registry)
+            trained = 'unknown' if metadata['training_seconds'] is None else f"{metadata['training_seconds']}s"
+            print(f"{name} v{metadata['version']} [{metadata['format']}] metrics={metadata['metrics']} "
+                  f"training time={trained}, data hash={(metadata['training_data_hash'] or 'unknown')[:12]}")
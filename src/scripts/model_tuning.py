@@ -0,0 +1,244 @@
+import pandas as pd
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from xgboost import XGBRegressor, XGBClassifier
+from threadpoolctl import threadpool_limits
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from src.scripts.feature_store import DATA_DIR, read_splits
+from src.scripts.resources import ResourceMonitor
+from src.scripts.task4_modeling import MODELS_DIR, MODEL_SPECS, SPLIT_PREFIX, evaluate
+
+LEADERBOARD_FILE = 'tuning_leaderboard.csv'
+VALIDATION_SIZE = 0.2
+EARLY_STOPPING_ROUNDS = 20
+ETA = 3
+
+# Search spaces per model family; each trial draws one value per parameter
+SEARCH_SPACES = {
+    'xgboost': {
+        'max_depth': [3, 4, 6, 8, 10],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2, 0.3],
+        'subsample': [0.6, 0.8, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+        'min_child_weight': [1, 5, 10, 20],
+        'reg_lambda': [0.1, 1.0, 10.0]
+    },
+    'random_forest': {
+        'max_depth': [None, 8, 12, 16, 24],
+        'min_samples_leaf': [1, 2, 5, 10, 20],
+        'max_features': ['sqrt', 0.3, 0.5, 1.0],
+        'max_samples': [None, 0.5, 0.8]
+    }
+}
+
+# Halving resource per family: the number of trees grown, from min to max. XGBoost trials stop
+# early on the validation split, so max is only a cap on boosting rounds.
+RESOURCES = {'xgboost': (30, 810), 'random_forest': (12, 324)}
+
+# Models that can be tuned, by registry name
+TUNABLE = {
+    'random_forest_severity': 'random_forest',
+    'xgboost_severity': 'xgboost',
+    'random_forest_probability': 'random_forest',
+    'xgboost_probability': 'xgboost'
+}
+
+# Leaderboard metric per task and whether larger is better
+TASK_METRICS = {'severity': ('RMSE', False), 'probability': ('F1', True)}
+
+# Splits loaded once per worker process
+_SPLITS = {}
+
+
+# Function to load a task's training split, carve a stratified validation split off it, and cache it
+def _task_data(task, data_dir=DATA_DIR):
+    if task not in _SPLITS:
+        prefix = SPLIT_PREFIX[task]
+        splits = read_splits([f'X_{prefix}_train', f'X_{prefix}_test', f'y_{prefix}_train', f'y_{prefix}_test'], data_dir)
+        y_train = splits[f'y_{prefix}_train'].iloc[:, 0]
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            splits[f'X_{prefix}_train'], y_train, test_size=VALIDATION_SIZE, random_state=42,
+            stratify=y_train if task == 'probability' else None)
+        _SPLITS[task] = (X_fit, X_val, y_fit, y_val, splits[f'X_{prefix}_test'], splits[f'y_{prefix}_test'].iloc[:, 0])
+    return _SPLITS[task]
+
+
+# Function to draw n random configurations from a search space
+def sample_configs(family, n, rng):
+    space = SEARCH_SPACES[family]
+    return [{param: values[rng.integers(len(values))] for param, values in space.items()} for _ in range(n)]
+
+
+def build_estimator(family, task, params, n_estimators, threads=1):
+    if family == 'xgboost':
+        model_class = XGBRegressor if task == 'severity' else XGBClassifier
+        return model_class(n_estimators=n_estimators, tree_method='hist', early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                           random_state=42, n_jobs=threads, **params)
+    model_class = RandomForestRegressor if task == 'severity' else RandomForestClassifier
+    return model_class(n_estimators=n_estimators, random_state=42, n_jobs=threads, **params)
+
+
+# Function to fit one trial at a given tree budget and score it on the validation and test splits
+def run_trial(trial, data_dir=DATA_DIR):
+    task, family = trial['task'], trial['family']
+    X_fit, X_val, y_fit, y_val, X_test, y_test = _task_data(task, data_dir)
+    model = build_estimator(family, task, trial['params'], trial['n_estimators'], trial['threads'])
+    with threadpool_limits(limits=trial['threads']):
+        with ResourceMonitor() as monitor:
+            if family == 'xgboost':
+                model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+            else:
+                model.fit(X_fit, y_fit)
+        validation = evaluate(task, model, X_val, y_val)
+        test = evaluate(task, model, X_test, y_test)
+    metric = TASK_METRICS[task][0]
+    timing = monitor.stats()
+    return {**trial, 'trees_used': model.best_iteration + 1 if family == 'xgboost' else trial['n_estimators'],
+            'validation': validation[metric], metric: test[metric], 'train_seconds': timing['wall_seconds'],
+            'cpu_seconds': timing['cpu_seconds']}
+
+
+# Function to run a batch of trials in the pool until done or until the deadline; trials still
+# queued at the deadline are cancelled (running ones finish)
+def _run_rung(pool, trials, data_dir, deadline):
+    if pool is None:
+        results = []
+        for trial in trials:
+            if time.perf_counter() >= deadline:
+                break
+            results.append(run_trial(trial, data_dir))
+        return results, len(results) < len(trials)
+    results, pending = [], {pool.submit(run_trial, trial, data_dir) for trial in trials}
+    while pending:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        results.extend(future.result() for future in done)
+    for future in pending:
+        future.cancel()
+    # Running trials cannot be cancelled; keep the ones that finish
+    results.extend(future.result() for future in pending if not future.cancelled())
+    return results, bool(pending)
+
+
+# Function to run successive halving for one model: configs start with the smallest tree budget,
+# and the best 1/eta by validation score move on with eta times more trees
+def successive_halving(name, configs, min_resource, max_resource, pool=None, cpu_budget=1, data_dir=DATA_DIR,
+                       deadline=math.inf, bracket=0, eta=ETA):
+    family, task = TUNABLE[name], MODEL_SPECS[name]['task']
+    larger_is_better = TASK_METRICS[task][1]
+    survivors = list(enumerate(configs))
+    resource, rung, results = min_resource, 0, []
+    while survivors:
+        # Spare cores go to the trials of small rungs
+        threads = max(1, cpu_budget // len(survivors))
+        trials = [{'name': name, 'task': task, 'family': family, 'bracket': bracket, 'rung': rung, 'config': i,
+                   'params': params, 'n_estimators': int(resource), 'threads': threads} for i, params in survivors]
+        rung_results, timed_out = _run_rung(pool, trials, data_dir, deadline)
+        results.extend(rung_results)
+        keep = len(survivors) // eta
+        if timed_out or keep == 0 or resource >= max_resource:
+            break
+        ranked = sorted(rung_results, key=lambda r: (-r['validation'] if larger_is_better else r['validation'], r['config']))
+        survivors = [(r['config'], r['params']) for r in ranked[:keep]]
+        resource, rung = min(resource * eta, max_resource), rung + 1
+    return results
+
+
+# Function to run Hyperband for one model: successive halving brackets from many configs on few
+# trees to few configs on the full tree budget
+def hyperband(name, rng, pool=None, cpu_budget=1, data_dir=DATA_DIR, deadline=math.inf, eta=ETA):
+    family = TUNABLE[name]
+    min_resource, max_resource = RESOURCES[family]
+    s_max = int(round(math.log(max_resource / min_resource, eta)))
+    results = []
+    for s in range(s_max, -1, -1):
+        if time.perf_counter() >= deadline:
+            break
+        n = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        configs = sample_configs(family, n, rng)
+        results.extend(successive_halving(name, configs, max_resource / eta ** s, max_resource, pool, cpu_budget,
+                                          data_dir, deadline, bracket=s_max - s, eta=eta))
+    return results
+
+
+# Function to rank every trial on its validation metric and flag the trials on the accuracy / training
+# time Pareto front (no other trial of the same model is both faster and better on validation). The
+# test score is reported only: choosing a model by it would tune on the test split.
+def leaderboard(results):
+    rows = []
+    for result in results:
+        metric, larger_is_better = TASK_METRICS[result['task']]
+        rows.append({'name': result['name'], 'bracket': result['bracket'], 'rung': result['rung'],
+                     'config': result['config'], 'n_estimators': result['n_estimators'],
+                     'trees_used': result['trees_used'], 'threads': result['threads'], 'metric': metric,
+                     'validation': result['validation'], 'test_score': result[metric],
+                     'train_seconds': result['train_seconds'], 'cpu_seconds': result['cpu_seconds'],
+                     'params': json.dumps(result['params'])})
+    board = pd.DataFrame(rows)
+    if board.empty:
+        return board
+    # Orient scores so lower is better for sorting and the Pareto check
+    board['_loss'] = board['metric'].map({metric: -1 if larger else 1 for metric, larger in TASK_METRICS.values()}) \
+        * board['validation']
+    board['pareto'] = False
+    for _, group in board.groupby('name'):
+        best = np.inf
+        for index in group.sort_values(['train_seconds', '_loss']).index:
+            if board.at[index, '_loss'] < best:
+                board.at[index, 'pareto'] = True
+                best = board.at[index, '_loss']
+    return board.sort_values(['name', '_loss', 'train_seconds']).drop(columns='_loss').reset_index(drop=True)
+
+
+# Function to tune the given models with Hyperband (or plain successive halving over n_configs
+# configs) in a shared process pool, within a wall-clock budget split evenly between the models
+def tune(names=None, method='hyperband', n_configs=27, time_budget=None, cpu_budget=None, seed=42, data_dir=DATA_DIR):
+    names = list(names or TUNABLE)
+    cpu_budget = cpu_budget or os.cpu_count() or 1
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    pool = ProcessPoolExecutor(cpu_budget) if cpu_budget > 1 else None
+    results = []
+    try:
+        for i, name in enumerate(names):
+            deadline = start + time_budget * (i + 1) / len(names) if time_budget else math.inf
+            if method == 'hyperband':
+                results.extend(hyperband(name, rng, pool, cpu_budget, data_dir, deadline))
+            else:
+                family = TUNABLE[name]
+                results.extend(successive_halving(name, sample_configs(family, n_configs, rng), *RESOURCES[family],
+                                                  pool, cpu_budget, data_dir, deadline))
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    print(f"Ran {len(results)} trials in {time.perf_counter() - start:.1f}s wall time with a budget of {cpu_budget} cores")
+    return leaderboard(results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tune the tree models with successive halving or Hyperband')
+    parser.add_argument('--models', nargs='+', choices=list(TUNABLE), default=None, help='Models to tune (default: all)')
+    parser.add_argument('--method', choices=['hyperband', 'halving'], default='hyperband')
+    parser.add_argument('--configs', type=int, default=27, help='Configurations for --method halving')
+    parser.add_argument('--time-budget', type=float, default=None, help='Wall-clock budget in seconds')
+    parser.add_argument('--cpu-budget', type=int, default=None, help='Cores shared by all trials (default: all cores)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    board = tune(args.models, args.method, args.configs, args.time_budget, args.cpu_budget, args.seed)
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    path = os.path.join(MODELS_DIR, LEADERBOARD_FILE)
+    board.to_csv(path, index=False)
+    print(f"Leaderboard saved to {path}")
+    if not board.empty:
+        columns = ['name', 'metric', 'validation', 'test_score', 'train_seconds', 'cpu_seconds', 'trees_used',
+                   'params']
+        print("\nAccuracy / training time Pareto front:\n", board[board['pareto']][columns].to_string(index=False))
@@ -0,0 +1,188 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+from src.scripts.data_loader import iter_batches
+from src.scripts.group_stats import SEVERITY, add_metrics
+
+# Persisted per-group, per-month accumulators for the monthly risk monitoring runs
+ACCUMULATOR_PATH = 'data/monitoring/group_accumulators.parquet'
+MONITOR_COLUMNS = ['Province', 'PostalCode', 'Gender']
+ACCUMULATOR_METRICS = ['TotalClaims', 'Margin', SEVERITY]
+KEY_COLUMNS = ['group_col', 'group', 'month']
+
+
+def _metric_columns(metric):
+    return [f'{metric}_count', f'{metric}_mean', f'{metric}_m2']
+
+
+ACCUMULATOR_COLUMNS = KEY_COLUMNS + ['exposure', 'claims'] + [col for metric in ACCUMULATOR_METRICS
+                                                               for col in _metric_columns(metric)]
+
+
+def empty_accumulators():
+    return pd.DataFrame(columns=ACCUMULATOR_COLUMNS)
+
+
+# Function to render group keys as strings. Integer codes such as PostalCode come back as float64 in
+# batches with nulls, so integral floats go through Int64 first: 2000 and 2000.0 share one key.
+def _group_keys(keys):
+    if pd.api.types.is_float_dtype(keys):
+        values = keys.dropna()
+        if (values == np.floor(values)).all():
+            keys = keys.astype('Int64')
+    return keys.astype(str).where(keys.notna())
+
+
+# Function to summarize a batch of policies per (grouping column, group, month): exposure (rows),
+# claim count, and count / mean / sum of squared deviations (Welford M2) of each metric
+def batch_accumulators(data, group_cols=MONITOR_COLUMNS):
+    data = add_metrics(data)
+    values = pd.DataFrame({metric: data[metric].astype('float64') for metric in ['TotalClaims', 'Margin']})
+    values[SEVERITY] = values['TotalClaims'].where(data['ClaimOccurred'].astype(bool))
+    values['exposure'] = 1
+    values['claims'] = data['ClaimOccurred'].astype('int64')
+    month = pd.to_datetime(data['TransactionMonth']).dt.strftime('%Y-%m')
+
+    frames = []
+    for group_col in group_cols:
+        grouped = values.groupby([_group_keys(data[group_col]).to_numpy(), month.to_numpy()])
+        frame = grouped[['exposure', 'claims']].sum()
+        for metric in ACCUMULATOR_METRICS:
+            count = grouped[metric].count()
+            frame[f'{metric}_count'] = count
+            frame[f'{metric}_mean'] = grouped[metric].mean()
+            frame[f'{metric}_m2'] = (grouped[metric].var(ddof=0) * count).fillna(0.0)
+        frame.index.names = ['group', 'month']
+        frames.append(frame.reset_index().assign(group_col=group_col))
+    return pd.concat(frames, ignore_index=True)[ACCUMULATOR_COLUMNS] if frames else empty_accumulators()
+
+
+# Function to merge count / mean / M2 triples pairwise (Chan et al. parallel Welford update)
+def merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    count = count_a + count_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = mean_b - mean_a
+        mean = np.where(count > 0, mean_a + delta * count_b / count, np.nan)
+        m2 = np.where(count > 0, m2_a + m2_b + delta ** 2 * count_a * count_b / count, 0.0)
+    # A side with no values contributes nothing (its mean is NaN)
+    mean = np.where(count_a == 0, mean_b, np.where(count_b == 0, mean_a, mean))
+    m2 = np.where(count_a == 0, m2_b, np.where(count_b == 0, m2_a, m2))
+    return count, mean, m2
+
+
+# Function to merge two accumulator tables cell by cell (same group and month are combined)
+def merge_accumulators(stored, new):
+    if len(stored) == 0:
+        return new.copy()
+    if len(new) == 0:
+        return stored.copy()
+    merged = stored.merge(new, on=KEY_COLUMNS, how='outer', suffixes=('_a', '_b'))
+    result = merged[KEY_COLUMNS].copy()
+    for col in ['exposure', 'claims']:
+        result[col] = merged[f'{col}_a'].fillna(0).astype('int64') + merged[f'{col}_b'].fillna(0).astype('int64')
+    for metric in ACCUMULATOR_METRICS:
+        count_col, mean_col, m2_col = _metric_columns(metric)
+        side = {suffix: (merged[f'{count_col}_{suffix}'].fillna(0).to_numpy(), merged[f'{mean_col}_{suffix}'].to_numpy(),
+                         merged[f'{m2_col}_{suffix}'].fillna(0).to_numpy()) for suffix in ('a', 'b')}
+        count, mean, m2 = merge_moments(*side['a'], *side['b'])
+        result[count_col], result[mean_col], result[m2_col] = count.astype('int64'), mean, m2
+    return result.sort_values(KEY_COLUMNS, kind='stable').reset_index(drop=True)
+
+
+def load_accumulators(path=ACCUMULATOR_PATH):
+    return pd.read_parquet(path) if os.path.exists(path) else empty_accumulators()
+
+
+def save_accumulators(accumulators, path=ACCUMULATOR_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    accumulators.to_parquet(path, index=False)
+
+
+# Function to fold new policies into the stored accumulators, streaming the input in batches so
+# the cost is O(new rows). With replace=True, stored cells for the months being loaded are dropped
+# first, so re-running a month does not count it twice.
+def update_accumulators(input_path, path=ACCUMULATOR_PATH, months=None, replace=False, group_cols=MONITOR_COLUMNS,
+                        batch_size=256 * 1024):
+    columns = list(dict.fromkeys(group_cols + ['TransactionMonth', 'TotalClaims', 'TotalPremium']))
+    filters = [('TransactionMonth', 'in', list(months))] if months else None
+    new, rows = empty_accumulators(), 0
+    for batch in iter_batches(input_path, columns=columns, filters=filters, batch_size=batch_size):
+        new = merge_accumulators(new, batch_accumulators(batch, group_cols))
+        rows += len(batch)
+
+    stored = load_accumulators(path)
+    if replace:
+        stored = stored[~stored['month'].isin(new['month'].unique())]
+    accumulators = merge_accumulators(stored, new)
+    save_accumulators(accumulators, path)
+    print(f"Merged {rows} policies over "
+          f"{new['month'].nunique()} months into {len(accumulators)} accumulator cells at {path}")
+    return accumulators
+
+
+# Function to answer a time window from stored accumulators only: the months ending at end (default:
+# latest stored month) are merged per group into exposure, claims and count / mean / variance per metric
+def window_summary(accumulators, group_col, months=12, end=None):
+    cells = accumulators[accumulators['group_col'] == group_col]
+    end = pd.Period(end or cells['month'].max(), freq='M')
+    start = end - (months - 1)
+    cells = cells[(cells['month'] >= str(start)) & (cells['month'] <= str(end))]
+    grouped = cells.groupby('group', sort=True)
+    summary = grouped[['exposure', 'claims']].sum()
+    for metric in ACCUMULATOR_METRICS:
+        count_col, mean_col, m2_col = _metric_columns(metric)
+        weighted = cells[mean_col].fillna(0) * cells[count_col]
+        count = grouped[count_col].sum()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = weighted.groupby(cells['group']).sum() / count
+        # Total M2 = within-month M2 + between-month spread of the monthly means
+        between = (cells[count_col] * (cells[mean_col] - cells['group'].map(mean)) ** 2).fillna(0)
+        m2 = grouped[m2_col].sum() + between.groupby(cells['group']).sum()
+        summary[f'{metric}_count'] = count
+        summary[f'{metric}_mean'] = mean.where(count > 0)
+        summary[f'{metric}_var'] = (m2 / (count - 1)).where(count > 1)
+    summary.index.name = group_col
+    summary.attrs['window'] = (str(start), str(end))
+    return summary
+
+
+# Function to convert a window summary into the sufficient-statistics layout of group_stats, so
+# chi_squared, welch_t, anova and tukey_hsd run on any window
+def to_group_summary(window):
+    summary = pd.DataFrame({'n': window['exposure'], 'claims': window['claims']}, index=window.index)
+    shifts = {}
+    for metric in ACCUMULATOR_METRICS:
+        count = window[f'{metric}_count']
+        mean = window[f'{metric}_mean'].fillna(0)
+        m2 = (window[f'{metric}_var'] * (count - 1)).fillna(0)
+        shifts[metric] = float((mean * count).sum() / count.sum()) if count.sum() > 0 else 0.0
+        offset = mean - shifts[metric]
+        summary[f'{metric}_count'] = count
+        summary[f'{metric}_sum'] = count * offset
+        summary[f'{metric}_sumsq'] = m2 + count * offset ** 2
+    summary.attrs['shifts'] = shifts
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Monthly group accumulators for risk monitoring')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    update_parser = subparsers.add_parser('update', help='Merge new policies into the stored accumulators')
+    update_parser.add_argument('--input', default=None, help='Parquet file or partitioned dataset with the new rows')
+    update_parser.add_argument('--months', nargs='+', default=None, help='Only load these months (YYYY-MM)')
+    update_parser.add_argument('--replace', action='store_true', help='Replace, rather than add to, stored months')
+    window_parser = subparsers.add_parser('window', help='Summarize a trailing window from the accumulators')
+    window_parser.add_argument('--group-col', default='Province', choices=MONITOR_COLUMNS)
+    window_parser.add_argument('--months', type=int, default=12, help='Trailing window length in months')
+    window_parser.add_argument('--end', default=None, help='Last month of the window (YYYY-MM, default: latest)')
+    parser.add_argument('--store', default=ACCUMULATOR_PATH, help='Accumulator Parquet file')
+    args = parser.parse_args()
+
+    if args.command == 'update':
+        update_accumulators(args.input, args.store, args.months, args.replace)
+    else:
+        window = window_summary(load_accumulators(args.store), args.group_col, args.months, args.end)
+        window['ClaimFrequency'] = window['claims'] / window['exposure']
+        print(f"{args.group_col} window {window.attrs['window'][0]} to {window.attrs['window'][1]}:")
+        print(window[['exposure', 'claims', 'ClaimFrequency', f'{SEVERITY}_mean', 'Margin_mean']])
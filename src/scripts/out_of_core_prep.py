@@ -0,0 +1,97 @@
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import os
+import time
+from src.scripts.data_loader import iter_batches
+from src.scripts.feature_store import split_path
+from src.scripts.instrumentation import stage
+from src.scripts.preprocessing import InsurancePreprocessor
+
+# Resolution of the hash-based split
+SPLIT_BUCKETS = 10000
+
+
+# Function to assign rows to the test split from a hash of PolicyID, so the split
+# reproduces without a global shuffle and keeps all rows of a policy together
+def hash_split(policy_ids, test_size=0.2):
+    if pd.api.types.is_numeric_dtype(policy_ids):
+        # Same hash whether a batch holds the IDs as int64 or (with nulls) float64
+        values = policy_ids.to_numpy(dtype='float64', na_value=np.nan)
+    else:
+        values = policy_ids.astype(str).to_numpy()
+    buckets = pd.util.hash_array(values) % SPLIT_BUCKETS
+    return buckets < int(test_size * SPLIT_BUCKETS)
+
+
+# Writes processed frames as row groups / record batches of fixed-schema Parquet or Arrow shards
+class ShardWriter:
+    def __init__(self, output_dir, float_columns=(), fmt='parquet'):
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.float_columns = set(float_columns)
+        self.writers = {}
+        self.rows = {}
+
+    def write(self, name, df):
+        if len(df) == 0:
+            return
+        df = df.astype({col: 'float64' for col in df.columns if col in self.float_columns})
+        if name not in self.writers:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            path = split_path(name, self.output_dir, self.fmt)
+            if self.fmt == 'arrow':
+                self.writers[name] = pa.ipc.new_file(path, table.schema)
+            else:
+                self.writers[name] = pq.ParquetWriter(path, table.schema)
+            self.rows[name] = 0
+        else:
+            table = pa.Table.from_pandas(df, schema=self.writers[name].schema, preserve_index=False)
+        self.writers[name].write_table(table)
+        self.rows[name] += len(df)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+
+# Function to prepare the train/test shards in two streaming passes: one to build mergeable
+# column summaries (sketch medians, frequency-table modes, missing counts), one to transform and write
+def prepare_out_of_core(path=None, output_dir='data/processed', test_size=0.2, batch_size=64 * 1024,
+                        preprocessor_path='models/preprocessor.pkl', fmt='parquet'):
+    start = time.perf_counter()
+    with stage('summarize') as current:
+        preprocessor = InsurancePreprocessor().fit_batches(iter_batches(path, batch_size=batch_size))
+        current.rows = preprocessor.n_rows_
+    print(f"Summarized {preprocessor.n_rows_} rows in {time.perf_counter() - start:.1f}s")
+    print(f"Dropped columns with >90% missing: {preprocessor.dropped_columns_}")
+    print(f"Processed datetime columns: {preprocessor.datetime_columns_}")
+    if preprocessor_path:
+        os.makedirs(os.path.dirname(preprocessor_path) or '.', exist_ok=True)
+        preprocessor.save(preprocessor_path)
+
+    # Integer columns with missing values come back as float64 in some batches; store them as float64
+    float_columns = [col for col in preprocessor.numerical_fill_ if preprocessor.missing_counts_.get(col, 0) > 0]
+    if 'RegistrationYear' in float_columns:
+        float_columns.append('PolicyAge')
+
+    features = preprocessor.features_
+    os.makedirs(output_dir, exist_ok=True)
+    writer = ShardWriter(output_dir, float_columns, fmt)
+    with stage('impute_encode_split', preprocessor.n_rows_):
+        try:
+            for batch in iter_batches(path, batch_size=batch_size):
+                is_test = hash_split(batch['PolicyID'], test_size)
+                data = preprocessor.transform(batch)
+                claims = data['ClaimOccurred'].to_numpy()
+                for split, mask in (('train', ~is_test), ('test', is_test)):
+                    writer.write(f'X_prob_{split}', data.loc[mask, features])
+                    writer.write(f'y_prob_{split}', data.loc[mask, ['ClaimOccurred']])
+                    writer.write(f'X_sev_{split}', data.loc[mask & claims, features])
+                    writer.write(f'y_sev_{split}', data.loc[mask & claims, ['TotalClaims']])
+        finally:
+            writer.close()
+    print(f"Out-of-core preparation finished in {time.perf_counter() - start:.1f}s: "
+          + ", ".join(f"{name}={rows}" for name, rows in sorted(writer.rows.items())))
+    return writer.rows
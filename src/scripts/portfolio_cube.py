@@ -0,0 +1,203 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+import time
+from src.scripts.data_loader import iter_batches
+from src.scripts.group_stats import SEVERITY, add_metrics
+
+# Persisted cube of additive measures per segment and month, built incrementally from the policy rows
+CUBE_PATH = 'data/cube/portfolio_cube.parquet'
+CUBE_DIMENSIONS = ['Province', 'PostalCode', 'make', 'CoverType', 'Gender', 'TransactionMonth']
+
+# policies counts rows (policy-months, the exposure unit of the extract); claims counts rows with a claim.
+# Sums of squares are raw, so any roll-up is a plain sum and variances follow from n, sum and sumsq.
+CUBE_MEASURES = ['policies', 'claims', 'premium', 'total_claims', 'premium_sq', 'claims_sq', 'margin_sq']
+
+# Per-batch cubes held before they are merged in one round, so the accumulated cells are re-grouped once
+# per MERGE_FANIN batches rather than once per batch
+MERGE_FANIN = 32
+
+
+def empty_cube():
+    return pd.DataFrame(columns=CUBE_DIMENSIONS + CUBE_MEASURES)
+
+
+# Function to sum a batch of policies into cube cells (missing dimension values are kept as their own cell)
+def batch_cube(data):
+    data = add_metrics(data)
+    premium = data['TotalPremium'].astype('float64').fillna(0.0)
+    claims = data['TotalClaims'].astype('float64').fillna(0.0)
+    values = pd.DataFrame({
+        'policies': 1,
+        'claims': data['ClaimOccurred'].astype('int64'),
+        'premium': premium,
+        'total_claims': claims,
+        'premium_sq': premium ** 2,
+        'claims_sq': claims ** 2,
+        'margin_sq': (premium - claims) ** 2
+    }, index=data.index)
+    keys = [pd.to_datetime(data[col]).dt.strftime('%Y-%m') if col == 'TransactionMonth' else data[col]
+            for col in CUBE_DIMENSIONS]
+    cube = values.groupby(keys, dropna=False, observed=True, sort=False).sum()
+    cube.index.names = CUBE_DIMENSIONS
+    return cube.reset_index()[CUBE_DIMENSIONS + CUBE_MEASURES]
+
+
+# Function to merge cubes cell by cell (all measures are additive)
+def merge_cubes(*cubes):
+    cubes = [cube for cube in cubes if len(cube)]
+    if not cubes:
+        return empty_cube()
+    combined = pd.concat([cube.astype({col: 'object' for col in CUBE_DIMENSIONS}) for cube in cubes],
+                         ignore_index=True)
+    return combined.groupby(CUBE_DIMENSIONS, dropna=False, sort=False)[CUBE_MEASURES].sum().reset_index()
+
+
+def load_cube(path=CUBE_PATH):
+    return pd.read_parquet(path) if os.path.exists(path) else empty_cube()
+
+
+# Dimensions are stored as categoricals (dictionary-encoded in Parquet, fast to filter and group)
+def save_cube(cube, path=CUBE_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    cube.astype({col: 'category' for col in CUBE_DIMENSIONS}).to_parquet(path, index=False)
+
+
+# Function to fold new policies into the stored cube, streaming the input. With replace=True, stored
+# cells of the months being loaded are dropped first, so re-running a month does not count it twice.
+def update_cube(input_path, path=CUBE_PATH, months=None, replace=False, batch_size=256 * 1024):
+    columns = CUBE_DIMENSIONS + ['TotalPremium', 'TotalClaims']
+    filters = [('TransactionMonth', 'in', list(months))] if months else None
+    pending, rows = [], 0
+    for batch in iter_batches(input_path, columns=columns, filters=filters, batch_size=batch_size):
+        pending.append(batch_cube(batch))
+        rows += len(batch)
+        if len(pending) >= MERGE_FANIN:
+            pending = [merge_cubes(*pending)]
+    new = merge_cubes(*pending)
+
+    stored = load_cube(path)
+    if replace and len(stored):
+        stored = stored[~stored['TransactionMonth'].isin(new['TransactionMonth'].unique())]
+    cube = merge_cubes(stored, new)
+    save_cube(cube, path)
+    print(f"Merged {rows} policies over {new['TransactionMonth'].nunique()} months into {len(cube)} cube cells at {path}")
+    return cube
+
+
+# Function to add frequency, severity, loss ratio and margin (with severity / margin std) to summed measures
+def cube_metrics(totals):
+    totals = totals.copy()
+    policies, claims = totals['policies'].astype('float64'), totals['claims'].astype('float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        totals['frequency'] = claims / policies
+        totals['severity'] = (totals['total_claims'] / claims).where(claims > 0)
+        totals['loss_ratio'] = (totals['total_claims'] / totals['premium']).where(totals['premium'] != 0)
+        totals['margin'] = totals['premium'] - totals['total_claims']
+        totals['margin_per_policy'] = totals['margin'] / policies
+        severity_var = (totals['claims_sq'] - totals['total_claims'] ** 2 / claims) / (claims - 1)
+        margin_var = (totals['margin_sq'] - totals['margin'] ** 2 / policies) / (policies - 1)
+    totals['severity_std'] = np.sqrt(severity_var.clip(lower=0)).where(claims > 1)
+    totals['margin_std'] = np.sqrt(margin_var.clip(lower=0)).where(policies > 1)
+    return totals
+
+
+# Slice-and-roll-up queries on the persisted cube. Filters take a value, a list of values, or a
+# (first, last) tuple for an inclusive range of an ordered dimension such as TransactionMonth.
+class PortfolioCube:
+    def __init__(self, cube):
+        self.cube = cube.astype({col: 'category' for col in CUBE_DIMENSIONS})
+
+    @classmethod
+    def load(cls, path=CUBE_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Portfolio cube not found at {path}; build it with 'update' first")
+        return cls(load_cube(path))
+
+    def _mask(self, where):
+        mask = np.ones(len(self.cube), dtype=bool)
+        for col, value in (where or {}).items():
+            if col not in CUBE_DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension: {col}")
+            values = self.cube[col]
+            # Command-line values arrive as strings; codes such as PostalCode are stored as numbers
+            if pd.api.types.is_numeric_dtype(values.cat.categories):
+                value = type(value)(pd.to_numeric(list(value))) if isinstance(value, (tuple, list, set)) \
+                    else pd.to_numeric(value)
+            if isinstance(value, tuple):
+                categories = values.cat.categories
+                kept = categories[(categories >= value[0]) & (categories <= value[1])]
+                mask &= values.isin(kept).to_numpy()
+            elif isinstance(value, (list, set)):
+                mask &= values.isin(list(value)).to_numpy()
+            else:
+                mask &= (values == value).to_numpy()
+        return mask
+
+    # Function to sum the measures over the cells matching where, grouped by the dimensions in by
+    # (none: one portfolio total row), with the derived metrics
+    def query(self, by=None, where=None):
+        cells = self.cube[self._mask(where)]
+        by = [by] if isinstance(by, str) else list(by or [])
+        if by:
+            totals = cells.groupby(by, observed=True, sort=True)[CUBE_MEASURES].sum()
+        else:
+            totals = cells[CUBE_MEASURES].sum().to_frame('total').T.astype({'policies': 'int64', 'claims': 'int64'})
+        return cube_metrics(totals)
+
+    # Function to express a roll-up in the sufficient-statistics layout of group_stats (uncentred, so
+    # shifts are 0), so chi_squared, welch_t, anova and tukey_hsd run on any slice without raw rows
+    def group_summary(self, group_col, where=None):
+        totals = self.query(group_col, where)
+        summary = pd.DataFrame({'n': totals['policies'], 'claims': totals['claims']}, index=totals.index)
+        for metric, total, sumsq, count in [('TotalClaims', 'total_claims', 'claims_sq', 'policies'),
+                                            ('Margin', 'margin', 'margin_sq', 'policies'),
+                                            (SEVERITY, 'total_claims', 'claims_sq', 'claims')]:
+            summary[f'{metric}_count'] = totals[count]
+            summary[f'{metric}_sum'] = totals[total]
+            summary[f'{metric}_sumsq'] = totals[sumsq]
+        summary.index.name = group_col
+        summary.attrs['shifts'] = {'TotalClaims': 0.0, 'Margin': 0.0, SEVERITY: 0.0}
+        return summary
+
+
+# Function to parse --where col=value, col=a,b (any of) or col=first:last (inclusive range)
+def parse_where(terms):
+    where = {}
+    for term in terms or []:
+        col, value = term.split('=', 1)
+        if ':' in value:
+            where[col] = tuple(value.split(':', 1))
+        elif ',' in value:
+            where[col] = value.split(',')
+        else:
+            where[col] = value
+    return where
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pre-aggregated portfolio cube for loss-ratio and margin slicing')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    update_parser = subparsers.add_parser('update', help='Merge new policies into the stored cube')
+    update_parser.add_argument('--input', default=None, help='Parquet file or partitioned dataset with the new rows')
+    update_parser.add_argument('--months', nargs='+', default=None, help='Only load these months (YYYY-MM)')
+    update_parser.add_argument('--replace', action='store_true', help='Replace, rather than add to, stored months')
+    query_parser = subparsers.add_parser('query', help='Roll up and slice the cube')
+    query_parser.add_argument('--by', nargs='*', default=[], choices=CUBE_DIMENSIONS, help='Dimensions to group by')
+    query_parser.add_argument('--where', nargs='*', default=[],
+                              help='Filters: Province=Gauteng, Gender=Male,Female or TransactionMonth=2015-01:2015-06')
+    parser.add_argument('--store', default=CUBE_PATH, help='Cube Parquet file')
+    args = parser.parse_args()
+
+    if args.command == 'update':
+        update_cube(args.input, args.store, args.months, args.replace)
+    else:
+        cube = PortfolioCube.load(args.store)
+        start = time.perf_counter()
+        result = cube.query(args.by, parse_where(args.where))
+        elapsed = (time.perf_counter() - start) * 1000
+        columns = ['policies', 'claims', 'premium', 'total_claims', 'frequency', 'severity', 'loss_ratio', 'margin']
+        with pd.option_context('display.width', 200, 'display.max_rows', 100):
+            print(result[columns])
+        print(f"{len(result)} rows from {len(cube.cube)} cube cells in {elapsed:.1f} ms")
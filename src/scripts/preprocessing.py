@@ -0,0 +1,175 @@
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pickle
+from src.scripts.sketches import ColumnSummaries
+
+# Code given to categories not seen during fit
+UNKNOWN_CODE = -1
+
+# Columns excluded from the model features
+TARGET_COLUMNS = ['TotalClaims', 'ClaimOccurred', 'TotalPremium', 'CalculatedPremiumPerTerm']
+
+
+# Fitted preprocessing used by task4_data_preparation.py and reused at scoring time:
+# drops high-missing and datetime columns, imputes medians/modes, engineers PolicyAge,
+# ClaimOccurred and LossRatio, and encodes categoricals with the LabelEncoder ordering
+class InsurancePreprocessor:
+    def __init__(self, missing_threshold=0.9, reference_year=2025):
+        self.missing_threshold = missing_threshold
+        self.reference_year = reference_year
+
+    # Learn drop lists, imputation values and category arrays from the training frame
+    def fit(self, data):
+        missing_counts = data.isnull().sum()
+        kept = missing_counts[missing_counts <= self.missing_threshold * len(data)].index
+        numerical_cols = list(data[kept].select_dtypes(include=['number']).columns)
+        categorical_cols = data[kept].select_dtypes(include=['object', 'category']).columns
+
+        # Medians of all numerical columns in one vectorized call, one value count per categorical
+        medians = data[numerical_cols].median() if numerical_cols else pd.Series(dtype=float)
+        value_counts = {col: data[col].value_counts(dropna=True) for col in categorical_cols}
+        return self._fit_statistics(data.dtypes, missing_counts, len(data), medians, value_counts)
+
+    # Learn the same statistics out of core from mergeable column summaries
+    def fit_summaries(self, summaries):
+        value_counts = {col: summaries.value_counts(col) for col in summaries.frequencies}
+        return self._fit_statistics(pd.Series(summaries.dtypes), summaries.missing_counts(), summaries.n_rows,
+                                    summaries.medians(), value_counts)
+
+    def fit_batches(self, batches, k=2048):
+        summaries = ColumnSummaries(k)
+        for batch in batches:
+            summaries.update(batch.to_pandas() if isinstance(batch, (pa.RecordBatch, pa.Table)) else batch)
+        return self.fit_summaries(summaries)
+
+    def _fit_statistics(self, dtypes, missing_counts, n_rows, medians, value_counts):
+        self.missing_counts_ = missing_counts
+        self.n_rows_ = n_rows
+        self.dropped_columns_ = list(missing_counts[missing_counts > self.missing_threshold * n_rows].index)
+        kept = [col for col in dtypes.index if col not in self.dropped_columns_]
+
+        self.datetime_columns_ = [col for col in kept if pd.api.types.is_datetime64_any_dtype(dtypes[col])]
+        self.columns_ = [col for col in kept if col not in self.datetime_columns_]
+        if 'VehicleIntroDate' in self.datetime_columns_:
+            self.columns_.append('VehicleIntroYear')
+
+        numerical_cols = [col for col in self.columns_ if col in dtypes.index
+                          and pd.api.types.is_numeric_dtype(dtypes[col]) and not pd.api.types.is_bool_dtype(dtypes[col])]
+        self.numerical_fill_ = {col: (medians[col] if col in medians.index and pd.notna(medians[col]) else 0)
+                                for col in numerical_cols}
+
+        # Modes and sorted category arrays from the value counts
+        self.categorical_fill_ = {}
+        self.categories_ = {}
+        for col in self.columns_:
+            if col not in dtypes.index or not (dtypes[col] == object or isinstance(dtypes[col], pd.CategoricalDtype)):
+                continue
+            counts = value_counts.get(col, pd.Series(dtype='int64'))
+            counts = counts[counts > 0]
+            if len(counts) > 0:
+                # Ties resolve to the smallest value, as Series.mode()[0] does
+                top = counts[counts == counts.max()].index
+                self.categorical_fill_[col] = sorted(top)[0]
+                self.categories_[col] = np.array(sorted(counts.index), dtype=object)
+            else:
+                self.categorical_fill_[col] = 'Unknown'
+                self.categories_[col] = np.array(['Unknown'], dtype=object)
+
+        engineered = ['ClaimOccurred', 'LossRatio']
+        if 'RegistrationYear' in self.columns_:
+            engineered.insert(0, 'PolicyAge')
+        self.output_columns_ = self.columns_ + engineered
+        self.features_ = [col for col in self.output_columns_ if col not in TARGET_COLUMNS]
+        return self
+
+    # Raw columns transform() reads (lets callers project Parquet reads)
+    def input_columns(self):
+        columns = [col for col in self.columns_ if col != 'VehicleIntroYear']
+        if 'VehicleIntroYear' in self.columns_:
+            columns.append('VehicleIntroDate')
+        return columns
+
+    # Index of the fitted classes per column, built once (its hash table is cached by pandas)
+    def _class_index(self, col):
+        if not hasattr(self, '_class_indexes'):
+            self._class_indexes = {}
+        if col not in self._class_indexes:
+            self._class_indexes[col] = pd.Index(self.categories_[col])
+        return self._class_indexes[col]
+
+    # Map a column to its fitted codes through precomputed lookup arrays
+    def _encode(self, series, col):
+        index = self._class_index(col)
+        fill_code = index.get_loc(self.categorical_fill_[col])
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Translate each category once, then gather by the category codes;
+            # position -1 (missing) picks the appended imputation code
+            lookup = np.append(index.get_indexer(series.cat.categories), fill_code).astype(np.int32)
+            codes = lookup[series.cat.codes.to_numpy()]
+        else:
+            codes = index.get_indexer(series.to_numpy(dtype=object)).astype(np.int32)
+            codes[series.isna().to_numpy()] = fill_code
+        codes[codes < 0] = UNKNOWN_CODE
+        return pd.Series(codes, index=series.index, name=col)
+
+    # Lookup caches are rebuilt on demand rather than pickled
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_class_indexes', None)
+        return state
+
+    # Apply the fitted steps to a new frame
+    def transform(self, data):
+        out = {}
+        for col in self.columns_:
+            if col == 'VehicleIntroYear':
+                out[col] = data['VehicleIntroDate'].dt.year.fillna(0).astype(int)
+                continue
+            # Columns absent at scoring time (e.g. targets) are imputed like missing values
+            series = data[col] if col in data.columns else pd.Series(np.nan, index=data.index, name=col)
+            if col in self.categories_:
+                out[col] = self._encode(series, col)
+            elif col in self.numerical_fill_:
+                out[col] = series.fillna(self.numerical_fill_[col])
+            else:
+                out[col] = series
+        df = pd.DataFrame(out, index=data.index)
+
+        # Feature engineering
+        if 'PolicyAge' in self.output_columns_:
+            df['PolicyAge'] = self.reference_year - df['RegistrationYear']
+        df['ClaimOccurred'] = df['TotalClaims'] > 0
+        df['LossRatio'] = df['TotalClaims'] / df['TotalPremium'].replace(0, np.nan)
+        df['LossRatio'] = df['LossRatio'].fillna(0)
+        return df
+
+    def fit_transform(self, data):
+        return self.fit(data).transform(data)
+
+    # Transform an iterable of DataFrames or Arrow batches chunk by chunk
+    def transform_batches(self, batches):
+        for batch in batches:
+            if isinstance(batch, (pa.RecordBatch, pa.Table)):
+                batch = batch.to_pandas()
+            yield self.transform(batch)
+
+    # LabelEncoders equivalent to the fitted category arrays (kept for models/label_encoders.pkl)
+    def label_encoders(self):
+        # Imported here so loading a preprocessor for scoring does not pull in scikit-learn
+        from sklearn.preprocessing import LabelEncoder
+        encoders = {}
+        for col, classes in self.categories_.items():
+            le = LabelEncoder()
+            le.classes_ = classes
+            encoders[col] = le
+        return encoders
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
@@ -0,0 +1,239 @@
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import queue
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.scripts.batch_scoring import (PREPROCESSOR_PATH, PROBABILITY_MODEL, SEVERITY_MODEL,
+                                       load_scoring_models, score_frame, set_threads)
+from src.scripts.model_registry import REGISTRY_DIR
+
+RESULT_COLUMNS = ['ClaimProbability', 'ExpectedSeverity', 'PurePremium']
+
+
+# Rolling request latency and batch-size metrics
+class ServiceMetrics:
+    def __init__(self, window=10000):
+        self.lock = threading.Lock()
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+
+    def record_request(self, latency_ms, ok=True):
+        with self.lock:
+            self.latencies_ms.append(latency_ms)
+            self.requests += 1
+            self.errors += 0 if ok else 1
+
+    def record_batch(self, size):
+        with self.lock:
+            self.batch_sizes.append(size)
+
+    def snapshot(self, queue_depth):
+        with self.lock:
+            latencies = np.array(self.latencies_ms)
+            batch_sizes = np.array(self.batch_sizes)
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'queue_depth': queue_depth,
+                'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                'latency_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+                'mean_batch_size': float(batch_sizes.mean()) if len(batch_sizes) else None,
+                'batches': len(batch_sizes)
+            }
+
+
+# Groups concurrent requests into one predict call. The first queued request opens a window of
+# max_wait_ms; everything arriving before it closes (up to max_batch_rows) is scored together.
+class MicroBatcher:
+    def __init__(self, score_fn, max_batch_rows=256, max_wait_ms=2.0, metrics=None):
+        self.score_fn = score_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics or ServiceMetrics()
+        self.queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # Queue a list of policy records; the future resolves to one result dict per record
+    def submit(self, records):
+        future = Future()
+        self.queue.put((records, future))
+        return future
+
+    def _collect(self):
+        pending = [self.queue.get()]
+        rows = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            rows += len(item[0])
+        return pending
+
+    def _score(self, records):
+        scored = self.score_fn(pd.DataFrame.from_records(records))
+        return scored[RESULT_COLUMNS].to_dict(orient='records')
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            records = [record for request_records, _ in pending for record in request_records]
+            try:
+                results = self._score(records)
+            except Exception as error:
+                if len(pending) == 1:
+                    pending[0][1].set_exception(error)
+                    continue
+                # A bad record must not fail the requests batched with it: score each request on its own
+                for request_records, future in pending:
+                    try:
+                        future.set_result(self._score(request_records))
+                    except Exception as request_error:
+                        future.set_exception(request_error)
+                continue
+            self.metrics.record_batch(len(records))
+            offset = 0
+            for request_records, future in pending:
+                future.set_result(results[offset:offset + len(request_records)])
+                offset += len(request_records)
+
+
+# Models, preprocessing and batcher kept warm for the lifetime of the service
+class QuoteService:
+    def __init__(self, preprocessor_path=PREPROCESSOR_PATH, prob_model=PROBABILITY_MODEL, sev_model=SEVERITY_MODEL,
+                 registry_dir=REGISTRY_DIR, max_batch_rows=256, max_wait_ms=2.0, model_threads=1):
+        self.preprocessor, self.prob_model, self.sev_model = load_scoring_models(
+            preprocessor_path, prob_model, sev_model, registry_dir)
+        for model in (self.prob_model, self.sev_model):
+            # Small batches are faster without thread fan-out
+            set_threads(model, model_threads)
+        self.metrics = ServiceMetrics()
+        self.batcher = MicroBatcher(self.score, max_batch_rows, max_wait_ms, self.metrics)
+        # Warm-up call so the first real request does not pay for lazy initialization
+        self.score(pd.DataFrame([{}]))
+
+    def score(self, df):
+        return score_frame(df, self.preprocessor, self.prob_model, self.sev_model)
+
+    def quote(self, records, timeout=30):
+        start = time.perf_counter()
+        try:
+            results = self.batcher.submit(records).result(timeout)
+        except Exception:
+            self.metrics.record_request((time.perf_counter() - start) * 1000, ok=False)
+            raise
+        self.metrics.record_request((time.perf_counter() - start) * 1000)
+        return results
+
+    def stats(self):
+        return self.metrics.snapshot(self.batcher.queue.qsize())
+
+
+def make_handler(service):
+    class QuoteHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._send_json(200, service.stats())
+            elif self.path == '/health':
+                self._send_json(200, {'status': 'ok'})
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        # POST /quote with one policy object or a list of policies
+        def do_POST(self):
+            if self.path != '/quote':
+                self._send_json(404, {'error': 'not found'})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                records = payload if isinstance(payload, list) else [payload]
+                results = service.quote(records)
+            except (ValueError, KeyError, TypeError) as error:
+                self._send_json(400, {'error': str(error)})
+                return
+            except TimeoutError:
+                self._send_json(504, {'error': 'quote timed out'})
+                return
+            except Exception as error:
+                self._send_json(500, {'error': f'{type(error).__name__}: {error}'})
+                return
+            self._send_json(200, results if isinstance(payload, list) else results[0])
+
+        def log_message(self, format, *args):
+            pass
+
+    return QuoteHandler
+
+
+def serve(host='127.0.0.1', port=8080, **service_kwargs):
+    service = QuoteService(**service_kwargs)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Quote service listening on http://{host}:{port} (POST /quote, GET /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# Function to load-test a running service from this machine with concurrent single-policy quotes
+def load_test(url, policies, requests=1000, concurrency=16):
+    def send(i):
+        body = json.dumps(policies[i % len(policies)]).encode()
+        request = urllib.request.Request(url + '/quote', data=body, headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = np.array(list(pool.map(send, range(requests))))
+    elapsed = time.perf_counter() - start
+    print(f"{requests} requests in {elapsed:.1f}s ({requests / elapsed:.0f} req/s), client latency "
+          f"p50 {np.percentile(latencies, 50):.1f} ms, p99 {np.percentile(latencies, 99):.1f} ms")
+    with urllib.request.urlopen(url + '/metrics') as response:
+        print("Service metrics:", json.loads(response.read()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local quoting service with micro-batched predictions')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch-rows', type=int, default=256, help='Largest micro-batch sent to predict')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help='Micro-batching latency window')
+    parser.add_argument('--load-test', metavar='PARQUET', default=None,
+                        help='Instead of serving, send quotes for policies from this file to a running service')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    if args.load_test:
+        sample = pd.read_parquet(args.load_test).head(1000)
+        policies = json.loads(sample.to_json(orient='records', date_format='iso'))
+        load_test(f'http://{args.host}:{args.port}', policies, args.requests, args.concurrency)
+    else:
+        serve(args.host, args.port, max_batch_rows=args.max_batch_rows, max_wait_ms=args.max_wait_ms)
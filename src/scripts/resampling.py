@@ -0,0 +1,130 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Resamples per seeded chunk: each chunk gets its own child seed, so results do not depend on
+# how chunks are spread over workers
+CHUNK_RESAMPLES = 1000
+
+# Upper bound on the elements of one batched index matrix
+MAX_BATCH_ELEMENTS = 4_000_000
+
+
+def _batch_rows(row_length):
+    return max(1, MAX_BATCH_ELEMENTS // max(row_length, 1))
+
+
+# Function to compute mean differences for a chunk of label permutations. Each batch permutes a
+# matrix of row indices at once; only the smaller group's sum is gathered, the other follows from the total.
+def _permutation_chunk(pooled, n1, n_resamples, seed):
+    rng = np.random.default_rng(seed)
+    n2 = len(pooled) - n1
+    small = min(n1, n2)
+    total = pooled.sum()
+    results = np.empty(n_resamples)
+    batch = _batch_rows(len(pooled))
+    for start in range(0, n_resamples, batch):
+        rows = min(batch, n_resamples - start)
+        indices = rng.permuted(np.broadcast_to(np.arange(len(pooled)), (rows, len(pooled))), axis=1)
+        small_sum = pooled[indices[:, :small]].sum(axis=1)
+        sum1 = small_sum if small == n1 else total - small_sum
+        results[start:start + rows] = sum1 / n1 - (total - sum1) / n2
+    return results
+
+
+# Function to compute mean differences for a chunk of bootstrap resamples (with replacement, per group)
+def _bootstrap_chunk(x, y, n_resamples, seed):
+    rng = np.random.default_rng(seed)
+    results = np.empty(n_resamples)
+    batch = _batch_rows(max(len(x), len(y)))
+    for start in range(0, n_resamples, batch):
+        rows = min(batch, n_resamples - start)
+        means_x = x[rng.integers(0, len(x), (rows, len(x)))].mean(axis=1)
+        means_y = y[rng.integers(0, len(y), (rows, len(y)))].mean(axis=1)
+        results[start:start + rows] = means_x - means_y
+    return results
+
+
+# Function to run seeded chunks of resamples, in a process pool when workers > 1
+def _run_chunks(chunk_fn, arrays, n_resamples, seed, workers):
+    sizes = [min(CHUNK_RESAMPLES, n_resamples - start) for start in range(0, n_resamples, CHUNK_RESAMPLES)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(min(workers, len(sizes))) as pool:
+            futures = [pool.submit(chunk_fn, *arrays, size, child) for size, child in zip(sizes, seeds)]
+            results = [future.result() for future in futures]
+    else:
+        results = [chunk_fn(*arrays, size, child) for size, child in zip(sizes, seeds)]
+    elapsed = time.perf_counter() - start
+    return np.concatenate(results) if results else np.empty(0), elapsed
+
+
+def _as_array(values):
+    return pd.Series(values).dropna().to_numpy(dtype='float64')
+
+
+# Function to run a two-sided permutation test of the difference in means between two samples
+def permutation_test(x, y, n_resamples=10000, seed=42, workers=None):
+    x, y = _as_array(x), _as_array(y)
+    observed = x.mean() - y.mean()
+    pooled = np.concatenate([x, y])
+    diffs, elapsed = _run_chunks(_permutation_chunk, (pooled, len(x)), n_resamples, seed, workers)
+    # Small tolerance so permutations tying the observed statistic count as extreme
+    extreme = np.count_nonzero(np.abs(diffs) >= np.abs(observed) * (1 - 1e-12))
+    return {
+        'statistic': observed,
+        'p_value': (extreme + 1) / (n_resamples + 1),
+        'n_resamples': n_resamples,
+        'seconds': elapsed,
+        'resamples_per_second': n_resamples / elapsed if elapsed > 0 else float('nan')
+    }
+
+
+# Function to compute a percentile bootstrap confidence interval for the difference in means
+def bootstrap_ci(x, y, n_resamples=10000, confidence=0.95, seed=42, workers=None):
+    x, y = _as_array(x), _as_array(y)
+    diffs, elapsed = _run_chunks(_bootstrap_chunk, (x, y), n_resamples, seed, workers)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(diffs, [alpha, 1 - alpha])
+    return {
+        'statistic': x.mean() - y.mean(),
+        'ci_low': low,
+        'ci_high': high,
+        'confidence': confidence,
+        'n_resamples': n_resamples,
+        'seconds': elapsed,
+        'resamples_per_second': n_resamples / elapsed if elapsed > 0 else float('nan')
+    }
+
+
+# Function to split a metric into the two groups' samples in one pass over the rows
+def two_samples(data, group_col, group1, group2, metric):
+    keys = data[group_col]
+    values = data[metric]
+    return values[keys == group1], values[keys == group2]
+
+
+# Drop-in resampling counterpart of t_test: (mean difference, permutation p-value), plus the
+# bootstrap confidence interval and throughput in details
+def resampling_t_test(data, group_col, group1, group2, metric, n_resamples=10000, seed=42, workers=None,
+                      details=None):
+    x, y = two_samples(data, group_col, group1, group2, metric)
+    x, y = _as_array(x), _as_array(y)
+    if len(x) < 2 or len(y) < 2:
+        print(f"Warning: Insufficient data for resampling test on {metric} in {group_col} (sizes: {len(x)}, {len(y)})")
+        return np.nan, np.nan
+    permutation = permutation_test(x, y, n_resamples, seed, workers)
+    bootstrap = bootstrap_ci(x, y, n_resamples, seed=seed, workers=workers)
+    if details is not None:
+        details.update({'permutation': permutation, 'bootstrap': bootstrap})
+    return permutation['statistic'], permutation['p_value']
+
+
+# Drop-in resampling counterpart of chi_squared_test: permutation test of the claim frequency difference
+def resampling_chi_squared_test(data, group_col, group1, group2, n_resamples=10000, seed=42, workers=None,
+                                details=None):
+    return resampling_t_test(data, group_col, group1, group2, 'ClaimOccurred', n_resamples, seed, workers, details)
@@ -0,0 +1,48 @@
+import os
+import threading
+import time
+import psutil
+
+
+# Measures wall time, CPU time (all threads of this process) and peak resident memory of a block.
+# Peak RSS is sampled from a background thread, which works the same on every platform. With
+# children=True, CPU time of child processes reaped during the block (e.g. process pools) is added
+# where the platform reports it (Linux; psutil returns 0 on Windows and macOS).
+class ResourceMonitor:
+    def __init__(self, interval=0.05, children=False):
+        self.interval = interval
+        self.children = children
+        self.process = psutil.Process(os.getpid())
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+
+    def __enter__(self):
+        self.peak_rss = self.start_rss = self.process.memory_info().rss
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._cpu = self.process.cpu_times()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_seconds = time.perf_counter() - self._wall
+        cpu = self.process.cpu_times()
+        self.cpu_seconds = (cpu.user - self._cpu.user) + (cpu.system - self._cpu.system)
+        if self.children:
+            self.cpu_seconds += (cpu.children_user - self._cpu.children_user) + \
+                (cpu.children_system - self._cpu.children_system)
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+        return False
+
+    def stats(self):
+        return {
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'peak_memory_mb': self.peak_rss / 1024 ** 2,
+            'memory_increase_mb': (self.peak_rss - self.start_rss) / 1024 ** 2
+        }
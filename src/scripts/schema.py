@@ -0,0 +1,80 @@
+import pandas as pd
+import pyarrow as pa
+
+# Column types of the raw MachineLearningRating_v3 extract
+STRING_COLUMNS = [
+    'Citizenship', 'LegalType', 'Title', 'Language', 'Bank', 'AccountType', 'MaritalStatus',
+    'Gender', 'Country', 'Province', 'MainCrestaZone', 'SubCrestaZone', 'ItemType', 'VehicleType',
+    'make', 'Model', 'bodytype', 'VehicleIntroDate', 'AlarmImmobiliser', 'TrackingDevice',
+    'NewVehicle', 'WrittenOff', 'Rebuilt', 'Converted', 'CrossBorder', 'TermFrequency',
+    'ExcessSelected', 'CoverCategory', 'CoverType', 'CoverGroup', 'Section', 'Product',
+    'StatutoryClass', 'StatutoryRiskType'
+]
+INTEGER_COLUMNS = ['UnderwrittenCoverID', 'PolicyID', 'PostalCode', 'RegistrationYear']
+FLOAT_COLUMNS = [
+    'mmcode', 'Cylinders', 'cubiccapacity', 'kilowatts', 'NumberOfDoors', 'CustomValueEstimate',
+    'CapitalOutstanding', 'NumberOfVehiclesInFleet', 'SumInsured', 'CalculatedPremiumPerTerm',
+    'TotalPremium', 'TotalClaims'
+]
+BOOLEAN_COLUMNS = ['IsVATRegistered']
+DATETIME_COLUMNS = ['TransactionMonth']
+
+# Column order as it appears in the extract
+COLUMN_ORDER = [
+    'UnderwrittenCoverID', 'PolicyID', 'TransactionMonth', 'IsVATRegistered', 'Citizenship',
+    'LegalType', 'Title', 'Language', 'Bank', 'AccountType', 'MaritalStatus', 'Gender', 'Country',
+    'Province', 'PostalCode', 'MainCrestaZone', 'SubCrestaZone', 'ItemType', 'mmcode', 'VehicleType',
+    'RegistrationYear', 'make', 'Model', 'Cylinders', 'cubiccapacity', 'kilowatts', 'bodytype',
+    'NumberOfDoors', 'VehicleIntroDate', 'CustomValueEstimate', 'AlarmImmobiliser', 'TrackingDevice',
+    'CapitalOutstanding', 'NewVehicle', 'WrittenOff', 'Rebuilt', 'Converted', 'CrossBorder',
+    'NumberOfVehiclesInFleet', 'SumInsured', 'TermFrequency', 'CalculatedPremiumPerTerm',
+    'ExcessSelected', 'CoverCategory', 'CoverType', 'CoverGroup', 'Section', 'Product',
+    'StatutoryClass', 'StatutoryRiskType', 'TotalPremium', 'TotalClaims'
+]
+
+# Low-cardinality columns stored with Parquet dictionary encoding
+DICTIONARY_COLUMNS = [
+    'Citizenship', 'LegalType', 'Title', 'Language', 'Bank', 'AccountType', 'MaritalStatus',
+    'Gender', 'Country', 'Province', 'MainCrestaZone', 'ItemType', 'VehicleType', 'make',
+    'bodytype', 'AlarmImmobiliser', 'TrackingDevice', 'NewVehicle', 'WrittenOff', 'Rebuilt',
+    'Converted', 'CrossBorder', 'TermFrequency', 'ExcessSelected', 'CoverCategory', 'CoverType',
+    'CoverGroup', 'Section', 'Product', 'StatutoryClass', 'StatutoryRiskType'
+]
+
+
+def _arrow_type(col):
+    if col in INTEGER_COLUMNS:
+        return pa.int64()
+    if col in FLOAT_COLUMNS:
+        return pa.float64()
+    if col in BOOLEAN_COLUMNS:
+        return pa.bool_()
+    if col in DATETIME_COLUMNS:
+        return pa.timestamp('ns')
+    return pa.string()
+
+
+# Fixed Arrow schema so every chunk lands in the same Parquet layout
+RAW_SCHEMA = pa.schema([pa.field(col, _arrow_type(col)) for col in COLUMN_ORDER])
+
+
+# Function to coerce a raw chunk (read with dtype=str) to the fixed schema
+def coerce_chunk(chunk):
+    extra_cols = [col for col in chunk.columns if col not in RAW_SCHEMA.names]
+    if extra_cols:
+        print(f"Warning: Dropping columns not in schema: {extra_cols}")
+    chunk = chunk.reindex(columns=RAW_SCHEMA.names)
+    for col in DATETIME_COLUMNS:
+        chunk[col] = pd.to_datetime(chunk[col], errors='coerce')
+    for col in INTEGER_COLUMNS:
+        chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype('Int64')
+    for col in FLOAT_COLUMNS:
+        chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+    for col in BOOLEAN_COLUMNS:
+        chunk[col] = chunk[col].map({'True': True, 'False': False, True: True, False: False})
+    return chunk
+
+
+# Function to convert a coerced chunk into an Arrow table with the fixed schema
+def to_arrow_table(chunk):
+    return pa.Table.from_pandas(coerce_chunk(chunk), schema=RAW_SCHEMA, preserve_index=False)
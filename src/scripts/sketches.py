@@ -0,0 +1,116 @@
+import pandas as pd
+import numpy as np
+from collections import Counter
+
+
+# Mergeable approximate quantile sketch (KLL-style compactors). Items on level h
+# stand for 2**h original values; rank error shrinks roughly as 1/k.
+class QuantileSketch:
+    def __init__(self, k=2048, seed=0):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(8, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # Keep one item back when the count is odd, promote every other item
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                promoted = pairs[self._rng.integers(2)::2]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        if self.count == 0:
+            return np.nan
+        if len(self.levels) == 1:
+            # Nothing compacted yet: exact, interpolated like Series.quantile
+            return float(np.quantile(self.levels[0], q))
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        return float(items[min(np.searchsorted(cumulative, q * cumulative[-1]), len(items) - 1)])
+
+    def median(self):
+        return self.quantile(0.5)
+
+
+# Mergeable per-column summaries for out-of-core preprocessing: row and missing counts,
+# quantile sketches for numerical columns and exact frequency tables for categoricals
+class ColumnSummaries:
+    def __init__(self, k=2048):
+        self.k = k
+        self.n_rows = 0
+        self.columns = []
+        self.dtypes = {}
+        self.missing = Counter()
+        self.sketches = {}
+        self.frequencies = {}
+
+    def update(self, df):
+        if not self.columns:
+            self.columns = list(df.columns)
+            self.dtypes = df.dtypes.to_dict()
+        self.n_rows += len(df)
+        self.missing.update(df.isnull().sum().to_dict())
+        for col in df.select_dtypes(include=['number']).columns:
+            self.sketches.setdefault(col, QuantileSketch(self.k)).update(df[col].to_numpy(dtype=float, na_value=np.nan))
+        for col in df.select_dtypes(include=['object', 'category']).columns:
+            counts = df[col].value_counts(dropna=True)
+            self.frequencies.setdefault(col, Counter()).update(counts[counts > 0].to_dict())
+        return self
+
+    def merge(self, other):
+        if not self.columns:
+            self.columns, self.dtypes = other.columns, other.dtypes
+        self.n_rows += other.n_rows
+        self.missing.update(other.missing)
+        for col, sketch in other.sketches.items():
+            if col in self.sketches:
+                self.sketches[col].merge(sketch)
+            else:
+                self.sketches[col] = sketch
+        for col, counts in other.frequencies.items():
+            self.frequencies.setdefault(col, Counter()).update(counts)
+        return self
+
+    def missing_counts(self):
+        return pd.Series({col: self.missing.get(col, 0) for col in self.columns}, dtype='int64')
+
+    def medians(self):
+        return pd.Series({col: sketch.median() for col, sketch in self.sketches.items()}, dtype=float)
+
+    def value_counts(self, col):
+        return pd.Series(self.frequencies.get(col, {}), dtype='int64')
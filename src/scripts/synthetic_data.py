@@ -0,0 +1,246 @@
+import pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
+import argparse
+import os
+import time
+from src.scripts.schema import COLUMN_ORDER, DICTIONARY_COLUMNS, RAW_SCHEMA, to_arrow_table
+
+# Synthetic MachineLearningRating_v3 extract for reproducible timing: the real data is tracked
+# by DVC and not in the repo. Rows are generated in independently seeded chunks, so any size
+# (100k to 50M rows) streams to disk in bounded memory and the same seed gives the same data.
+CHUNK_ROWS = 500_000
+MONTHS = pd.date_range('2013-10-01', '2015-08-01', freq='MS')
+MAX_POLICY_MONTHS = 18
+
+# Province shares of the book
+PROVINCES = {
+    'Gauteng': 0.39, 'Western Cape': 0.17, 'KwaZulu-Natal': 0.17, 'North West': 0.14, 'Mpumalanga': 0.05,
+    'Eastern Cape': 0.03, 'Limpopo': 0.025, 'Free State': 0.009, 'Northern Cape': 0.006
+}
+# Claim frequency relativity per province
+PROVINCE_RISK = {
+    'Gauteng': 1.25, 'Western Cape': 0.95, 'KwaZulu-Natal': 1.1, 'North West': 0.8, 'Mpumalanga': 0.9,
+    'Eastern Cape': 0.85, 'Limpopo': 0.9, 'Free State': 0.8, 'Northern Cape': 0.7
+}
+N_POSTAL_CODES = 888
+MAKES = [
+    'TOYOTA', 'MERCEDES-BENZ', 'VOLKSWAGEN', 'NISSAN', 'FORD', 'ISUZU', 'HYUNDAI', 'AUDI', 'BMW', 'MAZDA',
+    'RENAULT', 'KIA', 'CHEVROLET', 'HONDA', 'OPEL', 'SUZUKI', 'MITSUBISHI', 'PEUGEOT', 'LAND ROVER', 'JEEP',
+    'VOLVO', 'FIAT', 'MINI', 'SUBARU', 'CITROEN', 'DAIHATSU', 'LEXUS', 'JAGUAR', 'PORSCHE', 'MAHINDRA',
+    'TATA', 'CHERY', 'GWM', 'DODGE', 'CHRYSLER', 'ALFA ROMEO', 'SSANGYONG', 'PROTON', 'INFINITI', 'IVECO',
+    'HINO', 'FAW', 'FOTON', 'JMC', 'DAEWOO', 'MAN'
+]
+N_MODELS = 411
+
+# Other categorical columns: values and shares (uniform when no shares are given)
+CATEGORIES = {
+    'Citizenship': (['  ', 'ZA', 'AF', 'ZW'], [0.9, 0.08, 0.01, 0.01]),
+    'LegalType': (['Individual', 'Private company', 'Close Corporation', 'Public company', 'Partnership',
+                   'Sole proprietor'], [0.9, 0.04, 0.03, 0.01, 0.01, 0.01]),
+    'Title': (['Mr', 'Mrs', 'Ms', 'Miss', 'Dr'], [0.84, 0.08, 0.05, 0.02, 0.01]),
+    'Language': (['English'], None),
+    'Bank': (['First National Bank', 'Standard Bank', 'ABSA Bank', 'Nedbank', 'Capitec Bank', 'Investec Bank'],
+             [0.3, 0.25, 0.2, 0.15, 0.07, 0.03]),
+    'AccountType': (['Current account', 'Savings account', 'Transmission account'], [0.6, 0.2, 0.2]),
+    'MaritalStatus': (['Not specified', 'Single', 'Married'], [0.96, 0.03, 0.01]),
+    'Gender': (['Not specified', 'Male', 'Female'], [0.9, 0.08, 0.02]),
+    'Country': (['South Africa'], None),
+    'ItemType': (['Mobility - Motor'], None),
+    'VehicleType': (['Passenger Vehicle', 'Medium Commercial', 'Heavy Commercial', 'Light Commercial', 'Bus'],
+                    [0.94, 0.04, 0.01, 0.007, 0.003]),
+    'bodytype': (['S/D', 'H/B', 'D/C', 'S/C', 'B/S', 'P/V', 'C/C', 'MPV'], [0.3, 0.2, 0.15, 0.1, 0.1, 0.05, 0.05, 0.05]),
+    'AlarmImmobiliser': (['Yes', 'No'], [0.98, 0.02]),
+    'TrackingDevice': (['No', 'Yes'], [0.75, 0.25]),
+    'NewVehicle': (['More than 6 months', 'Less than 6 months'], [0.99, 0.01]),
+    'WrittenOff': (['No', 'Yes'], [0.99, 0.01]),
+    'Rebuilt': (['No', 'Yes'], [0.99, 0.01]),
+    'Converted': (['No', 'Yes'], [0.995, 0.005]),
+    'CrossBorder': (['No'], None),
+    'TermFrequency': (['Monthly', 'Annual'], [0.99, 0.01]),
+    'ExcessSelected': (['Mobility - Windscreen', 'No excess', 'Mobility - Metered Taxis - R2000',
+                        'Mobility - Taxi with value more than R100 000', 'Mobility - Metered Taxis - R5000'],
+                       [0.4, 0.2, 0.2, 0.1, 0.1]),
+    'CoverCategory': (['Passenger Liability', 'Windscreen', 'Third Party', 'Own Damage', 'Keys and Alarms',
+                       'Income Protector', 'Signage and Vehicle Wraps', 'Emergency Charges', 'Cleaning and Removal of Accident Debris',
+                       'Accidental Death', 'Fire and Theft', 'Foreign Travel'], None),
+    'CoverType': (['Own Damage', 'Windscreen', 'Third Party', 'Passenger Liability', 'Keys and Alarms',
+                   'Income Protector', 'Signage and Vehicle Wraps', 'Emergency Charges',
+                   'Cleaning and Removal of Accident Debris', 'Accidental Death', 'Fire and Theft',
+                   'Foreign Travel', 'Theft'], None),
+    'CoverGroup': (['Comprehensive - Taxi', 'Basic Windscreen', 'Income Protector', 'Motor Comprehensive',
+                    'Standalone passenger liability', 'Third Party Only', 'Fire,Theft and Third Party'],
+                   [0.56, 0.2, 0.1, 0.08, 0.03, 0.02, 0.01]),
+    'Section': (['Motor Comprehensive', 'Optional Extended Covers', 'Third Party Only', 'Standalone passenger liability'],
+                [0.98, 0.01, 0.005, 0.005]),
+    'Product': (['Mobility Metered Taxis: Monthly', 'Mobility Commercial Cover: Monthly',
+                 'Standalone passenger liability', 'Mobility Metered Taxis: Annual'], [0.6, 0.38, 0.01, 0.01]),
+    'StatutoryClass': (['Commercial'], None),
+    'StatutoryRiskType': (['IFRS Constant'], None)
+}
+
+# Missing-value patterns: (columns missing together, share of policies)
+MISSING_BLOCKS = [
+    (['Bank', 'AccountType'], 0.04),
+    (['MaritalStatus'], 0.008),
+    (['Gender'], 0.01),
+    (['mmcode', 'VehicleType', 'make', 'Model', 'Cylinders', 'cubiccapacity', 'kilowatts', 'bodytype',
+      'NumberOfDoors', 'VehicleIntroDate'], 0.0005),
+    (['CustomValueEstimate'], 0.78),
+    (['WrittenOff', 'Rebuilt', 'Converted'], 0.64),
+    (['NewVehicle'], 0.15),
+    (['CrossBorder'], 0.9993),
+    (['NumberOfVehiclesInFleet'], 1.0),
+    (['CapitalOutstanding'], 0.0001)
+]
+
+# Claims: monthly claim probability and severity (lognormal body with a Pareto tail)
+BASE_CLAIM_RATE = 0.003
+SEVERITY_MEDIAN = 15000
+SEVERITY_SIGMA = 1.1
+TAIL_SHARE = 0.05
+TAIL_SCALE = 60000
+TAIL_ALPHA = 1.5
+
+
+# Fixed lookup tables: postal codes by province and models by make, with Zipf-like popularity
+def _lookups(seed):
+    rng = np.random.default_rng(seed)
+    provinces = list(PROVINCES)
+    shares = np.array(list(PROVINCES.values()))
+    zip_counts = np.maximum(5, np.round(shares / shares.sum() * N_POSTAL_CODES)).astype(int)
+    codes = rng.choice(np.arange(1, 10000), zip_counts.sum(), replace=False)
+    postal = {}
+    for i, province in enumerate(provinces):
+        start = zip_counts[:i].sum()
+        postal[province] = codes[start:start + zip_counts[i]]
+    make_weights = 1 / np.arange(1, len(MAKES) + 1) ** 1.2
+    model_make = np.sort(rng.choice(len(MAKES), N_MODELS, p=make_weights / make_weights.sum()))
+    # Every make has at least one model; names are stored flat with an offset per make
+    counts = np.maximum(np.bincount(model_make, minlength=len(MAKES)), 1)
+    names = [f'{make} MODEL {k + 1}' for make, count in zip(MAKES, counts) for k in range(count)]
+    return {'postal': postal, 'make_weights': make_weights / make_weights.sum(), 'model_counts': counts,
+            'model_offsets': np.cumsum(counts) - counts, 'model_names': np.array(names, dtype=object)}
+
+
+def _zipf_choice(rng, n, size, exponent=1.1):
+    weights = 1 / np.arange(1, n + 1) ** exponent
+    return rng.choice(n, size, p=weights / weights.sum())
+
+
+# Function to generate one chunk of rows: policies of 1-18 consecutive months with fixed policy
+# attributes, monthly premiums, and zero-inflated heavy-tailed claims
+def generate_chunk(n_rows, seed, first_policy_id=0, lookups=None):
+    rng = np.random.default_rng(seed)
+    lookups = lookups or _lookups(0)
+    lengths = rng.integers(1, MAX_POLICY_MONTHS + 1, n_rows // 4 + 2)
+    lengths = lengths[:np.searchsorted(np.cumsum(lengths), n_rows) + 1]
+    lengths[-1] -= lengths.sum() - n_rows
+    n_policies = len(lengths)
+
+    policy = {'PolicyID': first_policy_id + np.arange(n_policies)}
+    policy['UnderwrittenCoverID'] = policy['PolicyID'] * 3 + rng.integers(0, 3, n_policies)
+    province_names = np.array(list(PROVINCES))
+    shares = np.array(list(PROVINCES.values()))
+    province = rng.choice(len(province_names), n_policies, p=shares / shares.sum())
+    policy['Province'] = province_names[province]
+    policy['PostalCode'] = np.empty(n_policies, dtype=np.int64)
+    for i, name in enumerate(province_names):
+        rows = np.flatnonzero(province == i)
+        codes = lookups['postal'][name]
+        policy['PostalCode'][rows] = codes[_zipf_choice(rng, len(codes), len(rows))]
+    zones = pd.Series(policy['Province'])
+    policy['MainCrestaZone'] = (zones + ' ' + (policy['PostalCode'] % 3 + 1).astype(str)).to_numpy(dtype=object)
+    policy['SubCrestaZone'] = (zones + ' ' + (policy['PostalCode'] % 10 + 1).astype(str)).to_numpy(dtype=object)
+
+    make = rng.choice(len(MAKES), n_policies, p=lookups['make_weights'])
+    policy['make'] = np.array(MAKES, dtype=object)[make]
+    model_index = (rng.random(n_policies) * lookups['model_counts'][make]).astype(int)
+    policy['Model'] = lookups['model_names'][lookups['model_offsets'][make] + model_index]
+    policy['mmcode'] = (make * 1000 + model_index + 4_000_000).astype('float64')
+    registration_year = 2015 - np.minimum(rng.geometric(0.15, n_policies) - 1, 28)
+    policy['RegistrationYear'] = registration_year
+    cylinders = rng.choice([4, 6, 8], n_policies, p=[0.85, 0.12, 0.03])
+    policy['Cylinders'] = cylinders.astype('float64')
+    policy['cubiccapacity'] = np.round(cylinders * rng.normal(600, 60, n_policies), -1)
+    policy['kilowatts'] = np.round(policy['cubiccapacity'] / 25 + rng.normal(0, 10, n_policies))
+    policy['NumberOfDoors'] = rng.choice([2.0, 4.0, 5.0], n_policies, p=[0.1, 0.7, 0.2])
+    policy['VehicleIntroDate'] = np.char.add(rng.integers(1, 13, n_policies).astype(str),
+                                             np.char.add('/', (registration_year - rng.integers(0, 3, n_policies)).astype(str))).astype(object)
+    sum_insured = np.round(rng.lognormal(np.log(120000), 1.0, n_policies), 2)
+    policy['SumInsured'] = sum_insured
+    policy['CustomValueEstimate'] = np.round(sum_insured * rng.uniform(0.8, 1.2, n_policies), 2)
+    policy['CapitalOutstanding'] = np.round(sum_insured * rng.uniform(0, 0.9, n_policies), 2)
+    policy['NumberOfVehiclesInFleet'] = np.zeros(n_policies)
+    policy['IsVATRegistered'] = rng.random(n_policies) < 0.01
+    for col, (values, shares) in CATEGORIES.items():
+        p = None if shares is None else np.array(shares) / np.sum(shares)
+        policy[col] = np.array(values, dtype=object)[rng.choice(len(values), n_policies, p=p)]
+
+    # Premium per term from sum insured, vehicle age and province relativities
+    risk = np.array([PROVINCE_RISK[name] for name in province_names])[province]
+    risk *= 1 + 0.02 * (2015 - registration_year)
+    risk *= np.where(policy['TrackingDevice'] == 'Yes', 0.9, 1.0)
+    policy['CalculatedPremiumPerTerm'] = np.round(sum_insured * 0.004 * risk, 2)
+    for columns, share in MISSING_BLOCKS:
+        missing = rng.random(n_policies) < share
+        for col in columns:
+            policy[col] = np.where(missing, None, policy[col]) if policy[col].dtype == object \
+                else np.where(missing, np.nan, policy[col])
+
+    # Expand policies to monthly rows
+    rows = pd.DataFrame(policy).iloc[np.repeat(np.arange(n_policies), lengths)].reset_index(drop=True)
+    start_month = (rng.random(n_policies) * (len(MONTHS) - lengths + 1)).astype(int)
+    offset = np.arange(n_rows) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    month = np.repeat(start_month, lengths) + offset
+    rows['TransactionMonth'] = MONTHS[month].strftime('%Y-%m-%d %H:%M:%S')
+    row_risk = np.repeat(risk, lengths)
+    premium = rows['CalculatedPremiumPerTerm'].to_numpy(dtype='float64') / 1.14
+    rows['TotalPremium'] = np.round(np.where(rng.random(n_rows) < 0.3, 0.0, premium), 6)
+
+    # Zero-inflated, heavy-tailed claims
+    claim = rng.random(n_rows) < BASE_CLAIM_RATE * row_risk
+    severity = rng.lognormal(np.log(SEVERITY_MEDIAN), SEVERITY_SIGMA, n_rows)
+    tail = rng.random(n_rows) < TAIL_SHARE
+    severity = np.where(tail, TAIL_SCALE * (1 + rng.pareto(TAIL_ALPHA, n_rows)), severity)
+    rows['TotalClaims'] = np.round(np.where(claim, severity, 0.0), 2)
+    return rows[COLUMN_ORDER]
+
+
+# Function to write n_rows synthetic rows as a pipe-delimited extract ('txt', the convert_to_parquet
+# input) or straight to Parquet with the raw schema
+def generate(n_rows, output, fmt='txt', chunk_rows=CHUNK_ROWS, seed=42):
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    lookups = _lookups(seed)
+    sizes = [min(chunk_rows, n_rows - start) for start in range(0, n_rows, chunk_rows)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    start = time.perf_counter()
+    writer = pq.ParquetWriter(output, RAW_SCHEMA, compression='snappy', use_dictionary=DICTIONARY_COLUMNS) \
+        if fmt == 'parquet' else None
+    try:
+        for i, (size, child) in enumerate(zip(sizes, seeds)):
+            # Policy IDs stay unique across chunks: a chunk has at most one policy per row
+            chunk = generate_chunk(size, child, first_policy_id=i * chunk_rows, lookups=lookups)
+            if writer:
+                table = to_arrow_table(chunk)
+                writer.write_table(table, row_group_size=table.num_rows)
+            else:
+                chunk.to_csv(output, sep='|', index=False, header=i == 0, mode='w' if i == 0 else 'a')
+    finally:
+        if writer:
+            writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"Generated {n_rows} rows in {elapsed:.1f}s ({os.path.getsize(output) / 1024 ** 2:.1f} MB) at {output}")
+    return {'rows': n_rows, 'seconds': elapsed, 'bytes_written': os.path.getsize(output)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic MachineLearningRating_v3 extract')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Rows to generate (e.g. 100000 to 50000000)')
+    parser.add_argument('--output', default='data/synthetic/MachineLearningRating_v3.txt')
+    parser.add_argument('--format', choices=['txt', 'parquet'], default='txt')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    generate(args.rows, args.output, args.format, args.chunk_rows, args.seed)
@@ -1,42 +1,61 @@
 import pandas as pd
-import numpy as np
-import shap
-import matplotlib.pyplot as plt
-import pickle
-import os
-
-# Load data
-data_dir = 'data/processed/'
-X_sev_test = pd.read_parquet(os.path.join(data_dir, 'X_sev_test.parquet'))
-X_prob_test = pd.read_parquet(os.path.join(data_dir, 'X_prob_test.parquet'))
-
-# Load best models
-xgb_sev = pickle.load(open('models/xgboost_severity.pkl', 'rb'))
-xgb_prob = pickle.load(open('models/xgboost_probability.pkl', 'rb'))
-
-# SHAP for severity model
-explainer_sev = shap.TreeExplainer(xgb_sev)
-shap_values_sev = explainer_sev.shap_values(X_sev_test)
-shap.summary_plot(shap_values_sev, X_sev_test, show=False)
-plt.savefig('plots/shap_summary_severity.png')
-plt.close()
-
-# SHAP for probability model
-explainer_prob = shap.TreeExplainer(xgb_prob)
-shap_values_prob = explainer_prob.shap_values(X_prob_test)
-shap.summary_plot(shap_values_prob, X_prob_test, show=False)
-plt.savefig('plots/shap_summary_probability.png')
-plt.close()
-
-# Top features
-shap_sev_df = pd.DataFrame({'Feature': X_sev_test.columns, 'Mean_SHAP': np.abs(shap_values_sev).mean(axis=0)})
-shap_prob_df = pd.DataFrame({'Feature': X_prob_test.columns, 'Mean_SHAP': np.abs(shap_values_prob).mean(axis=0)})
-top_sev_features = shap_sev_df.sort_values('Mean_SHAP', ascending=False).head(10)
-top_prob_features = shap_prob_df.sort_values('Mean_SHAP', ascending=False).head(10)
-
-# Save SHAP results
-top_sev_features.to_csv('models/shap_severity_features.csv')
-top_prob_features.to_csv('models/shap_probability_features.csv')
-
-print("Top 10 Features for Severity Model:\n", top_sev_features)
-print("\nTop 10 Features for Probability Model:\n", top_prob_features)
\ No newline at end of file
+import argparse
+from src.scripts.explanations import CACHE_DIR, CHUNK_ROWS, SAMPLE_SIZE, explain, top_features
+from src.scripts.feature_store import read_split
+from src.scripts.instrumentation import Run, add_instrumentation_args, stage
+
+# Explained model, test split and the column the summary-plot sample is stratified on, per task
+EXPLAINED = {
+    'severity': {'model': 'xgboost_severity', 'split': 'X_sev_test', 'target': 'y_sev_test'},
+    'probability': {'model': 'xgboost_probability', 'split': 'X_prob_test', 'target': 'y_prob_test'}
+}
+SEVERITY_STRATA = 5
+
+
+# Function to build the sampling strata of a task: claim / no claim, or severity quintiles
+def strata(task):
+    target = read_split(EXPLAINED[task]['target']).iloc[:, 0]
+    if task == 'severity':
+        return pd.qcut(target, SEVERITY_STRATA, labels=False, duplicates='drop').to_numpy()
+    return target.to_numpy()
+
+
+def main(sample_size=SAMPLE_SIZE, chunk_rows=CHUNK_ROWS, workers=None, cache_dir=CACHE_DIR):
+    import shap
+    import matplotlib.pyplot as plt
+
+    top = {}
+    for task, config in EXPLAINED.items():
+        with stage(f'shap:{task}') as current:
+            result = explain(config['model'], config['split'], strata(task), sample_size=sample_size,
+                             chunk_rows=chunk_rows, workers=workers, cache_dir=cache_dir)
+            current.rows, current.details['cached'] = result['rows'], result['cached']
+        print(f"{config['model']}: mean |SHAP| over {result['rows']} rows"
+              + (" (cached)" if result['cached'] else ""))
+
+        # Summary plot of the stratified sample
+        with stage(f'plot:{task}', len(result['sample_index'])):
+            X_sample = read_split(config['split']).iloc[result['sample_index']][result['features']]
+            shap.summary_plot(result['sample_shap'], X_sample, show=False)
+            plt.savefig(f'plots/shap_summary_{task}.png')
+            plt.close()
+
+        # Top features from the streamed mean |SHAP|
+        top[task] = top_features(result)
+        top[task].to_csv(f'models/shap_{task}_features.csv')
+
+    print("Top 10 Features for Severity Model:\n", top['severity'])
+    print("\nTop 10 Features for Probability Model:\n", top['probability'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Explain the XGBoost models with SHAP values')
+    parser.add_argument('--sample-size', type=int, default=SAMPLE_SIZE, help='Stratified rows in the summary plots')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Rows explained per task')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
+
+    with Run.from_args('task4_evaluation', args):
+        main(args.sample_size, args.chunk_rows, args.workers, args.cache_dir)
@@ -4,64 +4,171 @@ from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
 from xgboost import XGBRegressor, XGBClassifier
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score, precision_score, recall_score, f1_score
-import pickle
+from threadpoolctl import threadpool_limits
+import argparse
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from src.scripts.feature_store import DATA_DIR, read_splits
+from src.scripts.glm import make_glm
+from src.scripts.instrumentation import Run, add_instrumentation_args, record, stage
+from src.scripts.model_registry import REGISTRY_DIR, data_hash, register_model
+from src.scripts.resources import ResourceMonitor
 
-# Set random seed
-np.random.seed(42)
+MODELS_DIR = 'models'
+RESULT_FILES = {'severity': 'severity_results.csv', 'probability': 'probability_results.csv'}
+TIMING_FILE = 'training_times.csv'
 
-# Load processed data
-data_dir = 'data/processed/'
-X_sev_train = pd.read_parquet(os.path.join(data_dir, 'X_sev_train.parquet'))
-X_sev_test = pd.read_parquet(os.path.join(data_dir, 'X_sev_test.parquet'))
-y_sev_train = pd.read_parquet(os.path.join(data_dir, 'y_sev_train.parquet'))
-y_sev_test = pd.read_parquet(os.path.join(data_dir, 'y_sev_test.parquet'))
-X_prob_train = pd.read_parquet(os.path.join(data_dir, 'X_prob_train.parquet'))
-X_prob_test = pd.read_parquet(os.path.join(data_dir, 'X_prob_test.parquet'))
-y_prob_train = pd.read_parquet(os.path.join(data_dir, 'y_prob_train.parquet'))
-y_prob_test = pd.read_parquet(os.path.join(data_dir, 'y_prob_test.parquet'))
-
-# Initialize models
-severity_models = {
-    'Linear Regression': LinearRegression(),
-    'Random Forest': RandomForestRegressor(n_estimators=100, random_state=42),
-    'XGBoost': XGBRegressor(n_estimators=100, random_state=42)
-}
-probability_models = {
-    'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42),
-    'XGBoost': XGBClassifier(n_estimators=100, random_state=42)
+# Model suites: registry name -> display name, task, estimator factory taking a thread count,
+# and a relative cost used to share the core budget (forests get more cores)
+MODEL_SPECS = {
+    'linear_regression_severity': {
+        'model': 'Linear Regression', 'task': 'severity', 'weight': 1,
+        'build': lambda threads: LinearRegression()
+    },
+    'random_forest_severity': {
+        'model': 'Random Forest', 'task': 'severity', 'weight': 4,
+        'build': lambda threads: RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=threads)
+    },
+    'xgboost_severity': {
+        'model': 'XGBoost', 'task': 'severity', 'weight': 1,
+        'build': lambda threads: XGBRegressor(n_estimators=100, random_state=42, n_jobs=threads)
+    },
+    'random_forest_probability': {
+        'model': 'Random Forest', 'task': 'probability', 'weight': 4,
+        'build': lambda threads: RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=threads)
+    },
+    'xgboost_probability': {
+        'model': 'XGBoost', 'task': 'probability', 'weight': 1,
+        'build': lambda threads: XGBClassifier(n_estimators=100, random_state=42, n_jobs=threads)
+    },
+    # GLMs on a sparse one-hot design of the rating factors (see glm.py)
+    'glm_gamma_severity': {
+        'model': 'GLM Gamma', 'task': 'severity', 'weight': 1,
+        'build': lambda threads: make_glm('gamma')
+    },
+    'glm_tweedie_severity': {
+        'model': 'GLM Tweedie', 'task': 'severity', 'weight': 1,
+        'build': lambda threads: make_glm('tweedie')
+    },
+    'glm_poisson_probability': {
+        'model': 'GLM Poisson', 'task': 'probability', 'weight': 1,
+        'build': lambda threads: make_glm('poisson')
+    },
+    'glm_bernoulli_probability': {
+        'model': 'GLM Bernoulli', 'task': 'probability', 'weight': 1,
+        'build': lambda threads: make_glm('bernoulli')
+    }
 }
+SPLIT_PREFIX = {'severity': 'sev', 'probability': 'prob'}
+
+
+# Function to compute the metrics reported for each task
+def evaluate(task, model, X_test, y_test):
+    y_pred = model.predict(X_test)
+    if task == 'severity':
+        return {'RMSE': np.sqrt(mean_squared_error(y_test, y_pred)), 'R2': r2_score(y_test, y_pred)}
+    return {
+        'Accuracy': accuracy_score(y_test, y_pred), 'Precision': precision_score(y_test, y_pred),
+        'Recall': recall_score(y_test, y_pred), 'F1': f1_score(y_test, y_pred)
+    }
+
+
+# Function to train, evaluate and register one model with a fixed thread allotment. Runs in its own
+# worker process; BLAS/OpenMP pools are capped too so the allotment holds.
+def train_model(name, threads=1, data_dir=DATA_DIR, registry_dir=REGISTRY_DIR):
+    np.random.seed(42)
+    spec = MODEL_SPECS[name]
+    prefix = SPLIT_PREFIX[spec['task']]
+    splits = read_splits([f'X_{prefix}_train', f'X_{prefix}_test', f'y_{prefix}_train', f'y_{prefix}_test'], data_dir)
+    X_train, X_test = splits[f'X_{prefix}_train'], splits[f'X_{prefix}_test']
+    y_train, y_test = splits[f'y_{prefix}_train'], splits[f'y_{prefix}_test']
+
+    with threadpool_limits(limits=threads):
+        model = spec['build'](threads)
+        with ResourceMonitor() as monitor:
+            model.fit(X_train, y_train)
+        metrics = evaluate(spec['task'], model, X_test, y_test)
+    timing = monitor.stats()
+    register_model(model, name, X_train.columns, data_hash(X_train, y_train), metrics, timing['wall_seconds'],
+                   registry_dir=registry_dir, threads=threads, cpu_seconds=round(timing['cpu_seconds'], 3),
+                   peak_memory_mb=round(timing['peak_memory_mb'], 1))
+    return {'name': name, 'Model': spec['model'], 'task': spec['task'], 'threads': threads, 'rows': len(X_train),
+            'metrics': metrics, **timing}
+
+
+# Function to train models concurrently under a global core budget. Models start as cores free up,
+# most expensive first; each takes a share of the free cores proportional to its weight.
+def run_training(names=None, cpu_budget=None, data_dir=DATA_DIR, registry_dir=REGISTRY_DIR):
+    names = list(names or MODEL_SPECS)
+    budget = cpu_budget or os.cpu_count() or 1
+    queue = sorted(names, key=lambda name: -MODEL_SPECS[name]['weight'])
+    start = time.perf_counter()
+    rows = []
+    if budget == 1 or len(names) == 1:
+        rows = [train_model(name, budget, data_dir, registry_dir) for name in queue]
+    else:
+        free, running = budget, {}
+        # One fresh process per model, so each peak memory reading belongs to that model alone
+        with ProcessPoolExecutor(min(budget, len(names)), max_tasks_per_child=1) as pool:
+            while queue or running:
+                while queue and free > 0:
+                    weight_left = sum(MODEL_SPECS[name]['weight'] for name in queue)
+                    name = queue.pop(0)
+                    threads = max(1, min(free, round(free * MODEL_SPECS[name]['weight'] / weight_left)))
+                    running[pool.submit(train_model, name, threads, data_dir, registry_dir)] = threads
+                    free -= threads
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    free += running.pop(future)
+                    rows.append(future.result())
+    for row in rows:
+        record(f"fit:{row['name']}", row['rows'], {'threads': row['threads']}, wall_seconds=row['wall_seconds'],
+               cpu_seconds=row['cpu_seconds'], peak_memory_mb=row['peak_memory_mb'])
+    elapsed = time.perf_counter() - start
+    print(f"Trained {len(rows)} models in {elapsed:.1f}s wall time with a budget of {budget} cores "
+          f"({sum(row['wall_seconds'] for row in rows):.1f}s of summed fit time)")
+    return rows
+
+
+# Function to merge new results into the results CSVs, replacing rows of retrained models only
+def save_results(rows, models_dir=MODELS_DIR):
+    order = {spec['model']: i for i, spec in enumerate(MODEL_SPECS.values())}
+    for task, file_name in RESULT_FILES.items():
+        new = pd.DataFrame([{'Model': row['Model'], **row['metrics']} for row in rows if row['task'] == task])
+        if new.empty:
+            continue
+        path = os.path.join(models_dir, file_name)
+        results = new
+        if os.path.exists(path):
+            old = pd.read_csv(path, index_col=0)
+            results = pd.concat([old[~old['Model'].isin(new['Model'])], new], ignore_index=True)
+        results = results.sort_values('Model', key=lambda models: models.map(order), kind='stable').reset_index(drop=True)
+        results.to_csv(path)
+        print(f"{task.capitalize()} Model Results:\n", results)
 
-# Train and evaluate severity models
-severity_results = []
-for name, model in severity_models.items():
-    model.fit(X_sev_train, y_sev_train)
-    y_pred = model.predict(X_sev_test)
-    rmse = np.sqrt(mean_squared_error(y_sev_test, y_pred))
-    r2 = r2_score(y_sev_test, y_pred)
-    severity_results.append({'Model': name, 'RMSE': rmse, 'R2': r2})
-    pickle.dump(model, open(f'models/{name.lower().replace(" ", "_")}_severity.pkl', 'wb'))
+    timing_columns = ['name', 'Model', 'task', 'threads', 'wall_seconds', 'cpu_seconds', 'peak_memory_mb']
+    new = pd.DataFrame(rows)[timing_columns]
+    path = os.path.join(models_dir, TIMING_FILE)
+    timings = new
+    if os.path.exists(path):
+        old = pd.read_csv(path)
+        timings = pd.concat([old[~old['name'].isin(new['name'])], new], ignore_index=True)
+    timings = timings.sort_values('name', key=lambda names: names.map(list(MODEL_SPECS).index), kind='stable')
+    timings.to_csv(path, index=False)
+    print("\nTraining times:\n", timings.to_string(index=False))
 
-# Train and evaluate probability models
-probability_results = []
-for name, model in probability_models.items():
-    model.fit(X_prob_train, y_prob_train)
-    y_pred = model.predict(X_prob_test)
-    accuracy = accuracy_score(y_prob_test, y_pred)
-    precision = precision_score(y_prob_test, y_pred)
-    recall = recall_score(y_prob_test, y_pred)
-    f1 = f1_score(y_prob_test, y_pred)
-    probability_results.append({
-        'Model': name, 'Accuracy': accuracy, 'Precision': precision,
-        'Recall': recall, 'F1': f1
-    })
-    pickle.dump(model, open(f'models/{name.lower().replace(" ", "_")}_probability.pkl', 'wb'))
 
-# Save results
-results_df_sev = pd.DataFrame(severity_results)
-results_df_prob = pd.DataFrame(probability_results)
-results_df_sev.to_csv('models/severity_results.csv')
-results_df_prob.to_csv('models/probability_results.csv')
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the severity and probability models')
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_SPECS), default=None,
+                        help='Retrain only these models (default: all)')
+    parser.add_argument('--cpu-budget', type=int, default=None, help='Cores shared by all fits (default: all cores)')
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
 
-print("Severity Model Results:\n", results_df_sev)
-print("\nProbability Model Results:\n", results_df_prob)
\ No newline at end of file
+    with Run.from_args('task4_modeling', args):
+        with stage('training'):
+            rows = run_training(args.models, args.cpu_budget)
+        with stage('save_results'):
+            save_results(rows)
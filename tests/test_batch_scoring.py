@@ -0,0 +1,77 @@
+import pytest
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+from xgboost import XGBClassifier, XGBRegressor
+from src.scripts.batch_scoring import score_book, scoring_tasks
+from src.scripts.data_loader import PARTITIONING
+from src.scripts.model_registry import register_model
+from src.scripts.preprocessing import InsurancePreprocessor
+
+# Mock policy book
+rng = np.random.default_rng(8)
+n = 1200
+data = pd.DataFrame({
+    'UnderwrittenCoverID': np.arange(n, dtype='float64'),
+    'PolicyID': np.arange(n, dtype='float64') // 3,
+    'Province': rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], n),
+    'TransactionMonth': rng.choice(['2015-01', '2015-02'], n),
+    'RegistrationYear': rng.integers(2000, 2016, n),
+    'SumInsured': rng.gamma(2, 5000, n),
+    'TotalPremium': rng.gamma(2, 300, n),
+    'TotalClaims': np.where(rng.random(n) < 0.3, rng.lognormal(8, 1, n), 0.0)
+})
+
+
+@pytest.fixture
+def models(tmp_path):
+    preprocessor = InsurancePreprocessor().fit(data)
+    preprocessor.save(str(tmp_path / 'preprocessor.pkl'))
+    X = preprocessor.transform(data)[preprocessor.features_]
+    probability = XGBClassifier(n_estimators=5).fit(X, data['TotalClaims'] > 0)
+    severity = XGBRegressor(n_estimators=5).fit(X, data['TotalClaims'])
+    registry = str(tmp_path / 'registry')
+    register_model(probability, 'xgboost_probability', X.columns, registry_dir=registry)
+    register_model(severity, 'xgboost_severity', X.columns, registry_dir=registry)
+    return {'preprocessor_path': str(tmp_path / 'preprocessor.pkl'), 'registry_dir': registry}, \
+        preprocessor, probability, severity
+
+
+# Function to compute P(claim) x E[severity] directly with the fitted models
+def expected_premium(frame, preprocessor, probability, severity):
+    X = preprocessor.transform(frame)[preprocessor.features_]
+    return probability.predict_proba(X)[:, 1] * severity.predict(X)
+
+
+def test_score_single_file(models, tmp_path):
+    paths, preprocessor, probability, severity = models
+    source, output = str(tmp_path / 'book.parquet'), str(tmp_path / 'scored.parquet')
+    data.to_parquet(source, row_group_size=100)
+    assert len(scoring_tasks(source, batch_size=250)) == 4, "Row groups should be packed into tasks of batch_size rows"
+    stats = score_book(source, output, workers=1, batch_size=250, **paths)
+    scored = pd.read_parquet(output)
+    assert stats['rows'] == n and len(scored) == n, "Every policy should be scored once"
+    assert scored['UnderwrittenCoverID'].tolist() == data['UnderwrittenCoverID'].tolist(), "Input order should be kept"
+    np.testing.assert_allclose(scored['PurePremium'], expected_premium(data, preprocessor, probability, severity),
+                               rtol=1e-5)
+    np.testing.assert_allclose(scored['PurePremium'], scored['ClaimProbability'] * scored['ExpectedSeverity'])
+
+
+def test_score_partitioned_with_worker_pool(models, tmp_path):
+    paths, preprocessor, probability, severity = models
+    source, output = str(tmp_path / 'dataset'), str(tmp_path / 'scored.parquet')
+    ds.write_dataset(pa.Table.from_pandas(data, preserve_index=False), source, format='parquet',
+                     partitioning=PARTITIONING)
+    # The pool keeps at most 2 x workers tasks in flight; small tasks make it cycle through the window
+    stats = score_book(source, output, workers=2, batch_size=50, **paths)
+    scored = pd.read_parquet(output)
+    # Rows come back in fragment order, with Province and TransactionMonth restored from the directory names
+    book = ds.dataset(source, format='parquet', partitioning=PARTITIONING).to_table().to_pandas()
+    assert stats['rows'] == n and sorted(scored['UnderwrittenCoverID']) == list(range(n)), \
+        "Every policy should be scored once"
+    assert scored['UnderwrittenCoverID'].tolist() == book['UnderwrittenCoverID'].tolist(), \
+        "Output should follow the dataset's fragment order"
+    np.testing.assert_allclose(scored['PurePremium'], expected_premium(book, preprocessor, probability, severity),
+                               rtol=1e-5)
+
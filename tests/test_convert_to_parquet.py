@@ -0,0 +1,106 @@
+import pytest
+import pandas as pd
+import pyarrow.parquet as pq
+from src.scripts.convert_to_parquet import (build_partitioned, convert_streaming, convert_partitioned, ingest_incremental,
+                                            load_manifest)
+from src.scripts.data_loader import load_data
+from src.scripts.schema import RAW_SCHEMA
+
+# Mock extract with a few schema columns, an unparseable number and a missing value
+rows = [
+    '1|101|2015-03-01 00:00:00|True|Gauteng|2000|Female|TOYOTA|2010|1000.5|500.0|0.0',
+    '2|102|2015-04-01 00:00:00|False|Western Cape|8000|Male|BMW|2012|abc|600.0|1500.0',
+    '3|103|2015-04-01 00:00:00|True|Gauteng|2000||TOYOTA|2011|2000.0|700.0|0.0',
+]
+header = 'UnderwrittenCoverID|PolicyID|TransactionMonth|IsVATRegistered|Province|PostalCode|Gender|make|RegistrationYear|CapitalOutstanding|TotalPremium|TotalClaims'
+
+
+@pytest.fixture
+def extract(tmp_path):
+    path = tmp_path / 'extract.txt'
+    path.write_text('\n'.join([header] + rows) + '\n')
+    return path
+
+
+def test_convert_streaming_row_groups(extract, tmp_path):
+    output = tmp_path / 'out.parquet'
+    stats = convert_streaming(str(extract), str(output), chunk_size=2)
+    parquet_file = pq.ParquetFile(output)
+    assert stats['rows'] == 3, "Row count incorrect"
+    assert parquet_file.metadata.num_row_groups == 2, "Each chunk should be its own row group"
+    assert parquet_file.schema_arrow.equals(RAW_SCHEMA), "Output should use the fixed schema"
+    assert stats['bytes_written'] == output.stat().st_size, "Bytes written incorrect"
+
+
+def test_convert_streaming_coerces_types(extract, tmp_path):
+    output = tmp_path / 'out.parquet'
+    convert_streaming(str(extract), str(output), chunk_size=2)
+    df = pd.read_parquet(output)
+    assert pd.isna(df.loc[1, 'CapitalOutstanding']), "Unparseable numbers should become NaN"
+    assert df['TotalClaims'].sum() == 1500.0, "TotalClaims values incorrect"
+    assert df['TransactionMonth'].dt.month.tolist() == [3, 4, 4], "TransactionMonth should be parsed"
+    assert pd.isna(df.loc[2, 'Gender']), "Missing strings should stay missing"
+
+
+def test_convert_partitioned_layout(extract, tmp_path):
+    dataset_dir = tmp_path / 'dataset'
+    stats = convert_partitioned(str(extract), str(dataset_dir), chunk_size=2)
+    partitions = sorted(p.relative_to(dataset_dir).parent.as_posix() for p in dataset_dir.rglob('*.parquet'))
+    assert stats['rows'] == 3, "Row count incorrect"
+    assert partitions == ['Province=Gauteng/TransactionMonth=2015-03', 'Province=Gauteng/TransactionMonth=2015-04',
+                          'Province=Western%20Cape/TransactionMonth=2015-04'], "Partition layout incorrect"
+
+
+def test_load_data_pushdown(extract, tmp_path):
+    dataset_dir = tmp_path / 'dataset'
+    convert_partitioned(str(extract), str(dataset_dir), chunk_size=2)
+    filters = [('Province', '==', 'Gauteng'), ('TransactionMonth', '>=', '2015-04')]
+    df = load_data(str(dataset_dir), columns=['PolicyID', 'TransactionMonth'], filters=filters)
+    assert list(df.columns) == ['PolicyID', 'TransactionMonth'], "Only requested columns should be loaded"
+    assert df['PolicyID'].tolist() == [103], "Filter should select matching rows only"
+    assert df['TransactionMonth'].iloc[0] == pd.Timestamp('2015-04-01'), "TransactionMonth should be a date"
+
+    # The same filter works against the single-file layout
+    output = tmp_path / 'out.parquet'
+    convert_streaming(str(extract), str(output), chunk_size=2)
+    df_file = load_data(str(output), columns=['PolicyID', 'TransactionMonth'], filters=filters)
+    assert df_file['PolicyID'].tolist() == [103], "Filter should work on a single Parquet file"
+
+
+def test_ingest_incremental_skips_and_replaces(extract, tmp_path):
+    dataset_dir = tmp_path / 'dataset'
+    new_month = tmp_path / 'extract_2015_05.txt'
+    new_month.write_text(header + '\n4|104|2015-05-01 00:00:00|True|Gauteng|2000|Male|BMW|2013|0|800.0|200.0\n')
+
+    summary = ingest_incremental([str(extract), str(new_month)], str(dataset_dir), chunk_size=2)
+    assert len(summary['ingested']) == 2, "Both extracts should be ingested"
+    assert len(load_data(str(dataset_dir))) == 4, "Dataset should contain all rows"
+    entry = load_manifest(str(dataset_dir))['sources'][str(new_month.resolve())]
+    assert entry['months'] == ['2015-05', '2015-05'], "Manifest should record the month range"
+
+    summary = ingest_incremental([str(extract), str(new_month)], str(dataset_dir), chunk_size=2)
+    assert len(summary['skipped']) == 2, "Unchanged extracts should be skipped"
+
+    # A corrected extract replaces its earlier rows instead of duplicating them
+    new_month.write_text(header + '\n4|104|2015-05-01 00:00:00|True|Gauteng|2000|Male|BMW|2013|0|800.0|300.0\n')
+    summary = ingest_incremental([str(new_month)], str(dataset_dir), chunk_size=2)
+    df = load_data(str(dataset_dir))
+    assert len(summary['replaced']) == 1, "Changed extract should be re-ingested"
+    assert len(df) == 4, "Replaced extract should not duplicate rows"
+    assert df.loc[df['PolicyID'] == 104, 'TotalClaims'].tolist() == [300.0], "New values should be loaded"
+
+
+def test_incremental_after_full_build_does_not_duplicate(extract, tmp_path):
+    dataset_dir = tmp_path / 'dataset'
+    new_month = tmp_path / 'extract_2015_05.txt'
+    new_month.write_text(header + '\n4|104|2015-05-01 00:00:00|True|Gauteng|2000|Male|BMW|2013|0|800.0|200.0\n')
+    build_partitioned(str(extract), str(dataset_dir), chunk_size=2)
+    summary = ingest_incremental([str(extract), str(new_month)], str(dataset_dir), chunk_size=2)
+    assert summary['skipped'] == [str(extract)], "The history extract should be known from the full build"
+    assert len(load_data(str(dataset_dir))) == 4, "History rows should not be appended twice"
+
+    # A dataset written without a manifest cannot tell which extracts it holds
+    other_dir = tmp_path / 'unmanaged'
+    convert_partitioned(str(extract), str(other_dir), chunk_size=2)
+    with pytest.raises(ValueError, match='manifest'):
+        ingest_incremental([str(extract)], str(other_dir), chunk_size=2)
@@ -0,0 +1,50 @@
+import pytest
+import pandas as pd
+import numpy as np
+from src.scripts.data_loader import iter_batches, load_data, load_typed, optimize_dtypes
+from src.scripts.feature_store import write_split, read_split
+
+# Mock data with the dtypes the raw Parquet file produces
+data = pd.DataFrame({
+    'Province': ['Gauteng', 'Gauteng', 'Western Cape', None],
+    'PolicyNumber': ['P1', 'P2', 'P3', 'P4'],
+    'TotalPremium': [21.93, 0.0, 512.5, np.nan],
+    'RegistrationYear': [2004, 2010, 2015, 2001],
+    'mmcode': [44069150.0, 44069150.0, np.nan, 4614100.0],
+    'IsVATRegistered': [True, False, True, True]
+})
+
+
+def test_optimize_dtypes():
+    df = optimize_dtypes(data.copy())
+    assert isinstance(df['Province'].dtype, pd.CategoricalDtype), "Repeated strings should become categories"
+    assert df['PolicyNumber'].dtype == object, "Unique strings should stay objects"
+    assert df['TotalPremium'].dtype == np.float32, "Premiums should be float32"
+    assert df['RegistrationYear'].dtype == np.int16, "RegistrationYear should be int16"
+    assert df['mmcode'].dtype == np.float64, "Large integer codes must not lose digits in float32"
+    assert df['IsVATRegistered'].dtype == bool, "Booleans should be unchanged"
+
+
+def test_load_typed_matches_values(tmp_path):
+    path = tmp_path / 'data.parquet'
+    data.to_parquet(path, index=False)
+    df = load_typed(str(path), columns=['Province', 'RegistrationYear'])
+    assert list(df.columns) == ['Province', 'RegistrationYear'], "Only requested columns should be loaded"
+    assert df['Province'].astype(object).tolist()[:3] == ['Gauteng', 'Gauteng', 'Western Cape'], "Values changed"
+    assert df['RegistrationYear'].tolist() == data['RegistrationYear'].tolist(), "Values changed"
+
+
+def test_feature_store_arrow_roundtrip(tmp_path):
+    X = pd.DataFrame({'PolicyAge': np.arange(5, dtype='int16'), 'SumInsured': np.linspace(0, 1, 5)})
+    write_split(X, 'X_sev_test', str(tmp_path), fmt='arrow')
+    loaded = read_split('X_sev_test', str(tmp_path))
+    pd.testing.assert_frame_equal(loaded, X)
+    assert not loaded['SumInsured'].to_numpy().flags.writeable, "Arrow columns should be memory-mapped views"
+
+
+def test_empty_filter_list_reads_everything(tmp_path):
+    path = str(tmp_path / 'data.parquet')
+    data.to_parquet(path, index=False)
+    assert len(load_data(path, columns=['PolicyNumber'], filters=[])) == len(data), "An empty filter should keep all rows"
+    assert sum(len(batch) for batch in iter_batches(path, columns=['PolicyNumber'], filters=[])) == len(data), \
+        "An empty filter should keep all rows when streaming"
@@ -0,0 +1,85 @@
+import pytest
+import pandas as pd
+import numpy as np
+from src.scripts.eda_aggregates import KEY_NUMERICAL, DensityGrid, EdaAggregates, aggregate, column_ranges
+
+# Mock policies with missing values, written in several row groups
+rng = np.random.default_rng(11)
+n = 6000
+data = pd.DataFrame({
+    'Province': rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], n),
+    'CoverType': rng.choice(['Own Damage', 'Windscreen'], n),
+    'make': rng.choice(['TOYOTA', 'VW', 'FORD', 'BMW'], n),
+    'PostalCode': rng.choice([2000, 7100, 4001, 122, 8000, 1863], n, p=[0.3, 0.25, 0.2, 0.1, 0.1, 0.05]),
+    'TransactionMonth': pd.to_datetime(rng.choice(pd.date_range('2015-01-01', periods=4, freq='MS'), n)),
+    'TotalPremium': rng.gamma(2, 300, n),
+    'TotalClaims': np.where(rng.random(n) < 0.1, rng.lognormal(9, 1.2, n), 0.0),
+    'CalculatedPremiumPerTerm': rng.gamma(2, 500, n),
+    'CapitalOutstanding': np.where(rng.random(n) < 0.2, np.nan, rng.normal(1e5, 2e4, n))
+})
+
+
+@pytest.fixture
+def parquet_path(tmp_path):
+    path = tmp_path / 'policies.parquet'
+    data.to_parquet(path, row_group_size=1000)
+    return str(path)
+
+
+def test_ranges_come_from_row_group_statistics(parquet_path):
+    ranges = column_ranges(parquet_path)
+    assert ranges['TotalPremium'] == (data['TotalPremium'].min(), data['TotalPremium'].max()), \
+        "Ranges should match the column min/max"
+    assert np.isfinite(ranges['CapitalOutstanding']).all(), "Missing values should not break the range"
+
+
+def test_streamed_aggregates_match_in_memory(parquet_path):
+    agg = aggregate(parquet_path, output=None, batch_size=700)
+    described, expected = agg.describe(), data[KEY_NUMERICAL].describe()
+    for stat in ['count', 'mean', 'std', 'min', 'max']:
+        np.testing.assert_allclose(described.loc[stat, KEY_NUMERICAL], expected.loc[stat], rtol=1e-9,
+                                   err_msg=f"Streamed {stat} should be exact")
+    np.testing.assert_allclose(agg.correlation().loc[KEY_NUMERICAL, KEY_NUMERICAL], data[KEY_NUMERICAL].corr(),
+                               atol=1e-9, err_msg="Pairwise Pearson correlation should be exact")
+    pd.testing.assert_frame_equal(agg.crosstab_table(), pd.crosstab(data['Province'], data['CoverType']),
+                                  check_names=False, check_dtype=False)
+    monthly = data.groupby('TransactionMonth')[['TotalPremium', 'TotalClaims']].sum()
+    np.testing.assert_allclose(agg.monthly_totals(), monthly, err_msg="Monthly totals should be exact")
+    assert agg.histogram('TotalPremium')[0].sum() == n, "Every premium should fall in a histogram bin"
+    assert agg.missing_counts()['CapitalOutstanding'] == data['CapitalOutstanding'].isna().sum(), \
+        "Missing counts incorrect"
+
+
+def test_box_stats_and_persistence(parquet_path, tmp_path):
+    path = str(tmp_path / 'aggregates.pkl')
+    aggregate(parquet_path, output=path, batch_size=1000)
+    agg = EdaAggregates.load(path)
+    stats = {stat['label']: stat for stat in agg.box_stats('TotalPremium', ['Province'])}
+    for province, values in data.groupby('Province')['TotalPremium']:
+        rank = (values <= stats[province]['med']).mean()
+        assert abs(rank - 0.5) < 0.02, "Group median should be within 2% rank"
+        assert stats[province]['whislo'] >= values.min(), "Whiskers should stay within the observed range"
+    totals = data.groupby('Province')[['TotalClaims', 'TotalPremium']].sum()
+    np.testing.assert_allclose(agg.loss_ratio_by_province(), totals['TotalClaims'] / totals['TotalPremium'])
+
+
+def test_density_grid_matches_histogram2d():
+    ranges = {col: (data[col].min(), data[col].max()) for col in ['TotalPremium', 'CalculatedPremiumPerTerm']}
+    density = DensityGrid('TotalPremium', 'CalculatedPremiumPerTerm', ranges, bins=40)
+    for start in range(0, n, 900):
+        density.update(data.iloc[start:start + 900])
+    expected = np.histogram2d(data['TotalPremium'], data['CalculatedPremiumPerTerm'], bins=density.edges())[0]
+    np.testing.assert_allclose(density.grid, expected, err_msg="Binned grid should match np.histogram2d")
+    assert list(density.grids()) == ['all'], "Ungrouped densities should have one panel"
+
+
+def test_grouped_log_density_keeps_every_row():
+    ranges = {col: (data[col].min(), data[col].max()) for col in ['TotalPremium', 'TotalClaims']}
+    density = DensityGrid('TotalPremium', 'TotalClaims', ranges, bins=50, group='PostalCode', log=True)
+    for start in range(0, n, 1300):
+        density.update(data.iloc[start:start + 1300])
+    grids = density.grids(top=3)
+    assert list(grids) == [2000, 7100, 4001, 'other'], "Top groups by rows should come first, then 'other'"
+    assert grids[2000].sum() == (data['PostalCode'] == 2000).sum(), "A group panel should hold all its rows"
+    assert sum(grid.sum() for grid in grids.values()) == n, "Panels should add up to every row"
+    assert density.grid[:, 0].sum() == (data['TotalClaims'] == 0).sum(), "Zero claims should share the first log bin"
@@ -0,0 +1,33 @@
+import pytest
+import pandas as pd
+import numpy as np
+from xgboost import DMatrix, XGBRegressor
+from src.scripts.explanations import explain, stratified_sample
+from src.scripts.feature_store import write_split
+from src.scripts.model_registry import register_model
+
+# Mock test split and severity model
+rng = np.random.default_rng(0)
+X = pd.DataFrame({'SumInsured': rng.random(500), 'PolicyAge': rng.integers(0, 20, 500).astype(float)})
+y = 1000 * X['SumInsured'] + rng.random(500)
+
+
+def test_stratified_sample_keeps_rare_strata():
+    strata = np.r_[np.zeros(990), np.ones(10)]
+    sample = stratified_sample(strata, size=100, min_per_stratum=5)
+    assert (strata[sample] == 1).sum() == 5, "Rare stratum should get at least its floor"
+    assert len(np.unique(sample)) == len(sample), "Positions should not repeat"
+
+
+def test_explain_chunks_match_full_pass_and_cache(tmp_path):
+    model = XGBRegressor(n_estimators=10).fit(X, y)
+    register_model(model, 'xgboost_severity', X.columns, registry_dir=str(tmp_path / 'registry'))
+    write_split(X, 'X_sev_test', data_dir=str(tmp_path))
+    kwargs = {'sample_size': 50, 'data_dir': str(tmp_path), 'registry_dir': str(tmp_path / 'registry'),
+              'cache_dir': str(tmp_path / 'cache'), 'workers': 1}
+    result = explain('xgboost_severity', 'X_sev_test', chunk_rows=64, **kwargs)
+    full = model.get_booster().predict(DMatrix(X), pred_contribs=True)[:, :-1]
+    np.testing.assert_allclose(result['mean_abs_shap'], np.abs(full).mean(axis=0), rtol=1e-5)
+    np.testing.assert_allclose(result['sample_shap'], full[result['sample_index']], rtol=1e-5)
+    assert not result['cached'], "First run should compute"
+    assert explain('xgboost_severity', 'X_sev_test', chunk_rows=64, **kwargs)['cached'], "Rerun should hit the cache"
@@ -0,0 +1,69 @@
+import pytest
+import pandas as pd
+import importlib
+import sys
+import matplotlib
+matplotlib.use('Agg')
+from src.scripts.figures import FigureJob, render_figures
+
+# Mock aggregate a figure is drawn from
+monthly = pd.Series([1.0, 3.0, 2.0], index=pd.date_range('2015-01-01', periods=3, freq='MS'), name='TotalClaims')
+
+
+def plot_line(data, style):
+    import matplotlib.pyplot as plt
+    plt.plot(data['series'].index, data['series'].to_numpy(), color=style['color'])
+
+
+def jobs(directory, color='teal', series=monthly):
+    return [FigureJob(f'{directory}/trend.png', plot_line, {'series': series}, {'color': color}),
+            FigureJob(f'{directory}/bars.png', plot_line, {'series': series.iloc[:2]}, {'color': 'coral'})]
+
+
+def test_unchanged_figures_are_skipped(tmp_path):
+    first = render_figures(jobs(tmp_path), workers=2)
+    assert first['rendered'] == 2 and (tmp_path / 'trend.png').exists(), "First run should draw every figure"
+    assert render_figures(jobs(tmp_path))['skipped'] == 2, "Unchanged inputs should not be redrawn"
+
+
+def test_changed_inputs_are_redrawn(tmp_path):
+    render_figures(jobs(tmp_path), workers=1)
+    assert render_figures(jobs(tmp_path, color='navy'))['rendered'] == 1, "A style change should redraw its figure"
+    changed = monthly.copy()
+    changed.iloc[-1] = 5.0
+    assert render_figures(jobs(tmp_path, color='navy', series=changed))['rendered'] == 1, \
+        "A data change should redraw only the figures that use it"
+    (tmp_path / 'bars.png').unlink()
+    assert render_figures(jobs(tmp_path, color='navy', series=changed))['rendered'] == 1, \
+        "A missing file should be redrawn"
+    assert FigureJob('a.png', plot_line, {'series': monthly}).input_hash() != \
+        FigureJob('a.png', plot_line, {'series': monthly.reset_index(drop=True)}).input_hash(), \
+        "The index should be part of the hash"
+
+
+def test_helper_changes_are_redrawn(tmp_path, monkeypatch):
+    module = tmp_path / 'helper_plots.py'
+    source = """
+def _color(style):
+    return style['color']
+
+
+def plot_helper(data, style):
+    import matplotlib.pyplot as plt
+    plt.plot(data['series'].to_numpy(), color=_color(style))
+"""
+    module.write_text(source)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    plots = importlib.import_module('helper_plots')
+
+    def job():
+        return [FigureJob(f'{tmp_path}/helper.png', sys.modules['helper_plots'].plot_helper, {'series': monthly},
+                          {'color': 'teal'})]
+
+    render_figures(job(), workers=1)
+    assert render_figures(job(), workers=1)['skipped'] == 1, "Unchanged helpers should not redraw"
+    module.write_text(source.replace("style['color']", "'navy'"))
+    importlib.reload(plots)
+    matplotlib.use('template')
+    assert render_figures(job(), workers=1)['rendered'] == 1, "Editing a helper the plot calls should redraw it"
+    assert matplotlib.get_backend().lower() == 'agg', "In-process rendering should use the Agg backend"
@@ -0,0 +1,38 @@
+import pytest
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+from src.scripts.glm import SparseDesign, make_glm, rating_table
+
+# Mock rating data: Province codes (0 most frequent) with a 1.5x severity relativity for code 2, and many postal codes
+rng = np.random.default_rng(0)
+n = 4000
+X = pd.DataFrame({
+    'Province': rng.choice([0, 1, 2], n, p=[0.5, 0.25, 0.25]).astype(np.int32),
+    'PostalCode': rng.integers(1000, 1400, n),
+    'SumInsured': rng.lognormal(10, 1, n),
+    'PolicyAge': rng.integers(0, 20, n).astype(float)
+})
+mean = 1000 * np.where(X['Province'] == 2, 1.5, 1.0)
+y = pd.Series(rng.gamma(5, mean / 5), name='TotalClaims')
+
+
+def test_sparse_design_one_hot_from_codes():
+    design = SparseDesign(categorical=['Province', 'PostalCode'], numeric={'SumInsured': 'log'}, min_count=1).fit(X)
+    matrix = design.transform(X)
+    assert sp.isspmatrix_csr(matrix), "Design should be CSR"
+    n_levels = X['Province'].nunique() - 1 + X['PostalCode'].nunique() - 1
+    assert matrix.shape == (n, n_levels + 1), "One column per non-base level plus the numeric column"
+    dense = matrix.toarray()
+    assert np.all(dense[:, :n_levels].sum(axis=1) <= 2), "At most one level per categorical in each row"
+    unseen = design.transform(X.head(1).assign(PostalCode=99999))
+    assert unseen[:, design.offsets_['PostalCode']:n_levels].nnz == 0, "Unseen levels should fall back to the base"
+
+
+def test_gamma_glm_recovers_relativity():
+    model = make_glm('gamma', categorical=['Province'], numeric={'PolicyAge': None}).fit(X, y)
+    table = rating_table(model)
+    province = table[table['factor'] == 'Province'].set_index('level')['relativity']
+    assert province[0] == 1.0, "Most frequent level should be the base with relativity 1"
+    assert province[2] == pytest.approx(1.5, rel=0.1), "Relativity should match the simulated effect"
+    assert province[1] == pytest.approx(1.0, rel=0.1), "Level without effect should stay near 1"
@@ -0,0 +1,58 @@
+import pytest
+import pandas as pd
+import numpy as np
+from scipy import stats
+from src.scripts.group_stats import (SEVERITY, add_metrics, anova, benjamini_hochberg, chi_squared, claim_severity,
+                                     equivalent_pairs, group_summary, pairwise_welch, welch_t)
+
+# Mock policies with heavy-tailed, zero-inflated claims
+rng = np.random.default_rng(42)
+n = 3000
+data = add_metrics(pd.DataFrame({
+    'Province': pd.Categorical(rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], n)),
+    'TotalClaims': np.where(rng.random(n) < 0.2, rng.lognormal(9, 1.5, n), 0.0),
+    'TotalPremium': rng.gamma(2, 100, n),
+    'RegistrationYear': rng.integers(1995, 2015, n)
+}))
+summary = group_summary(data, 'Province')
+claims = data[data['ClaimOccurred']]
+
+
+def test_welch_t_matches_scipy():
+    t_stat, p = welch_t(summary, 'Gauteng', 'Limpopo', 'RegistrationYear')
+    expected = stats.ttest_ind(data.loc[data['Province'] == 'Gauteng', 'RegistrationYear'],
+                               data.loc[data['Province'] == 'Limpopo', 'RegistrationYear'], equal_var=False)
+    assert np.isclose(t_stat, expected.statistic) and np.isclose(p, expected.pvalue), "Welch t-test mismatch"
+
+
+def test_chi_squared_and_anova_match_scipy():
+    chi2, p = chi_squared(summary)
+    expected = stats.chi2_contingency(pd.crosstab(data['Province'], data['ClaimOccurred']))
+    assert np.isclose(chi2, expected[0]) and np.isclose(p, expected[1]), "Chi-squared mismatch"
+    f_stat, p = anova(summary, SEVERITY)
+    expected = stats.f_oneway(*[group['TotalClaims'] for _, group in claims.groupby('Province', observed=True)])
+    assert np.isclose(f_stat, expected.statistic) and np.isclose(p, expected.pvalue), "ANOVA mismatch"
+
+
+def test_claim_severity_matches_claim_rows():
+    expected = claims.groupby('Province', observed=True)['TotalClaims'].mean()
+    pd.testing.assert_series_equal(claim_severity(summary), expected, check_names=False)
+
+
+def test_pairwise_welch_matches_pair_tests():
+    zips = data.assign(PostalCode=rng.integers(0, 40, n))
+    zip_summary = group_summary(zips, 'PostalCode')
+    pairs = pairwise_welch(zip_summary, 'RegistrationYear', min_count=30, block_size=7, workers=1)
+    valid = (zip_summary['RegistrationYear_count'] >= 30).sum()
+    assert len(pairs) == valid * (valid - 1) // 2, "Every pair should be tested once"
+    for row in pairs.sample(5, random_state=0).itertuples():
+        t_stat, p = welch_t(zip_summary, row.group1, row.group2, 'RegistrationYear')
+        assert np.isclose(row.t_stat, t_stat) and np.isclose(row.p_value, p), "Pairwise Welch mismatch"
+    equivalent = equivalent_pairs(zip_summary, 'RegistrationYear', correction='fdr_bh')
+    assert (equivalent['p_adjusted'] >= 0.05).all(), "Only equivalent pairs should be returned"
+    assert equivalent['p_value'].is_monotonic_decreasing, "Pairs should be ranked by p-value"
+
+
+def test_benjamini_hochberg():
+    adjusted = benjamini_hochberg([0.01, 0.04, np.nan, 0.03])
+    np.testing.assert_allclose(adjusted, [0.03, 0.04, np.nan, 0.04])
@@ -1,7 +1,8 @@
 import pytest
 import pandas as pd
 import numpy as np
-from src.scripts.task3_hypothesis_testing import calc_claim_frequency, calc_claim_severity, calc_margin
+from src.scripts.hypothesis_runner import HypothesisRunner
+from src.scripts.task3_hypothesis_testing import HYPOTHESES, calc_claim_frequency, calc_claim_severity, calc_margin
 
 # Mock data
 data = pd.DataFrame({
@@ -25,4 +26,22 @@ def test_calc_claim_severity():
 
 def test_calc_margin():
     margin = calc_margin(data[data['Province'] == 'B'])
-    assert margin == -250, "Margin calculation incorrect"  # (-1300 + 800) / 2 = -250
\ No newline at end of file
+    assert margin == -250, "Margin calculation incorrect"  # (-1300 + 800) / 2 = -250
+
+def test_runner_plans_and_reports(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 2000
+    policies = pd.DataFrame({
+        'Province': rng.choice(['Gauteng', 'Western Cape'], n),
+        'PostalCode': rng.choice([1234, 5678, 9012], n),
+        'Gender': rng.choice(['Female', 'Male'], n),
+        'TotalClaims': np.where(rng.random(n) < 0.2, rng.gamma(2, 5000, n), 0.0),
+        'TotalPremium': rng.gamma(2, 500, n),
+        'RegistrationYear': rng.integers(2000, 2015, n)
+    })
+    runner = HypothesisRunner(HYPOTHESES, resamples=200, workers=1)
+    assert set(runner.required_columns()) == set(policies.columns), "Plan should project exactly the needed columns"
+    report = runner.run(data=policies)
+    assert [entry['decision'] != 'insufficient_data' for entry in report['hypotheses']] == [True] * 4, "All hypotheses should run"
+    text_path, json_path = runner.save(str(tmp_path / 'report.txt'))
+    assert json_path.endswith('report.json'), "JSON report should be written next to the text report"
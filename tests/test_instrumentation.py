@@ -0,0 +1,61 @@
+import pytest
+import time
+from src.scripts.instrumentation import Run, compare_manifests, current_run, load_manifest, record, stage
+
+
+# Mock manifest: a run whose 'fit' stage takes 2s and 100MB
+def manifest(fit_seconds, fit_memory=100.0):
+    stages = [{'name': 'load', 'wall_seconds': 1.0, 'cpu_seconds': 1.0, 'peak_memory_mb': 50.0, 'rows': 1000},
+              {'name': 'fit', 'wall_seconds': fit_seconds, 'cpu_seconds': fit_seconds, 'peak_memory_mb': fit_memory,
+               'rows': 1000}]
+    total = {'wall_seconds': 1.0 + fit_seconds, 'cpu_seconds': 1.0 + fit_seconds, 'peak_memory_mb': fit_memory}
+    return {'run': 'mock', 'stages': stages, 'total': total}
+
+
+def test_run_records_nested_stages_to_manifest(tmp_path):
+    with Run('mock', manifest_dir=str(tmp_path), trace_memory=True, argv=[]):
+        with stage('outer', rows=10):
+            with stage('inner') as inner:
+                data = list(range(100_000))
+                inner.rows = len(data)
+        record('worker', rows=5, wall_seconds=0.5, cpu_seconds=0.5)
+    assert current_run() is None, "The run should be inactive after finishing"
+
+    paths = list((tmp_path / 'mock').glob('*.json'))
+    assert len(paths) == 1, "One manifest should be written per run"
+    stages = {entry['name']: entry for entry in load_manifest(paths[0])['stages']}
+    assert set(stages) == {'outer', 'inner', 'worker'}, "All stages should be recorded"
+    assert stages['inner']['parent'] == 'outer', "Nested stages should record their parent"
+    assert stages['inner']['rows'] == 100_000, "Rows set inside a stage should be recorded"
+    assert stages['outer']['traced_peak_mb'] >= stages['inner']['traced_peak_mb'] > 0, \
+        "The outer stage peak should include the inner stage"
+    assert stages['worker']['rows_per_second'] == pytest.approx(10), "Throughput should be rows / wall seconds"
+
+
+def test_mark_closes_previous_stage(tmp_path):
+    run = Run('flat', manifest_dir=str(tmp_path), argv=[]).start()
+    run.mark('first')
+    time.sleep(0.01)
+    run.mark('second')
+    run.finish()
+    names = [entry['name'] for entry in run.stages]
+    assert names == ['first', 'second'], "Marks should be recorded as sequential stages"
+    assert run.stages[0]['parent'] is None, "Marked stages should not nest"
+
+
+def test_stage_without_run_is_noop():
+    with stage('alone', rows=3) as current:
+        pass
+    record('ignored', wall_seconds=1.0)
+    assert current.rows == 3, "Stages outside a run should still be usable"
+
+
+def test_compare_flags_regressions():
+    diff = compare_manifests(manifest(2.0), manifest(2.5))
+    assert diff.loc['fit', 'regression'], "A 25% slower stage should be flagged"
+    assert not diff.loc['load', 'regression'], "An unchanged stage should not be flagged"
+    assert diff.loc['fit', 'wall_seconds_change'] == pytest.approx(0.25), "Change should be relative to the old run"
+    assert compare_manifests(manifest(2.0), manifest(2.0, 150.0)).loc['fit', 'regression'], \
+        "Peak memory growth should be flagged"
+    assert not compare_manifests(manifest(0.01), manifest(0.02)).loc['fit', 'regression'], \
+        "Sub-threshold absolute slowdowns should not be flagged"
@@ -0,0 +1,48 @@
+import pytest
+import pandas as pd
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from xgboost import XGBClassifier
+from src.scripts.batch_scoring import predict
+from src.scripts.model_registry import ModelRegistry, data_hash, get_metadata, register_model
+
+# Mock training data
+rng = np.random.default_rng(0)
+X = pd.DataFrame({'SumInsured': rng.random(200), 'PolicyAge': rng.integers(0, 20, 200).astype(float)})
+y = (X['SumInsured'] > 0.5).astype(int)
+
+
+def test_xgboost_roundtrip_and_metadata(tmp_path):
+    model = XGBClassifier(n_estimators=5).fit(X, y)
+    register_model(model, 'xgboost_probability', X.columns, data_hash(X, y), {'F1': 0.9}, 1.5, registry_dir=str(tmp_path))
+    metadata = get_metadata('xgboost_probability', registry_dir=str(tmp_path))
+    assert metadata['version'] == 1 and metadata['model_file'] == 'model.ubj', "XGBoost should be stored as UBJSON"
+    assert metadata['features'] == ['SumInsured', 'PolicyAge'], "Feature list should be recorded"
+    assert metadata['metrics'] == {'F1': 0.9}, "Metrics should be recorded"
+    loaded = ModelRegistry(str(tmp_path)).get('xgboost_probability')
+    np.testing.assert_allclose(predict(loaded, X, proba=True), model.predict_proba(X)[:, 1], rtol=1e-6)
+
+
+def test_versions_and_lru_cache(tmp_path):
+    model = RandomForestRegressor(n_estimators=3, random_state=0).fit(X, y)
+    for name in ('a', 'b', 'a'):
+        register_model(model, name, X.columns, registry_dir=str(tmp_path))
+    registry = ModelRegistry(str(tmp_path), max_models=1)
+    first = registry.get('a')
+    assert registry.get('a') is first, "Second access should hit the cache"
+    assert registry.metadata('a')['version'] == 2, "Latest version should be the default"
+    registry.get('b')
+    assert registry.get('a') is not first, "Least recently used model should be evicted"
+    np.testing.assert_allclose(first.predict(X), model.predict(X))
+
+
+def test_predict_aligns_to_model_feature_order(tmp_path):
+    model = XGBClassifier(n_estimators=5).fit(X, y)
+    register_model(model, 'xgboost_probability', X.columns, registry_dir=str(tmp_path))
+    loaded = ModelRegistry(str(tmp_path)).get('xgboost_probability')
+    np.testing.assert_allclose(predict(loaded, X[['PolicyAge', 'SumInsured']], proba=True),
+                               model.predict_proba(X)[:, 1], rtol=1e-6, err_msg="Columns should follow training order")
+    with pytest.raises(ValueError, match='missing'):
+        predict(loaded, X[['SumInsured']])
+    with pytest.raises(ValueError, match='unexpected'):
+        predict(model, X.assign(Extra=1.0))
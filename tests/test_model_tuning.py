@@ -0,0 +1,87 @@
+import pytest
+import pandas as pd
+import numpy as np
+import time
+from src.scripts import model_tuning
+from src.scripts.feature_store import write_split
+from src.scripts.model_tuning import SEARCH_SPACES, hyperband, leaderboard, sample_configs, successive_halving, tune
+
+
+# Mock trial results: (config, validation RMSE, training seconds, test RMSE)
+def make_result(config, rmse, seconds, test_rmse):
+    return {'name': 'xgboost_severity', 'task': 'severity', 'bracket': 0, 'rung': 0, 'config': config,
+            'n_estimators': 30, 'trees_used': 30, 'threads': 1, 'params': {'max_depth': 3},
+            'validation': rmse, 'RMSE': test_rmse, 'train_seconds': seconds, 'cpu_seconds': seconds}
+
+
+# Mock severity splits with a noisy linear target
+rng = np.random.default_rng(1)
+X = pd.DataFrame(rng.normal(size=(500, 4)), columns=['SumInsured', 'PolicyAge', 'Province', 'make'])
+y = pd.DataFrame({'TotalClaims': 3 * X['SumInsured'] - X['PolicyAge'] + rng.normal(scale=2.0, size=500)})
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    for name, frame in [('X_sev_train', X.iloc[:400]), ('X_sev_test', X.iloc[400:]),
+                        ('y_sev_train', y.iloc[:400]), ('y_sev_test', y.iloc[400:])]:
+        write_split(frame, name, str(tmp_path))
+    # Fresh split cache, and a small tree budget so trials take milliseconds
+    monkeypatch.setattr(model_tuning, '_SPLITS', {})
+    monkeypatch.setitem(model_tuning.RESOURCES, 'random_forest', (2, 18))
+    return str(tmp_path)
+
+
+def test_leaderboard_ranks_and_flags_pareto_front():
+    board = leaderboard([make_result(0, 100.0, 1.0, 80.0), make_result(1, 90.0, 2.0, 99.0),
+                         make_result(2, 95.0, 3.0, 70.0)])
+    assert list(board['config']) == [1, 2, 0], "Trials should be ranked by validation RMSE, not test RMSE"
+    assert list(board['test_score']) == [99.0, 70.0, 80.0], "Test RMSE should be reported alongside"
+    pareto = dict(zip(board['config'], board['pareto']))
+    assert pareto == {0: True, 1: True, 2: False}, "A slower and worse trial should not be on the Pareto front"
+
+
+def test_sample_configs_draws_from_space():
+    configs = sample_configs('random_forest', 5, np.random.default_rng(0))
+    assert len(configs) == 5, "Should draw the requested number of configurations"
+    for config in configs:
+        for param, value in config.items():
+            assert value in SEARCH_SPACES['random_forest'][param], f"{param} should come from the search space"
+
+
+def test_successive_halving_promotes_best_third(data_dir):
+    configs = sample_configs('random_forest', 9, np.random.default_rng(0))
+    results = pd.DataFrame(successive_halving('random_forest_severity', configs, 2, 18, data_dir=data_dir))
+    assert results.groupby('rung').size().tolist() == [9, 3, 1], "Each rung should keep the best 1/eta configs"
+    assert results.groupby('rung')['n_estimators'].first().tolist() == [2, 6, 18], "Trees should grow eta-fold"
+    first = results[results['rung'] == 0].sort_values(['validation', 'config'])
+    assert set(results[results['rung'] == 1]['config']) == set(first['config'][:3]), \
+        "Promotion should follow validation RMSE"
+
+
+def test_hyperband_brackets_and_early_stopping(data_dir, monkeypatch):
+    board = leaderboard(hyperband('random_forest_severity', np.random.default_rng(0), data_dir=data_dir))
+    counts = board.groupby(['bracket', 'rung']).size().to_dict()
+    assert counts == {(0, 0): 9, (0, 1): 3, (0, 2): 1, (1, 0): 5, (1, 1): 1, (2, 0): 3}, \
+        "Brackets should trade configs for trees"
+
+    monkeypatch.setattr(model_tuning, 'EARLY_STOPPING_ROUNDS', 2)
+    params = {'max_depth': 6, 'learning_rate': 0.3, 'subsample': 1.0, 'colsample_bytree': 1.0,
+              'min_child_weight': 1, 'reg_lambda': 0.1}
+    results = successive_halving('xgboost_severity', [params], 300, 300, data_dir=data_dir)
+    assert results[0]['trees_used'] < 300, "Trials should stop early on the validation split"
+
+
+def test_time_budget_stops_new_trials(data_dir, monkeypatch):
+    run_trial = model_tuning.run_trial
+
+    # Every trial takes at least 50 ms, so the full 22-trial Hyperband run would need over a second
+    def slow_trial(trial, data_dir):
+        time.sleep(0.05)
+        return run_trial(trial, data_dir)
+
+    monkeypatch.setattr(model_tuning, 'run_trial', slow_trial)
+    start = time.perf_counter()
+    board = tune(['random_forest_severity'], time_budget=0.3, cpu_budget=1, data_dir=data_dir)
+    elapsed = time.perf_counter() - start
+    assert 0 < len(board) < 22, "The budget should stop the search part way"
+    assert elapsed < 0.3 + 0.5, "No trial should start after the deadline"
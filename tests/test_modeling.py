@@ -0,0 +1,27 @@
+import pytest
+import pandas as pd
+from src.scripts.task4_modeling import save_results
+
+# Mock training rows for two severity models and one probability model
+timing = {'wall_seconds': 1.0, 'cpu_seconds': 1.0, 'peak_memory_mb': 100.0, 'memory_increase_mb': 10.0}
+rows = [
+    {'name': 'linear_regression_severity', 'Model': 'Linear Regression', 'task': 'severity', 'threads': 1,
+     'metrics': {'RMSE': 10.0, 'R2': 0.1}, **timing},
+    {'name': 'xgboost_severity', 'Model': 'XGBoost', 'task': 'severity', 'threads': 2,
+     'metrics': {'RMSE': 8.0, 'R2': 0.3}, **timing},
+    {'name': 'xgboost_probability', 'Model': 'XGBoost', 'task': 'probability', 'threads': 2,
+     'metrics': {'Accuracy': 0.9, 'Precision': 0.5, 'Recall': 0.4, 'F1': 0.45}, **timing}
+]
+
+
+def test_save_results_replaces_retrained_models_only(tmp_path):
+    save_results(rows, str(tmp_path))
+    retrained = dict(rows[1], metrics={'RMSE': 7.0, 'R2': 0.4}, wall_seconds=3.0)
+    save_results([retrained], str(tmp_path))
+    severity = pd.read_csv(tmp_path / 'severity_results.csv', index_col=0)
+    assert list(severity['Model']) == ['Linear Regression', 'XGBoost'], "Model order should be kept"
+    assert list(severity['RMSE']) == [10.0, 7.0], "Only the retrained model should change"
+    assert len(pd.read_csv(tmp_path / 'probability_results.csv', index_col=0)) == 1, "Other suite should be untouched"
+    timings = pd.read_csv(tmp_path / 'training_times.csv').set_index('name')
+    assert timings.loc['xgboost_severity', 'wall_seconds'] == 3.0, "Timing should be replaced"
+    assert len(timings) == 3, "Timings of other models should be kept"
@@ -0,0 +1,47 @@
+import pytest
+import pandas as pd
+import numpy as np
+from src.scripts.group_stats import SEVERITY, add_metrics, anova, chi_squared, group_summary, welch_t
+from src.scripts.monitoring import batch_accumulators, merge_accumulators, to_group_summary, window_summary
+
+# Mock policies over six months
+rng = np.random.default_rng(3)
+n = 3000
+data = pd.DataFrame({
+    'Province': rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], n),
+    'PostalCode': rng.choice([2000, 7100, 4001], n),
+    'Gender': rng.choice(['Female', 'Male', None], n),
+    'TransactionMonth': pd.to_datetime(rng.choice(pd.date_range('2015-01-01', periods=6, freq='MS'), n)),
+    'TotalClaims': np.where(rng.random(n) < 0.15, rng.lognormal(9, 1.2, n), 0.0),
+    'TotalPremium': rng.gamma(2, 300, n)
+})
+
+
+def test_incremental_merge_matches_single_pass():
+    first, second = data.iloc[:1700].copy(), data.iloc[1700:].copy()
+    merged = merge_accumulators(batch_accumulators(first), batch_accumulators(second))
+    full = batch_accumulators(data.copy()).sort_values(['group_col', 'group', 'month']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(merged, full, check_dtype=False)
+
+
+def test_window_answers_tests_without_raw_data():
+    accumulators = batch_accumulators(data.copy())
+    window = window_summary(accumulators, 'Province', months=3)
+    assert window.attrs['window'] == ('2015-04', '2015-06'), "Trailing window should end at the latest month"
+    recent = add_metrics(data[data['TransactionMonth'] >= '2015-04-01'].copy())
+    expected = group_summary(recent.astype({'Province': str}), 'Province')
+    summary = to_group_summary(window)
+    assert np.allclose(chi_squared(summary), chi_squared(expected)), "Chi-squared should match raw data"
+    assert np.allclose(anova(summary, SEVERITY), anova(expected, SEVERITY)), "ANOVA should match raw data"
+    assert np.allclose(welch_t(summary, 'Gauteng', 'Limpopo', 'Margin'),
+                       welch_t(expected, 'Gauteng', 'Limpopo', 'Margin')), "Welch t should match raw data"
+
+
+def test_null_postal_code_batch_merges_with_integer_batch():
+    first, second = data.iloc[:1500].copy(), data.iloc[1500:].copy()
+    second['PostalCode'] = second['PostalCode'].where(second.index != 1500)
+    assert second['PostalCode'].dtype == np.float64, "A null should turn the integer codes into floats"
+    merged = merge_accumulators(batch_accumulators(first, ['PostalCode']), batch_accumulators(second, ['PostalCode']))
+    assert sorted(merged['group'].dropna().unique()) == ['2000', '4001', '7100'], \
+        "Float and integer batches should share zip keys"
+    assert merged['exposure'].sum() == n - 1, "Every policy with a zip should be counted once"
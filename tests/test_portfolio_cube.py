@@ -0,0 +1,71 @@
+import pytest
+import pandas as pd
+import numpy as np
+from src.scripts.group_stats import SEVERITY, add_metrics, chi_squared, group_summary, welch_t
+from src.scripts.portfolio_cube import PortfolioCube, batch_cube, load_cube, merge_cubes, update_cube
+
+# Mock policies over six months
+rng = np.random.default_rng(5)
+n = 4000
+data = pd.DataFrame({
+    'Province': rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], n),
+    'PostalCode': rng.choice([2000, 7100, 4001], n),
+    'make': rng.choice(['TOYOTA', 'VW'], n),
+    'CoverType': rng.choice(['Own Damage', 'Windscreen'], n),
+    'Gender': rng.choice(['Female', 'Male', None], n),
+    'TransactionMonth': pd.to_datetime(rng.choice(pd.date_range('2015-01-01', periods=6, freq='MS'), n)),
+    'TotalClaims': np.where(rng.random(n) < 0.15, rng.lognormal(9, 1.2, n), 0.0),
+    'TotalPremium': rng.gamma(2, 300, n)
+})
+
+
+def test_incremental_cube_matches_single_pass():
+    merged = PortfolioCube(merge_cubes(batch_cube(data.iloc[:1500].copy()), batch_cube(data.iloc[1500:].copy())))
+    single = PortfolioCube(batch_cube(data.copy()))
+    pd.testing.assert_frame_equal(merged.query(['Province', 'Gender']), single.query(['Province', 'Gender']))
+    assert single.query()['policies'].iloc[0] == n, "Missing Gender should keep its rows in the cube"
+
+
+def test_query_matches_raw_rows():
+    cube = PortfolioCube(batch_cube(data.copy()))
+    result = cube.query('Province', where={'TransactionMonth': ('2015-02', '2015-04'), 'Gender': ['Female', 'Male']})
+    rows = data[data['TransactionMonth'].between('2015-02-01', '2015-04-01') & data['Gender'].notna()]
+    grouped = rows.groupby('Province')
+    claims = rows[rows['TotalClaims'] > 0].groupby('Province')['TotalClaims']
+    np.testing.assert_allclose(result['loss_ratio'], grouped['TotalClaims'].sum() / grouped['TotalPremium'].sum())
+    np.testing.assert_allclose(result['frequency'], grouped['TotalClaims'].apply(lambda x: (x > 0).mean()))
+    np.testing.assert_allclose(result['severity'], claims.mean())
+    np.testing.assert_allclose(result['severity_std'], claims.std(), rtol=1e-6)
+    np.testing.assert_allclose(result['margin'], grouped['TotalPremium'].sum() - grouped['TotalClaims'].sum())
+    assert cube.query(where={'PostalCode': '2000'})['policies'].iloc[0] == (data['PostalCode'] == 2000).sum(), \
+        "String filter values should match numeric codes"
+
+
+def test_cube_summary_runs_group_tests():
+    summary = PortfolioCube(batch_cube(data.copy())).group_summary('Gender')
+    raw = group_summary(add_metrics(data.copy()), 'Gender')
+    np.testing.assert_allclose(chi_squared(summary, ['Female', 'Male']), chi_squared(raw, ['Female', 'Male']))
+    np.testing.assert_allclose(welch_t(summary, 'Female', 'Male', SEVERITY), welch_t(raw, 'Female', 'Male', SEVERITY),
+                               rtol=1e-6)
+
+
+def test_update_replaces_reloaded_months(tmp_path):
+    source, store = str(tmp_path / 'policies.parquet'), str(tmp_path / 'cube.parquet')
+    data.to_parquet(source)
+    update_cube(source, store)
+    update_cube(source, store, months=['2015-03'], replace=True)
+    cube = load_cube(store)
+    assert cube['policies'].sum() == n, "Re-running a month with replace should not double count it"
+    update_cube(source, store, months=['2015-03'])
+    assert load_cube(store)['policies'].sum() == n + (data['TransactionMonth'] == '2015-03-01').sum(), \
+        "Without replace the month should be added"
+
+
+def test_update_merges_batches_in_rounds(tmp_path, monkeypatch):
+    source, store = str(tmp_path / 'policies.parquet'), str(tmp_path / 'cube.parquet')
+    data.to_parquet(source)
+    monkeypatch.setattr('src.scripts.portfolio_cube.MERGE_FANIN', 3)
+    cube = PortfolioCube(update_cube(source, store, batch_size=300))
+    expected = PortfolioCube(batch_cube(data.copy()))
+    pd.testing.assert_frame_equal(cube.query(['Province', 'TransactionMonth']),
+                                  expected.query(['Province', 'TransactionMonth']), check_dtype=False)
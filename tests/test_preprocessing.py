@@ -0,0 +1,49 @@
+import pytest
+import pandas as pd
+import numpy as np
+from src.scripts.preprocessing import InsurancePreprocessor, UNKNOWN_CODE
+
+# Mock training data
+data = pd.DataFrame({
+    'Province': ['Gauteng', 'Gauteng', 'Western Cape', None],
+    'make': ['TOYOTA', 'BMW', 'TOYOTA', 'TOYOTA'],
+    'RegistrationYear': [2010, 2012, np.nan, 2014],
+    'CustomValueEstimate': [np.nan, np.nan, np.nan, 1000.0],
+    'TransactionMonth': pd.to_datetime(['2015-01-01'] * 4),
+    'TotalPremium': [100.0, 0.0, 200.0, 50.0],
+    'TotalClaims': [0.0, 500.0, 100.0, 0.0]
+})
+
+
+def test_fit_transform():
+    preprocessor = InsurancePreprocessor()
+    df = preprocessor.fit_transform(data)
+    assert preprocessor.dropped_columns_ == [], "No column is more than 90% missing"
+    assert 'TransactionMonth' not in df.columns, "Datetime columns should be dropped"
+    assert df['Province'].tolist() == [0, 0, 1, 0], "Missing Province should be imputed with the mode"
+    assert df['RegistrationYear'].tolist() == [2010, 2012, 2012, 2014], "Missing year should be the median"
+    assert df['PolicyAge'].tolist() == [15, 13, 13, 11], "PolicyAge incorrect"
+    assert df['LossRatio'].tolist() == [0.0, 0.0, 0.5, 0.0], "LossRatio incorrect"
+    assert 'TotalClaims' not in preprocessor.features_, "Targets should not be features"
+
+
+def test_transform_new_data():
+    preprocessor = InsurancePreprocessor().fit(data)
+    new = pd.DataFrame({
+        'Province': pd.Categorical(['Limpopo', 'Western Cape']),
+        'make': ['BMW', 'AUDI'],
+        'RegistrationYear': [2015, 2016],
+        'CustomValueEstimate': [np.nan, 10.0],
+        'TotalPremium': [10.0, 20.0]
+    })
+    df = preprocessor.transform(new)
+    assert df['Province'].tolist() == [UNKNOWN_CODE, 1], "Unseen categories should get the reserved code"
+    assert df['make'].tolist() == [0, UNKNOWN_CODE], "Unseen categories should get the reserved code"
+    assert list(df.columns) == preprocessor.output_columns_, "Output columns should match training"
+
+
+def test_transform_batches_matches_transform():
+    preprocessor = InsurancePreprocessor().fit(data)
+    batches = [data.iloc[:2], data.iloc[2:]]
+    combined = pd.concat(preprocessor.transform_batches(batches))
+    pd.testing.assert_frame_equal(combined, preprocessor.transform(data))
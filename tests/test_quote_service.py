@@ -0,0 +1,147 @@
+import pytest
+import pandas as pd
+import numpy as np
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from xgboost import XGBClassifier, XGBRegressor
+from src.scripts.model_registry import register_model
+from src.scripts.preprocessing import InsurancePreprocessor
+from src.scripts.quote_service import MicroBatcher, QuoteService, ServiceMetrics, make_handler
+
+# Mock policies for a tiny preprocessor and pair of models
+rng = np.random.default_rng(3)
+n = 300
+data = pd.DataFrame({
+    'Province': rng.choice(['Gauteng', 'Western Cape', 'Limpopo'], n),
+    'RegistrationYear': rng.integers(2000, 2016, n),
+    'SumInsured': rng.gamma(2, 5000, n),
+    'TotalPremium': rng.gamma(2, 300, n),
+    'TotalClaims': np.where(rng.random(n) < 0.3, rng.lognormal(8, 1, n), 0.0)
+})
+
+
+# Score function with the quote service's output columns; a record with x == 'bad' fails the call
+def fake_score(df):
+    if (df['x'] == 'bad').any():
+        raise TypeError("bad record")
+    x = df['x'].astype(float)
+    return pd.DataFrame({'ClaimProbability': x / 10, 'ExpectedSeverity': x * 100, 'PurePremium': x * x * 10})
+
+
+@pytest.fixture
+def service(tmp_path):
+    preprocessor = InsurancePreprocessor().fit(data)
+    preprocessor.save(str(tmp_path / 'preprocessor.pkl'))
+    X = preprocessor.transform(data)[preprocessor.features_]
+    registry = str(tmp_path / 'registry')
+    register_model(XGBClassifier(n_estimators=5).fit(X, data['TotalClaims'] > 0), 'xgboost_probability', X.columns,
+                   registry_dir=registry)
+    register_model(XGBRegressor(n_estimators=5).fit(X, data['TotalClaims']), 'xgboost_severity', X.columns,
+                   registry_dir=registry)
+    return QuoteService(str(tmp_path / 'preprocessor.pkl'), registry_dir=registry)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(service):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(service))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_address[1]}'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def post(url, payload):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    request = urllib.request.Request(url + '/quote', data=body, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_metrics_percentiles_and_queue_depth():
+    metrics = ServiceMetrics()
+    for latency in range(1, 101):
+        metrics.record_request(float(latency), ok=latency != 100)
+    metrics.record_batch(4)
+    metrics.record_batch(2)
+    snapshot = metrics.snapshot(queue_depth=7)
+    assert snapshot['latency_p50_ms'] == pytest.approx(50.5), "p50 should be the median latency"
+    assert snapshot['latency_p99_ms'] == pytest.approx(99.01), "p99 should interpolate the latency window"
+    assert snapshot['queue_depth'] == 7, "Queue depth should be reported"
+    assert (snapshot['requests'], snapshot['errors']) == (100, 1), "Request and error counts incorrect"
+    assert (snapshot['batches'], snapshot['mean_batch_size']) == (2, 3.0), "Batch metrics incorrect"
+    assert ServiceMetrics().snapshot(0)['latency_p50_ms'] is None, "No requests should give no percentiles"
+
+
+def test_requests_within_window_share_a_batch():
+    batcher = MicroBatcher(fake_score, max_batch_rows=100, max_wait_ms=200)
+    futures = [batcher.submit([{'x': i}, {'x': i + 0.5}]) for i in range(5)]
+    results = [future.result(5) for future in futures]
+    assert [result[1]['ClaimProbability'] for result in results] == [(i + 0.5) / 10 for i in range(5)], \
+        "Each request should get its own rows back in order"
+    snapshot = batcher.metrics.snapshot(batcher.queue.qsize())
+    assert snapshot['batches'] == 1 and snapshot['mean_batch_size'] == 10, "Requests in the window should be one batch"
+
+
+def test_batches_are_capped_at_max_rows():
+    batcher = MicroBatcher(fake_score, max_batch_rows=4, max_wait_ms=200)
+    futures = [batcher.submit([{'x': i}, {'x': i}]) for i in range(4)]
+    for future in futures:
+        future.result(5)
+    assert list(batcher.metrics.batch_sizes) == [4, 4], "A full batch should not wait for the window"
+
+
+def test_bad_record_only_fails_its_own_request():
+    batcher = MicroBatcher(fake_score, max_batch_rows=100, max_wait_ms=200)
+    good, bad, other = batcher.submit([{'x': 1}]), batcher.submit([{'x': 2}, {'x': 'bad'}]), batcher.submit([{'x': 3}])
+    assert good.result(5)[0]['PurePremium'] == 10, "Requests batched with a bad record should still be scored"
+    assert other.result(5)[0]['PurePremium'] == 90, "Requests batched with a bad record should still be scored"
+    with pytest.raises(TypeError):
+        bad.result(5)
+
+
+def test_http_round_trip(service, serve):
+    url = serve(service)
+    policy = json.loads(data.head(3).to_json(orient='records'))
+    status, single = post(url, policy[0])
+    assert status == 200 and set(single) == {'ClaimProbability', 'ExpectedSeverity', 'PurePremium'}, \
+        "A single policy should get one quote"
+    status, quotes = post(url, policy)
+    expected = service.score(data.head(3))
+    assert status == 200, "A list of policies should be quoted"
+    np.testing.assert_allclose([quote['PurePremium'] for quote in quotes], expected['PurePremium'], rtol=1e-6)
+    assert post(url, b'{not json')[0] == 400, "Malformed JSON should be a client error"
+    with urllib.request.urlopen(url + '/metrics') as response:
+        metrics = json.loads(response.read())
+    assert metrics['requests'] == 2 and metrics['queue_depth'] == 0, "Metrics should count the served quotes"
+
+
+# Stand-in service whose quote fails with a given exception
+class FailingService:
+    def __init__(self, error):
+        self.error = error
+
+    def quote(self, records):
+        raise self.error
+
+    def stats(self):
+        return {}
+
+
+def test_http_timeout_and_unexpected_errors(serve):
+    status, body = post(serve(FailingService(TimeoutError())), {'x': 1})
+    assert status == 504 and 'error' in body, "A timed-out quote should return 504"
+    status, body = post(serve(FailingService(RuntimeError('boom'))), {'x': 1})
+    assert status == 500 and 'boom' in body['error'], "Unexpected errors should return a 500 JSON body"
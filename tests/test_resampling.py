@@ -0,0 +1,27 @@
+import pytest
+import pandas as pd
+import numpy as np
+from src.scripts.resampling import bootstrap_ci, permutation_test, resampling_t_test
+
+# Mock zero-inflated, heavy-tailed claim amounts for two groups
+rng = np.random.default_rng(7)
+x = np.where(rng.random(400) < 0.3, rng.lognormal(8, 1.5, 400), 0.0)
+y = np.where(rng.random(300) < 0.3, rng.lognormal(8.8, 1.5, 300), 0.0)
+
+
+def test_resampling_is_reproducible_across_workers():
+    serial = permutation_test(x, y, n_resamples=2500, seed=1, workers=1)
+    parallel = permutation_test(x, y, n_resamples=2500, seed=1, workers=2)
+    assert serial['p_value'] == parallel['p_value'], "Seeded streams should not depend on the worker count"
+    assert serial['resamples_per_second'] > 0, "Throughput should be reported"
+    ci = bootstrap_ci(x, y, n_resamples=2000, seed=1, workers=1)
+    assert ci['ci_low'] < ci['statistic'] < ci['ci_high'], "Observed difference should lie inside its bootstrap CI"
+
+
+def test_permutation_p_value_is_calibrated():
+    same = permutation_test(x, rng.permutation(x), n_resamples=2000, seed=0, workers=1)
+    assert same['p_value'] > 0.9, "Identical samples should not differ"
+    data = pd.DataFrame({'Gender': ['Female'] * len(x) + ['Male'] * len(y), 'TotalClaims': np.concatenate([x, y])})
+    diff, p = resampling_t_test(data, 'Gender', 'Female', 'Male', 'TotalClaims', n_resamples=2000, workers=1)
+    assert np.isclose(diff, x.mean() - y.mean()), "Statistic should be the mean difference"
+    assert p < 0.05, "Clearly different groups should be detected"
@@ -0,0 +1,44 @@
+import pytest
+import pandas as pd
+import numpy as np
+from src.scripts.sketches import QuantileSketch, ColumnSummaries
+from src.scripts.out_of_core_prep import hash_split
+from src.scripts.preprocessing import InsurancePreprocessor
+
+# Mock heavy-tailed claims
+rng = np.random.default_rng(42)
+claims = rng.lognormal(mean=8, sigma=1.5, size=200000)
+
+
+def test_quantile_sketch_merge():
+    left = QuantileSketch(k=512).update(claims[:100000])
+    right = QuantileSketch(k=512)
+    for chunk in np.array_split(claims[100000:], 20):
+        right.update(chunk)
+    merged = left.merge(right)
+    rank = (claims <= merged.median()).mean()
+    assert merged.count == len(claims), "Merged count incorrect"
+    assert abs(rank - 0.5) < 0.01, "Sketch median should be within 1% rank of the true median"
+
+
+def test_summaries_fit_matches_in_memory():
+    data = pd.DataFrame({
+        'Province': ['Gauteng', 'Gauteng', 'Western Cape', None, 'Limpopo', 'Gauteng'],
+        'RegistrationYear': [2010.0, 2012.0, np.nan, 2014.0, 2011.0, 2013.0],
+        'TotalPremium': [100.0, 0.0, 200.0, 50.0, 10.0, 20.0],
+        'TotalClaims': [0.0, 500.0, 100.0, 0.0, 0.0, 0.0]
+    })
+    summaries = ColumnSummaries().update(data.iloc[:3]).merge(ColumnSummaries().update(data.iloc[3:]))
+    streamed = InsurancePreprocessor().fit_summaries(summaries)
+    in_memory = InsurancePreprocessor().fit(data)
+    assert streamed.numerical_fill_ == in_memory.numerical_fill_, "Medians should match on small data"
+    assert streamed.categorical_fill_ == in_memory.categorical_fill_, "Modes should match"
+    assert all((streamed.categories_[col] == in_memory.categories_[col]).all() for col in in_memory.categories_)
+
+
+def test_hash_split_deterministic():
+    ids = pd.Series(np.arange(10000))
+    is_test = hash_split(ids, test_size=0.2)
+    assert abs(is_test.mean() - 0.2) < 0.02, "Test fraction should be close to test_size"
+    assert (hash_split(ids.astype('float64'), 0.2) == is_test).all(), "Split should not depend on ID dtype"
+    assert (hash_split(ids.iloc[::-1], 0.2)[::-1] == is_test).all(), "Split should not depend on row order"
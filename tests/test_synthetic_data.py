@@ -0,0 +1,28 @@
+import pytest
+import pandas as pd
+from src.scripts.benchmarks import parse_size
+from src.scripts.schema import COLUMN_ORDER, to_arrow_table
+from src.scripts.synthetic_data import generate_chunk
+
+# Mock chunk shared by the tests
+chunk = generate_chunk(5000, seed=1)
+
+
+def test_chunk_matches_schema_and_is_reproducible():
+    assert list(chunk.columns) == COLUMN_ORDER, "Columns should follow the extract layout"
+    assert len(chunk) == 5000, "Chunk should have the requested rows"
+    assert to_arrow_table(chunk).num_rows == 5000, "Chunk should coerce to the raw schema"
+    pd.testing.assert_frame_equal(chunk, generate_chunk(5000, seed=1), obj="Same seed should give the same data")
+
+
+def test_policies_claims_and_missing_patterns():
+    months = chunk.groupby('PolicyID')['TransactionMonth']
+    assert (months.nunique() == months.size()).all(), "A policy should have one row per month"
+    assert (chunk['TotalClaims'] == 0).mean() > 0.9, "Claims should be zero-inflated"
+    assert chunk['NumberOfVehiclesInFleet'].isna().all(), "Fleet size is always missing in the extract"
+    assert (chunk['Bank'].isna() == chunk['AccountType'].isna()).all(), "Bank details should be missing together"
+    assert chunk['PostalCode'].nunique() > 100, "Postal codes should have realistic cardinality"
+
+
+def test_parse_size():
+    assert [parse_size(size) for size in ['100k', '1M', '50m', '2500']] == [100_000, 1_000_000, 50_000_000, 2500]